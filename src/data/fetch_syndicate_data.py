@@ -1,5 +1,7 @@
 from lxml import etree
-import requests
+
+from .. import http_client
+
 def to_number(s: str) -> int:
     s = s.replace(',', '')
     return int(s)
@@ -63,7 +65,7 @@ def get_syndicate_items(syndicate: dict) -> dict[str, list[str]]:
         must have 'name', 'url', 'sections'
     """
     import itertools
-    r = requests.get(syndicate['url'])
+    r = http_client.get(syndicate['url'])
     html = etree.HTML(r.content)
     names = list(itertools.chain.from_iterable([html.xpath(section['selector']) for section in syndicate['sections']]))
     return names
@@ -78,14 +80,14 @@ def get_syndicate_data(syndicate: dict) -> dict[str, int]:
         returns a dictionary of the syndicate's items and their respective standing cost
     """
     import itertools
-    r = requests.get(syndicate['url'])
+    r = http_client.get(syndicate['url'])
     html = etree.HTML(r.content)
     items = list(itertools.chain.from_iterable([html.xpath(section['selector']) for section in syndicate['sections']]))
     return [parse_syndicate_div(item, syndicate['parse']) for item in items]
 
 def test_syndicate(syndicate: dict):
     import itertools
-    r = requests.get(syndicate['url'])
+    r = http_client.get(syndicate['url'])
     html = etree.HTML(r.content)
     return html
 
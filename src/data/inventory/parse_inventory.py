@@ -3,10 +3,12 @@ from pathlib import Path
 import json
 from typing import Counter
 import re
-import requests
 import lzma
 import luadata
 
+from ... import http_client
+from ... import util
+
 from colorama import Fore, Style
 for color in [Fore, Style]:
     for attr in dir(color):
@@ -145,6 +147,16 @@ def main_incarnon_riven():
 
 class WarframePublicExport:
     # ref. https://wiki.warframe.com/w/Public_Export
+
+    # export name -> the fields we keep of each entry, the exports are several MBs and we only use a few fields
+    # exports not listed here are kept as is. add the field here if you start using a new one!
+    EXPORT_FIELDS = {
+        'ExportWeapons': ['uniqueName', 'name', 'description', 'omegaAttenuation'],
+        'ExportUpgrades': ['uniqueName', 'name', 'upgradeEntries'],
+        'ExportResources': ['uniqueName', 'name'],
+        'ExportManifest': ['uniqueName', 'textureLocation'],
+    }
+
     def __init__(self):
         self._export_map_cache = {}  # from index: lang -> {export_name -> export_file_name}
         self._export_cache = {}      # from manifest: (lang, export_name) -> data (usually a list of dicts)
@@ -165,7 +177,7 @@ class WarframePublicExport:
         """
         if use_cache and lang in self._export_map_cache:
             return self._export_map_cache[lang]
-        response = requests.get(f'https://origin.warframe.com/PublicExport/index_{lang}.txt.lzma')
+        response = http_client.get(f'https://origin.warframe.com/PublicExport/index_{lang}.txt.lzma')
         data = response.content
         lzma_data = lzma.decompress(data)
         """
@@ -190,16 +202,21 @@ class WarframePublicExport:
         e.g., to get ExportWeapons_en.json, do _get_public_export('ExportWeapons', 'en')
         (note that usually the json would be like: {'ExportWeapons': [list of dicts]},
          we will directly return the value of the first key, i.e., the [list of dicts] part)
+        each dict only has the fields in EXPORT_FIELDS[name] (if any)
         """
         if use_cache and (lang, name) in self._export_cache:
             return self._export_cache[(lang, name)]
         
         filename = self._get_public_export_map(lang, use_cache)[name]
         
-        response = requests.get(f'http://content.warframe.com/PublicExport/Manifest/{filename}')
-        data = response.content
-        export_data = json.loads(data.decode('utf-8'))
+        response = http_client.get(f'http://content.warframe.com/PublicExport/Manifest/{filename}')
+        export_data = util.json_loads(response.content)
+        del response    # free the raw body before building the projection
         data = export_data[list(export_data.keys())[0]]
+        del export_data
+        if name in self.EXPORT_FIELDS:
+            fields = self.EXPORT_FIELDS[name]
+            data = [{k: entry[k] for k in fields if k in entry} for entry in data]
         if use_cache:
             self._export_cache[(lang, name)] = data
         return data  # return the first key's value
@@ -751,8 +768,7 @@ class WarframeWiki:
                 we expect the returned text is: "return {...}"
                 and we manually patch out stuff that can't be parsed by luadata, e.g., math.huge
             """
-            import requests
-            r = requests.get(url)
+            r = http_client.get(url)
             if r.status_code != 200:
                 raise Exception(f"Failed to get data from {url}, status code: {r.status_code}")
             lua_code = r.text
@@ -0,0 +1,155 @@
+"""
+The fetch scheduler that runs every blocking fetch of the fetch engine (ref. warframe_market.prepare_market_items_async)
+
+It is one process-wide pool of worker threads with a priority queue in front of it, so an interactive
+lookup (e.g., the infobox of one item) doesn't wait behind hundreds of queued fetches of a bulk prepare.
+
+- priority classes: 'interactive' (a single item the user is looking at) > 'visible' (rows of a table
+  being shown) > 'background' (prefetching, revalidation)
+- fairness: within a priority class, jobs are taken round-robin across owners (e.g., server tasks), so two
+  bulk tasks progress together instead of one after another
+- promote(tag): move queued jobs with the tag (e.g., an item's slug) up to a higher priority, e.g.,
+  when the user opens an item that is still queued in a bulk prepare
+- joining: submitting a call identical to a queued (not yet running) job with a tag, i.e., same tag, fn and
+  arguments, returns that job's future (moved up to the new priority if higher) instead of queueing it again,
+  so the infobox asking for an item a bulk prepare has queued doesn't fetch it twice
+  (a call that is already running is deduplicated by util.SingleFlight instead)
+"""
+import threading
+import concurrent.futures
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import *
+
+PRIORITIES = ('interactive', 'visible', 'background')   # highest first
+
+@dataclass(eq=False)
+class Job:
+    fn: Callable
+    args: tuple
+    kwargs: dict
+    future: concurrent.futures.Future
+    owner: Hashable
+    tag: Hashable
+    priority: str
+
+class FetchScheduler:
+    """
+        ```
+        scheduler = FetchScheduler(4)
+        future = scheduler.submit(get_orders, 'serration', priority='visible', owner=task_id, tag='serration')
+        scheduler.promote('serration')  # the user opened it
+        orders = future.result()
+        ```
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._cond = threading.Condition()
+        # priority -> owner -> queued jobs, owners are taken round-robin (ref. _pop_job)
+        self._queues: dict[str, OrderedDict[Hashable, deque[Job]]] = {priority: OrderedDict() for priority in PRIORITIES}
+        self._queued_by_tag: dict[Hashable, list[Job]] = {}    # the queued jobs with a tag, for promote() and joining
+        self._workers: list[threading.Thread] = []
+        self.stats = {
+            'submitted': {priority: 0 for priority in PRIORITIES},
+            'promoted': 0,
+            'joined': 0,
+        }
+
+    def submit(self, fn: Callable, *args, priority: str = 'visible', owner: Hashable = None,
+               tag: Hashable = None, **kwargs) -> concurrent.futures.Future:
+        """
+            queue fn(*args, **kwargs), return a future of its result
+            owner: jobs of different owners in the same priority are run round-robin
+            tag: for promote(), and a call identical to a queued job with the same tag joins it (ref. the module doc)
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority}, must be one of {PRIORITIES}")
+        with self._cond:
+            for queued in self._queued_by_tag.get(tag, ()):
+                if queued.fn == fn and queued.args == args and queued.kwargs == kwargs and not queued.future.cancelled():
+                    if PRIORITIES.index(priority) < PRIORITIES.index(queued.priority):
+                        self._requeue(queued, priority)
+                    self.stats['joined'] += 1
+                    return queued.future
+            job = Job(fn, args, kwargs, concurrent.futures.Future(), owner, tag, priority)
+            self._start_workers()
+            self._queues[priority].setdefault(owner, deque()).append(job)
+            if tag is not None:
+                self._queued_by_tag.setdefault(tag, []).append(job)
+            self.stats['submitted'][priority] += 1
+            self._cond.notify()
+        return job.future
+
+    def promote(self, tag: Hashable, priority: str = 'interactive') -> int:
+        """
+            move the queued (not yet running) jobs with `tag` to `priority`, if it is higher than their current one
+            return the number of jobs promoted
+        """
+        n_promoted = 0
+        with self._cond:
+            for job in list(self._queued_by_tag.get(tag, ())):
+                if PRIORITIES.index(priority) < PRIORITIES.index(job.priority):
+                    self._requeue(job, priority)
+                    n_promoted += 1
+            self.stats['promoted'] += n_promoted
+        return n_promoted
+
+    def _requeue(self, job: Job, priority: str):
+        "must hold self._cond, move a queued job to the back of its owner's queue in `priority`"
+        queues = self._queues[job.priority]
+        queues[job.owner].remove(job)
+        if len(queues[job.owner]) == 0:
+            del queues[job.owner]
+        job.priority = priority
+        self._queues[priority].setdefault(job.owner, deque()).append(job)
+
+    def get_queue_lengths(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                priority: sum(len(jobs) for jobs in queues.values())
+                for priority, queues in self._queues.items()
+            }
+
+    def _start_workers(self):
+        "must hold self._cond"
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f'fetch-scheduler-{len(self._workers)}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _pop_job(self) -> Job | None:
+        "must hold self._cond, take the next job of the first owner in the highest priority, None if nothing is queued"
+        for priority in PRIORITIES:
+            queues = self._queues[priority]
+            if len(queues) == 0:
+                continue
+            owner, jobs = next(iter(queues.items()))
+            job = jobs.popleft()
+            # the owner goes to the back of the line
+            del queues[owner]
+            if len(jobs) > 0:
+                queues[owner] = jobs
+            if job.tag is not None:
+                tagged = self._queued_by_tag[job.tag]
+                tagged.remove(job)
+                if len(tagged) == 0:
+                    del self._queued_by_tag[job.tag]
+            return job
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._pop_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._pop_job()
+
+            if not job.future.set_running_or_notify_cancel():
+                continue    # cancelled while queued
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
@@ -0,0 +1,289 @@
+"""
+The shared HTTP client that every fetcher should use instead of a bare `requests.get`
+
+All requests go through one `requests.Session`, which keeps a pool of keep-alive connections
+per host (api.warframe.market, drops.warframestat.us, content.warframe.com, ...), so a bulk
+prepare reuses a handful of warm connections instead of doing a TCP+TLS handshake per request.
+
+The session is thread-safe for our usage (urllib3's pools are), so the CLI, the fetch engine's
+threads and the server tasks can all share it.
+
+Every request also goes through a process-wide, per-host rate limiter (a token bucket), so all
+callers together stay under e.g. warframe.market's request limit instead of each caller
+hammering the API and retrying. A 429 / 503 pauses that host for everyone (for Retry-After if given).
+
+Big, rarely changing payloads (the item catalog, drop tables, ...) can be fetched with cached_get,
+which keeps them on disk and revalidates them with If-None-Match / If-Modified-Since, so a warm
+restart costs a 304 (or nothing at all within the endpoint's TTL).
+"""
+import threading
+import time
+import email.utils
+import datetime
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+from typing import *
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
+
+# sent with every request, can be overridden per request by giving headers=...
+DEFAULT_HEADERS = {
+    'User-agent': USER_AGENT,
+    'Platform': 'pc',
+    'Language': 'en',
+}
+
+POOL_CONNECTIONS = 8    # how many hosts we keep a connection pool for
+POOL_MAXSIZE = 16       # how many keep-alive connections we keep per host, should be >= the fetch engine's in flight limit
+
+# host -> (requests per second, burst size), hosts not in here are not rate limited
+# warframe.market asks for at most 3 requests per second
+RATE_LIMITS = {
+    'api.warframe.market': (3, 3),
+}
+DEFAULT_THROTTLE_PAUSE = 1  # seconds to pause a host if it throttles us without telling us for how long
+
+CACHE_DIR = Path('./.cache/http')
+# url -> seconds we use the cached response without even asking the server, ref. cached_get
+# after that we revalidate, which is a cheap 304 if nothing changed
+CACHE_TTLS = {
+    'https://api.warframe.market/v2/items': 30 * 60,
+    'https://api.warframe.market/v1/tools/ducats': 5 * 60,      # updated hourly
+    'https://drops.warframestat.us/data/relics.json': 6 * 60 * 60,
+    'https://drops.warframestat.us/data/syndicates.json': 6 * 60 * 60,
+    'https://drops.warframestat.us/data/transientRewards.json': 6 * 60 * 60,
+}
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """
+        get the shared session, created on first use
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+class RateLimiter:
+    """
+        token bucket for a single host, shared by every thread
+        `rate` is None for hosts that aren't limited, but they can still be paused on 429
+    """
+    def __init__(self, rate: float | None = None, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+            block until we are allowed to send a request, return the time waited in seconds
+        """
+        waited = 0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.rate is None:
+                        return waited
+                    self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+                    self.last_refill = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float):
+        """
+            don't let anyone send a request to this host for `seconds`
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(host: str) -> RateLimiter:
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = RateLimiter(*RATE_LIMITS.get(host, (None,)))
+        return _limiters[host]
+
+# host -> counter name -> value, ref. get_stats
+_stats: dict[str, dict[str, float]] = defaultdict(lambda: {
+    'requests': 0,          # requests actually sent
+    'throttled': 0,         # responses that told us to slow down (429 / 503)
+    'retries': 0,           # retries done by the caller, ref. record_retry
+    'rate_limit_wait': 0,   # total seconds spent waiting for the rate limiter
+    'cache_hits': 0,        # cached_get served from disk without asking the server
+    'not_modified': 0,      # cached_get revalidated with a 304
+})
+_stats_lock = threading.Lock()
+
+def _add_stat(host: str, name: str, value: float = 1):
+    with _stats_lock:
+        _stats[host][name] += value
+
+def record_retry(url: str):
+    """
+        for retrying callers (i.e., retry_request) to count their retries
+    """
+    _add_stat(urlsplit(url).hostname, 'retries')
+
+def get_stats() -> dict[str, dict[str, float]]:
+    """
+        return {host: {'requests': int, 'throttled': int, 'retries': int, 'rate_limit_wait': float,
+                       'cache_hits': int, 'not_modified': int}}
+    """
+    with _stats_lock:
+        return {host: dict(counters) for host, counters in _stats.items()}
+
+def get_retry_after(r: requests.Response) -> float | None:
+    """
+        parse the Retry-After header into seconds, None if there isn't one
+        it can either be seconds or an HTTP date
+    """
+    retry_after = r.headers.get('Retry-After')
+    if retry_after is None:
+        return None
+    try:
+        return max(0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_date = email.utils.parsedate_to_datetime(retry_after)
+        return max(0, (retry_date - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+        requests.get, but with the shared session and the host's rate limit
+        if we get throttled, the host is paused for every caller before this returns,
+        so the caller can just retry
+    """
+    host = urlsplit(url).hostname
+    limiter = get_rate_limiter(host)
+    waited = limiter.acquire()
+
+    r = get_session().get(url, **kwargs)
+
+    _add_stat(host, 'requests')
+    if waited > 0:
+        _add_stat(host, 'rate_limit_wait', waited)
+    if r.status_code in [429, 503]:
+        retry_after = get_retry_after(r)
+        _add_stat(host, 'throttled')
+        limiter.pause(retry_after if retry_after is not None else DEFAULT_THROTTLE_PAUSE)
+    return r
+
+@dataclass
+class CachedResponse:
+    """
+        a response served from the disk cache
+        looks enough like requests.Response for our callers (i.e., has status_code, content, url and headers)
+    """
+    url: str
+    status_code: int
+    content: bytes
+    headers: dict[str, str]
+
+_cache_lock = threading.Lock()
+
+def _get_cache_paths(url: str) -> tuple[Path, Path]:
+    """
+        return (meta path, body path) for the url
+    """
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return CACHE_DIR / f'{key}.json', CACHE_DIR / f'{key}.body'
+
+def _write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def _read_cache(url: str) -> tuple[dict, bytes] | None:
+    meta_path, body_path = _get_cache_paths(url)
+    try:
+        with _cache_lock:
+            return json.loads(meta_path.read_bytes()), body_path.read_bytes()
+    except (OSError, ValueError):
+        return None
+
+def _write_cache(url: str, meta: dict, body: bytes | None = None):
+    meta_path, body_path = _get_cache_paths(url)
+    try:
+        with _cache_lock:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            if body is not None:
+                _write_atomic(body_path, body)
+            _write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+    except OSError as e:
+        print(f'[http_client] failed to write cache for {url}: {e}')
+
+def cached_get(url: str, ttl: float | None = None, **kwargs) -> requests.Response | CachedResponse:
+    """
+        get(), but the response body is cached on disk (along with its ETag / Last-Modified)
+        - if the cached response is younger than `ttl` seconds (default: CACHE_TTLS[url], or 0),
+          return it without any request
+        - else revalidate with If-None-Match / If-Modified-Since, and return the cached response on 304
+        - else it is a normal request, and a 200 gets cached
+
+        a cached response is returned as a CachedResponse with status_code 200
+        only use this for GETs whose response only depends on the URL
+    """
+    if ttl is None:
+        ttl = CACHE_TTLS.get(url, 0)
+    host = urlsplit(url).hostname
+    cached = _read_cache(url)
+
+    if cached is not None:
+        meta, body = cached
+        if time.time() - meta['fetched_at'] < ttl:
+            _add_stat(host, 'cache_hits')
+            return CachedResponse(url, 200, body, meta['headers'])
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if meta['headers'].get('ETag'):
+            headers['If-None-Match'] = meta['headers']['ETag']
+        if meta['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+        kwargs['headers'] = headers
+
+    r = get(url, **kwargs)
+
+    if r.status_code == 304 and cached is not None:
+        _add_stat(host, 'not_modified')
+        meta['fetched_at'] = time.time()
+        _write_cache(url, meta)
+        return CachedResponse(url, 200, body, meta['headers'])
+    if r.status_code == 200:
+        _write_cache(url, {
+            'url': url,
+            'fetched_at': time.time(),
+            'headers': {k: r.headers[k] for k in ['ETag', 'Last-Modified', 'Content-Type'] if k in r.headers},
+        }, r.content)
+    return r
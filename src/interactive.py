@@ -1,7 +1,7 @@
 from typing import *
 import prompt_toolkit
 from prompt_toolkit import prompt, print_formatted_text
-from prompt_toolkit.completion import WordCompleter, CompleteEvent
+from prompt_toolkit.completion import WordCompleter, CompleteEvent, Completer, Completion
 from prompt_toolkit.styles import Style
 from prompt_toolkit.document import Document
 from joblib import Parallel, delayed
@@ -14,6 +14,7 @@ import operator
 
 from . import warframe_market as wfm
 from . import util
+from .search_index import NameIndex
 from .data.syndicate_data import additional_syndicates
 from .data.relic_data import relic_data_map, relic_set_map
 
@@ -26,7 +27,7 @@ HTML = lambda text: prompt_toolkit.HTML(text.replace('&', '&amp;'))
 
 # oracle price function: given oracle and any other argument, return price
 OraclePriceFunction = Callable[[wfm.PriceOracle, Any], float]
-default_oracle_price_fn: OraclePriceFunction = lambda price_oracle, *args, **kwargs: price_oracle.get_oracle_price_48hrs(*args, **kwargs)
+default_oracle_price_fn: OraclePriceFunction = wfm.ORACLE_PRICE_48HRS_SPEC.evaluate   # i.e., get_oracle_price_48hrs
 
 def resolve_item_type(market_item: wfm.MarketItem, default: str = ''):
     """
@@ -44,10 +45,25 @@ def resolve_item_type(market_item: wfm.MarketItem, default: str = ''):
             return type_map[tag]
     return default
 
-def get_item_info(market_item_ls: list[wfm.MarketItem], do_prepare: bool = True, oracle_price_fn: OraclePriceFunction = default_oracle_price_fn):
+def get_item_info(market_item_ls: list[wfm.MarketItem], do_prepare: bool = True, oracle_price_fn: OraclePriceFunction = default_oracle_price_fn,
+                  oracle_spec: wfm.OracleSpec | None = None):
+    """
+    oracle_spec: if given, the prices are computed for all items at once with it (ref. wfm.batch_oracle_prices)
+                 instead of calling oracle_price_fn per item. the default oracle_price_fn does this by default
+    """
     if do_prepare:
         wfm.prepare_market_items(market_item_ls)
 
+    if oracle_spec is None and oracle_price_fn is default_oracle_price_fn:
+        oracle_spec = wfm.ORACLE_PRICE_48HRS_SPEC
+    if oracle_spec is not None:
+        arcane_ls = [item for item in market_item_ls if 'arcane_enhancement' in item.tags]
+        batch_plat_ls = wfm.batch_oracle_prices(market_item_ls, oracle_spec).tolist()
+        batch_rmax_plat_map = dict(zip(
+            [item.item_name for item in arcane_ls],
+            wfm.batch_oracle_prices(arcane_ls, oracle_spec, [[item.mod_max_rank] for item in arcane_ls]).tolist(),
+        ))
+
     name_ls = []
     type_ls = []
     plat_ls = []
@@ -57,15 +73,18 @@ def get_item_info(market_item_ls: list[wfm.MarketItem], do_prepare: bool = True,
     url_ls = []
     rmax_plat_ls = []
 
-    for item in market_item_ls:
+    for i, item in enumerate(market_item_ls):
         name_ls.append(item.item_name)
         type_ls.append(resolve_item_type(item))
-        plat_ls.append(oracle_price_fn(item.price))
+        plat_ls.append(batch_plat_ls[i] if oracle_spec is not None else oracle_price_fn(item.price))
         vol_ls.append(item.statistic.get_volume_for_last_hours(48))
         url_ls.append(item.get_wfm_url())
 
         if 'arcane_enhancement' in item.tags:
-            rmax_plat_ls.append(oracle_price_fn(item.price, mod_rank_range=[item.mod_max_rank]))
+            rmax_plat_ls.append(
+                batch_rmax_plat_map[item.item_name] if oracle_spec is not None
+                else oracle_price_fn(item.price, mod_rank_range=[item.mod_max_rank])
+            )
             plat_times21_ls.append(plat_ls[-1] * 21)
             rmax_plat_div21_ls.append(rmax_plat_ls[-1] / 21)
         else:
@@ -231,26 +250,37 @@ def print_transient_reward_info(reward_data):
         print(f'\nRotation {rotation}:')
         print_item_info([market_map[r['item_name']] for r in rotation_rewards if r['item_name'] in market_map], do_prepare=False)
 
+class NameIndexCompleter(Completer):
+    """
+    like WordCompleter(names, ignore_case=True, sentence=True, match_middle=True), but looks the names up
+    in a NameIndex instead of checking every one of them, and the best matches come first
+    """
+    def __init__(self, index: NameIndex, extra_words: list[str] | None = None):
+        self.index = index
+        self.extra_words = list(extra_words or [])
+
+    def get_completions(self, document: Document, complete_event: CompleteEvent):
+        text = document.text_before_cursor
+        for word in self.index.suggest(text, limit=None) + [w for w in self.extra_words if text.lower() in w.lower()]:
+            yield Completion(word, start_position=-len(text))
+
 def item_function():
-    item_selecter = WordCompleter(list(market_map.keys()) + ['Quit', 'quit'], 
-                                  ignore_case=True, sentence=True, match_middle=True)
+    item_index = NameIndex(market_map)
+    item_selecter = NameIndexCompleter(item_index, ['Quit', 'quit'])
     
     while True:
         text = prompt('Enter item name (will match ALL items shown below. type "Quit" to quit): ', completer=item_selecter)
         if text in ['Quit', 'quit']:
             break
 
-        completion_ls = list(item_selecter.get_completions(
-            Document(text), CompleteEvent(completion_requested=True)
-        ))
-        item_name_set = set(map(lambda c: c.text, completion_ls)) - {'Quit', 'quit'}
-        if len(item_name_set) == 0:
+        item_name_ls = item_index.search(text)
+        if len(item_name_ls) == 0:
             print_formatted_text(HTML('Item not found.'))
             continue
 
         print_item_info([
             market_map[item_name]
-            for item_name in item_name_set
+            for item_name in item_name_ls
         ])
 
 def syndicate_function():
@@ -395,14 +425,20 @@ def find_best_trade_function():
     item_selecter = WordCompleter(list(market_map.keys()) + ['Quit', 'quit', *command_list], 
                                   ignore_case=True, sentence=True, match_middle=True)
     
-    users: dict[str, wfm.User] = {} # user_id -> User, note that User may not be prepared
     item_names: list[str] = [] # item name
-    current_user_orders: dict[str, list[wfm.Orders.Order]] = {} # user id -> list of orders, you should maintain this and use this as your main source of order
+    # user id -> {item name: (platinum, quantity, mod_rank)}, each user's cheapest in-game sell offer for each item
+    # of the query, looked up in wfm.user_registry (ref. update_user_offers) instead of scanning the orders
+    current_user_offers: dict[str, dict[str, tuple[int, int, int | None]]] = {}
     item_oracle_price: dict[str, float] = {}
 
+    def update_user_offers():
+        """ look up the sellers of the current items again, ref. wfm.UserRegistry.get_sell_offers """
+        nonlocal current_user_offers
+        current_user_offers = wfm.user_registry.get_sell_offers(item_names)
+
     def add_items(item_texts: list[str]):
         """ add a list of items to the current query, recalculate best trades and print"""
-        nonlocal item_names, item_oracle_price, users, current_user_orders, item_selecter
+        nonlocal item_names, item_oracle_price, item_selecter
 
         for index, item_text in enumerate(item_texts):
             print_formatted_text(HTML(f'({index+1}/{len(item_texts)}) <b>{item_text}</b>'))
@@ -427,29 +463,16 @@ def find_best_trade_function():
                 continue
             
             market_item = market_map[item_name]
-            market_item.prepare()
+            market_item.prepare()   # indexes its sellers in wfm.user_registry
 
             item_names.append(item_name)
             item_oracle_price[item_name] = market_item.price.get_oracle_price_48hrs()
 
-            # find all sellers for this item
-            in_game_orders = [order for order in market_item.orders.orders if order.is_sell and order.visible and order.is_ingame]
-            new_users = []
-            for order in in_game_orders:
-                if order.user_id not in users:
-                    user = wfm.User(user_id=order.user_id)
-                    new_users.append(user)
-                    current_user_orders[order.user_id] = [order]
-                else:
-                    current_user_orders[order.user_id].append(order)
-
-            # wfm.fetch_users_data(new_users)
-            for user in new_users:
-                users[user.user_id] = user
+        update_user_offers()
 
     def delete_item(item_text: str):
         """ delete an item from the current query, recalculate best trades and print"""
-        nonlocal item_names, item_oracle_price, users, current_user_orders, item_selecter
+        nonlocal item_names, item_oracle_price, item_selecter
 
         if item_text not in item_names:
             print_formatted_text(HTML(f'Item "{item_text}" not in current query.'))
@@ -457,31 +480,20 @@ def find_best_trade_function():
         
         item_names.remove(item_text)
         del item_oracle_price[item_text]
-
-        # recalculate user orders
-        for user_id in list(current_user_orders.keys()):
-            user_orders = current_user_orders[user_id]
-            user_orders = [order for order in user_orders if market_id_map[order.item_id].item_name != item_text]
-            if len(user_orders) == 0:
-                del current_user_orders[user_id]
-                del users[user_id]
-            else:
-                current_user_orders[user_id] = user_orders
+        update_user_offers()
 
     def calculate_best_trades(best_n: int | None = 10, output_file: Path = None, ignore_single_trade_user: bool = False):
         """ calculate and print best trades for current items """
         # calculates best trade
         user_sort = []
-        for user_id in current_user_orders:
-            user_orders = current_user_orders[user_id]
-            if len(user_orders) <= 1 and ignore_single_trade_user:
+        for user_id, offers in current_user_offers.items():
+            if len(offers) <= 1 and ignore_single_trade_user:
                 continue
             total_deviate_price = 0
-            for order in user_orders:
-                item_name = market_id_map[order.item_id].item_name
+            for item_name, (platinum, _, _) in offers.items():
                 oracle_price = item_oracle_price[item_name]
-                total_deviate_price += (order.platinum - oracle_price)
-            user_sort.append((len(user_orders), total_deviate_price, user_id))
+                total_deviate_price += (platinum - oracle_price)
+            user_sort.append((len(offers), total_deviate_price, user_id))
         
         # print the best 10
         user_sort = sorted(user_sort, key=lambda x: (-x[1]), reverse=True)
@@ -496,11 +508,6 @@ def find_best_trade_function():
             for i in user_sort
         ]
 
-        cur_users = [users[pu['user_id']] for pu in print_users if users[pu['user_id']].user_ingame_name is None]
-        wfm.fetch_users_data(cur_users)
-        for user in cur_users:
-            users[user.user_id] = user
-
         def pd(deviation_value: float, is_background = False) -> str:
             """ print deviation: price - oracle price """
             def get_tags(color, is_background):
@@ -522,13 +529,13 @@ def find_best_trade_function():
             print_formatted_text(HTML(f'Saving best trades to file: <b><ansigreen>{str(output_file)}</ansigreen></b>'), file=sys.stdout)
 
         for print_user in print_users:
-            user = users[print_user['user_id']]
+            user = wfm.user_registry.users[print_user['user_id']]
+            offers = current_user_offers[user.id]
             
-            print_formatted_text(HTML(f'User: <b><ansiyellow>{user.user_ingame_name}</ansiyellow></b> ({len(current_user_orders[user.user_id])} items, deviation {pd(print_user["total_deviate_price"], True)} plat) <ansigray>(https://warframe.market/profile/{user.user_slug})</ansigray>'), file=file)
-            for order in current_user_orders[user.user_id]:
-                item_name = market_id_map[order.item_id].item_name
+            print_formatted_text(HTML(f'User: <b><ansiyellow>{user.ingame_name}</ansiyellow></b> ({len(offers)} items, deviation {pd(print_user["total_deviate_price"], True)} plat) <ansigray>(https://warframe.market/profile/{user.slug})</ansigray>'), file=file)
+            for item_name, (platinum, _, _) in offers.items():
                 oracle_price = item_oracle_price[item_name]
-                print_formatted_text(HTML(f'    - {item_name}: {order.platinum} plat ({oracle_price:.2f}{pd(order.platinum - oracle_price)})'), file=file)
+                print_formatted_text(HTML(f'    - {item_name}: {platinum} plat ({oracle_price:.2f}{pd(platinum - oracle_price)})'), file=file)
         
         if output_file is not None:
             print_formatted_text(HTML(f'Current query: "<b><ansicyan>{" + ".join(item_names)}</ansicyan></b>"'), file=file)
@@ -538,14 +545,15 @@ def find_best_trade_function():
     def construct_user_trade_message(user_in_game_name: str):
         # find the user with that in game name
         target_user = None
-        for user in users.values():
-            if user.user_ingame_name == user_in_game_name:
+        for user_id in current_user_offers:
+            user = wfm.user_registry.users[user_id]
+            if user.ingame_name == user_in_game_name:
                 target_user = user
                 break
         if target_user is None:
             print_formatted_text(HTML('User not found.'))
             return
-        cur_orders = current_user_orders[target_user.user_id]
+        cur_offers = current_user_offers[target_user.id]
 
         # print price for this user again
         def pd(deviation_value: float, is_background = False) -> str:
@@ -563,40 +571,36 @@ def find_best_trade_function():
 
             return f'{start_tag}{deviation_value:+.2f}{end_tag}'
 
-        user = users[target_user.user_id]
         deviation = 0
-        for order in current_user_orders[user.user_id]:
-            item_name = market_id_map[order.item_id].item_name
+        for item_name, (platinum, _, _) in cur_offers.items():
             oracle_price = item_oracle_price[item_name]
-            deviation += order.platinum - oracle_price
-        print_formatted_text(HTML(f'User: <b><ansiyellow>{user.user_ingame_name}</ansiyellow></b> ({len(current_user_orders[user.user_id])} items, deviation {pd(deviation, True)} plat) <ansigray>(https://warframe.market/profile/{user.user_slug})</ansigray>'))
-        for order in current_user_orders[user.user_id]:
-            item_name = market_id_map[order.item_id].item_name
+            deviation += platinum - oracle_price
+        print_formatted_text(HTML(f'User: <b><ansiyellow>{target_user.ingame_name}</ansiyellow></b> ({len(cur_offers)} items, deviation {pd(deviation, True)} plat) <ansigray>(https://warframe.market/profile/{target_user.slug})</ansigray>'))
+        for item_name, (platinum, _, _) in cur_offers.items():
             oracle_price = item_oracle_price[item_name]
-            print_formatted_text(HTML(f'    - {item_name}: {order.platinum} plat ({oracle_price:.2f}{pd(order.platinum - oracle_price)})'))
+            print_formatted_text(HTML(f'    - {item_name}: {platinum} plat ({oracle_price:.2f}{pd(platinum - oracle_price)})'))
     
 
         # /w DouaOuaTari Hi! I want to buy: "Synoid Gammacor" for 29 platinum. (warframe.market)
         
-        message = f'/w {target_user.user_ingame_name} Hi! I want to buy: '
+        message = f'/w {target_user.ingame_name} Hi! I want to buy: '
         item_message_ls = [
-            f'"{market_id_map[order.item_id].item_name}" for {order.platinum} platinum'
-            for order in cur_orders
+            f'"{item_name}" for {platinum} platinum'
+            for item_name, (platinum, _, _) in cur_offers.items()
         ]
         message += ', '.join(item_message_ls)
         message += ', with a total of '
-        total_plat = sum([order.platinum for order in cur_orders])
-        equation = '+'.join([str(order.platinum) for order in cur_orders])
+        total_plat = sum([platinum for platinum, _, _ in cur_offers.values()])
+        equation = '+'.join([str(platinum) for platinum, _, _ in cur_offers.values()])
         message += f'{equation} = {total_plat} platinum. (warframe.market)'
-        print_formatted_text(HTML(f'The profile page is: <b><ansicyan>https://warframe.market/profile/{target_user.user_slug}</ansicyan></b>'))
+        print_formatted_text(HTML(f'The profile page is: <b><ansicyan>https://warframe.market/profile/{target_user.slug}</ansicyan></b>'))
         print_formatted_text(HTML(f'The message is: <b><ansiyellow>{message}</ansiyellow></b>'))
     
     def refresh_orders():
-        nonlocal item_names, item_oracle_price, users, current_user_orders, item_selecter
+        nonlocal item_names, item_oracle_price, current_user_offers, item_selecter
         old_item_names = item_names.copy()
         item_names = []
-        users = {}
-        current_user_orders = {}
+        current_user_offers = {}
         item_oracle_price = {}
         add_items(old_item_names)
         
@@ -632,7 +636,7 @@ def find_best_trade_function():
             break
         
         if text == TRADE_MESSAGE_COMMAND:
-            user_names = [u.user_ingame_name for u in users.values() if u.user_ingame_name is not None]
+            user_names = [wfm.user_registry.users[user_id].ingame_name for user_id in current_user_offers]
             if len(user_names) == 0:
                 print_formatted_text(HTML('No users available. Please add some items first to fetch users.'))
                 continue
@@ -688,8 +692,7 @@ def find_best_trade_function():
 
         if text == CLEAR_COMMAND:            
             item_names = []
-            users = {}
-            current_user_orders = {}
+            current_user_offers = {}
             item_oracle_price = {}
             continue
 
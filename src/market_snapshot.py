@@ -0,0 +1,284 @@
+"""
+The market snapshot: the item catalog, the ducat data and every prepared item's components on disk,
+so the server can serve right after boot (and keep serving when warframe.market is down), ref. server.startup
+
+A snapshot is a directory under SNAPSHOT_DIR:
+- meta.json: {'version', 'created', 'market_data_update_date'}, a snapshot of another version is ignored
+- data.json: the catalog (MarketItem.to_market_json()), ducat data, users, and for each prepared item,
+  its component datetimes, info, and where its rows are in the arrays below
+- stat_{timeframe}_{column}.npy: the statistic columns (ref. StatSeries) of every item, one after another,
+  read memory-mapped, so an item's StatSeries are views that are only paged in when used
+- orders_{column}.npy: the order columns (ref. Orders) of every item, one after another
+
+SNAPSHOT_DIR / 'CURRENT' names the latest complete snapshot, it is only replaced (atomically) once a new
+snapshot is fully written, so a reader never sees a half written one
+writers (and readers) take SNAPSHOT_DIR / 'LOCK' (ref. _write_locked), so several processes (e.g., the reloader's)
+can share it
+
+```
+path = write_snapshot(market_items, ducat_data, market_data_update_date)
+snapshot = read_snapshot()
+for item in snapshot.market_items:
+    prepared_data = snapshot.get_prepared_data(item.id)
+    if prepared_data is not None:
+        item.prepare(prepared_data)
+```
+"""
+import contextlib
+import datetime
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+from . import warframe_market as wfm
+
+SNAPSHOT_DIR = Path('./.cache/snapshot')
+SNAPSHOT_VERSION = 1     # bump whenever the layout changes
+
+STAT_TIMEFRAMES = ('48hours', '90days')     # of statistics_closed, the opened ones are never read
+ORDER_COLUMNS = {
+    'is_sell': bool,
+    'visible': bool,
+    'platinum': np.int64,
+    'quantity': np.int64,
+    'mod_rank': np.int64,   # NO_MOD_RANK for None
+    'user': np.int64,       # index into data.json's users
+    'status': np.int8,      # index into data.json's statuses, the user's status when the orders were fetched
+}
+NO_MOD_RANK = -1
+
+_write_lock = threading.Lock()
+
+@contextlib.contextmanager
+def _write_locked(directory: Path):
+    """
+        hold the write lock of directory, across threads and processes (a lock file in it)
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    with _write_lock, open(directory / 'LOCK', 'a+b') as lock_file:
+        if os.name == 'nt':
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+@dataclass
+class Snapshot:
+    path: Path
+    created: datetime.datetime
+    market_data_update_date: datetime.datetime | None
+    market_items: list[wfm.MarketItem]
+    ducat_data: dict
+    user_registry: wfm.UserRegistry     # of market_items (ref. MarketItem.user_registry), a new one per snapshot
+    _users: list[list] = field(repr=False)
+    _statuses: list[str] = field(repr=False)
+    _items: dict[str, dict] = field(repr=False)    # item id -> where its data is, ref. write_snapshot
+    _arrays: dict[str, np.ndarray] = field(repr=False)
+
+    @property
+    def prepared_item_ids(self) -> list[str]:
+        return list(self._items)
+
+    def get_prepared_data(self, item_id: str) -> dict[str, Any] | None:
+        """
+            the item's prepare data (ref. MarketItem.get_prepared_data) as it was when the snapshot was written,
+            None if it wasn't prepared
+        """
+        entry = self._items.get(item_id)
+        if entry is None:
+            return None
+        prepared_data = {'component_datetime': {
+            component: datetime.datetime.fromisoformat(dt) for component, dt in entry['component_datetime'].items()
+        }}
+        if 'orders' in entry:
+            prepared_data['orders'] = self._get_orders(*entry['orders'])
+        if 'statistic' in entry:
+            prepared_data['statistic'] = self._get_statistic(entry['statistic'])
+        if 'info' in entry:
+            prepared_data.update(entry['info'])
+        return prepared_data
+
+    def _get_orders(self, start: int, stop: int, item_id: str | None) -> wfm.Orders:
+        columns = {column: self._arrays[f'orders_{column}'][start:stop].tolist() for column in ORDER_COLUMNS}
+        rows = []
+        for is_sell, visible, platinum, quantity, mod_rank, user, status in zip(*columns.values()):
+            user_id, reputation, _, ingame_name, slug = self._users[user]
+            rows.append((
+                item_id, is_sell, visible, platinum, quantity, None if mod_rank == NO_MOD_RANK else mod_rank,
+                (user_id, reputation, self._statuses[status], ingame_name, slug),
+            ))
+        return wfm.Orders.from_rows(rows, self.user_registry)
+
+    def _get_statistic(self, entry: dict) -> wfm.Statistic:
+        series = {}
+        for timeframe in STAT_TIMEFRAMES:
+            series['statistics_closed', timeframe] = wfm.StatSeries.from_ranks({
+                mod_rank: {
+                    column: self._arrays[f'stat_{timeframe}_{column}'][start:stop]
+                    for column in ['t', *wfm.StatSeries.COLUMNS]
+                }
+                for mod_rank, start, stop in entry[timeframe]
+            })
+        basis_time = None if entry['basis_time'] is None else datetime.datetime.fromisoformat(entry['basis_time'])
+        return wfm.Statistic.from_series(series, basis_time=basis_time)
+
+def _isoformat(dt: datetime.datetime | None) -> str | None:
+    return None if dt is None else dt.isoformat()
+
+def write_snapshot(market_items: list[wfm.MarketItem], ducat_data: dict,
+                   market_data_update_date: datetime.datetime | None, directory: Path = SNAPSHOT_DIR) -> Path:
+    """
+        write a new snapshot and make it the current one, remove the older ones
+        return the snapshot's path
+    """
+    with _write_locked(directory):
+        created = datetime.datetime.now(datetime.timezone.utc)
+        path = directory / created.strftime('%Y%m%dT%H%M%S%f')
+        path.mkdir(parents=True, exist_ok=True)
+
+        users: dict[str, int] = {}      # user id -> index in user_rows
+        user_rows: list[list] = []
+        statuses: dict[str, int] = {}
+        order_columns: dict[str, list] = {column: [] for column in ORDER_COLUMNS}
+        stat_columns: dict[str, list[np.ndarray]] = {
+            f'stat_{timeframe}_{column}': [] for timeframe in STAT_TIMEFRAMES for column in ['t', *wfm.StatSeries.COLUMNS]
+        }
+        stat_lengths = {timeframe: 0 for timeframe in STAT_TIMEFRAMES}
+        items: dict[str, dict] = {}
+
+        for item in market_items:
+            prepared_data = item.get_prepared_data()
+            if len(prepared_data['component_datetime']) == 0:
+                continue
+            entry = items[item.id] = {'component_datetime': {
+                component: _isoformat(dt) for component, dt in prepared_data['component_datetime'].items()
+            }}
+
+            orders: wfm.Orders | None = prepared_data.get('orders')
+            if orders is not None:
+                start = len(order_columns['platinum'])
+                for _, is_sell, visible, platinum, quantity, mod_rank, user in orders.to_rows():
+                    if user[0] not in users:
+                        users[user[0]] = len(user_rows)
+                        user_rows.append(list(user))
+                    order_columns['is_sell'].append(is_sell)
+                    order_columns['visible'].append(visible)
+                    order_columns['platinum'].append(platinum)
+                    order_columns['quantity'].append(quantity)
+                    order_columns['mod_rank'].append(NO_MOD_RANK if mod_rank is None else mod_rank)
+                    order_columns['user'].append(users[user[0]])
+                    order_columns['status'].append(statuses.setdefault(user[2], len(statuses)))
+                entry['orders'] = [start, len(order_columns['platinum']), orders.item_id]
+
+            statistic: wfm.Statistic | None = prepared_data.get('statistic')
+            if statistic is not None:
+                entry['statistic'] = {'basis_time': _isoformat(statistic.basis_time)}
+                for timeframe in STAT_TIMEFRAMES:
+                    ranks = []
+                    for mod_rank, columns in statistic.get_series('statistics_closed', timeframe).ranks.items():
+                        start = stat_lengths[timeframe]
+                        stat_lengths[timeframe] += len(columns['t'])
+                        ranks.append([mod_rank, start, stat_lengths[timeframe]])
+                        for column, values in columns.items():
+                            stat_columns[f'stat_{timeframe}_{column}'].append(values)
+                    entry['statistic'][timeframe] = ranks
+
+            if 'info' in prepared_data['component_datetime']:
+                entry['info'] = {attribute: prepared_data[attribute] for attribute in wfm.MarketItem.COMPONENT_ATTRIBUTES['info']}
+
+        for column, dtype in ORDER_COLUMNS.items():
+            np.save(path / f'orders_{column}.npy', np.array(order_columns[column], dtype=dtype))
+        for name, parts in stat_columns.items():
+            dtype = np.int64 if name.endswith(('_t', '_volume')) else np.float64
+            np.save(path / f'{name}.npy', np.concatenate(parts).astype(dtype, copy=False) if parts else np.empty(0, dtype=dtype))
+
+        data = {
+            'catalog': [item.to_market_json() for item in market_items],
+            'ducat_data': ducat_data,
+            'users': user_rows,
+            'statuses': list(statuses),
+            'items': items,
+        }
+        (path / 'data.json').write_text(json.dumps(data), encoding='utf-8')
+        (path / 'meta.json').write_text(json.dumps({
+            'version': SNAPSHOT_VERSION,
+            'created': _isoformat(created),
+            'market_data_update_date': _isoformat(market_data_update_date),
+        }), encoding='utf-8')
+
+        # only now it becomes the current one
+        tmp_path = directory / f'CURRENT.{threading.get_ident()}.tmp'
+        tmp_path.write_text(path.name, encoding='utf-8')
+        os.replace(tmp_path, directory / 'CURRENT')
+
+        for old_path in directory.iterdir():
+            # the names are the creation times, so only the ones older than the current one, never one
+            # that another writer may be about to make current
+            if old_path.is_dir() and old_path.name < path.name:
+                # may fail (e.g., still memory-mapped on windows), it is removed next time then
+                shutil.rmtree(old_path, ignore_errors=True)
+        return path
+
+def read_snapshot(directory: Path = SNAPSHOT_DIR) -> Snapshot | None:
+    """
+        the current snapshot, None if there is none (or it is of another version, or can't be read)
+        only the json is read here, the arrays are memory-mapped
+    """
+    if not (directory / 'CURRENT').exists():
+        return None
+    # a writer removes the older snapshots, so not while we are reading this one
+    # (once memory-mapped, the arrays stay readable even if it is removed, except on windows where it can't be)
+    with _write_locked(directory):
+        try:
+            path = directory / (directory / 'CURRENT').read_text(encoding='utf-8').strip()
+            meta = json.loads((path / 'meta.json').read_text(encoding='utf-8'))
+            if meta.get('version') != SNAPSHOT_VERSION:
+                print(f'[snapshot] ignoring {path}, version {meta.get("version")} != {SNAPSHOT_VERSION}')
+                return None
+
+            data = json.loads((path / 'data.json').read_text(encoding='utf-8'))
+            arrays = {
+                array_path.stem: np.load(array_path, mmap_mode='r')
+                for array_path in path.glob('*.npy')
+            }
+            user_registry = wfm.UserRegistry()
+            return Snapshot(
+                path=path,
+                created=datetime.datetime.fromisoformat(meta['created']),
+                market_data_update_date=(
+                    None if meta['market_data_update_date'] is None
+                    else datetime.datetime.fromisoformat(meta['market_data_update_date'])
+                ),
+                market_items=[
+                    wfm.MarketItem(market_json, api_version='v2', registry=user_registry) for market_json in data['catalog']
+                ],
+                ducat_data=data['ducat_data'],
+                user_registry=user_registry,
+                _users=data['users'],
+                _statuses=data['statuses'],
+                _items=data['items'],
+                _arrays=arrays,
+            )
+        except (OSError, ValueError, KeyError) as e:
+            # truncated, removed while reading, ..., the caller just goes without it
+            print(f'[snapshot] ignoring the snapshot in {directory}: {e!r}')
+            return None
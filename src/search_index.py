@@ -0,0 +1,110 @@
+"""
+The name index: case-insensitive substring search over item names without scanning every name
+
+Every name is indexed under each of its (lowercased) n-grams up to GRAM: a query of at most GRAM characters
+is answered by its own postings, a longer one by intersecting the postings of its GRAM-grams (the rarest
+first), and only the few candidates left are checked with `in`.
+Build one per catalog, e.g., server.get_name_index builds one per market state.
+
+- search(text): the names containing text, in the order they were given
+- search_any(text): the same, for any of the "+" separated terms, e.g., "volt + voruna"
+- suggest(text, limit): the names containing text, the names starting with it first, then the ones with a
+  word starting with it, then the rest (shorter names first within each)
+"""
+import heapq
+from typing import *
+
+GRAM = 3
+
+class NameIndex:
+    """
+        ```
+        index = NameIndex(market_map)
+        index.search_any('volt prime + voruna')     # ['Volt Prime Blueprint', ..., 'Voruna Prime Set', ...]
+        index.suggest('arcane en', limit=5)         # ['Arcane Energize', ...]
+        ```
+    """
+    def __init__(self, names: Iterable[str]):
+        self.names = list(dict.fromkeys(names))
+        self._lower_names = [name.lower() for name in self.names]
+        self._postings: dict[str, set[int]] = {}    # n-gram -> indices of the names that have it
+        # the same, only for the n-grams at the start of the name / of any word, for suggest()
+        self._name_start_postings: dict[str, set[int]] = {}
+        self._word_start_postings: dict[str, set[int]] = {}
+        for i, lower_name in enumerate(self._lower_names):
+            for n in range(1, GRAM + 1):
+                for start in range(len(lower_name) - n + 1):
+                    gram = lower_name[start:start + n]
+                    self._postings.setdefault(gram, set()).add(i)
+                    if start == 0:
+                        self._name_start_postings.setdefault(gram, set()).add(i)
+                    if start == 0 or lower_name[start - 1] == ' ':
+                        self._word_start_postings.setdefault(gram, set()).add(i)
+        # i -> where the name is when sorted shorter first (then alphabetically), for suggest()
+        self._suggest_order = [0] * len(self.names)
+        for position, i in enumerate(sorted(range(len(self.names)), key=lambda i: (len(self._lower_names[i]), self._lower_names[i]))):
+            self._suggest_order[i] = position
+
+    def __len__(self):
+        return len(self.names)
+
+    def _search_indices(self, text: str) -> set[int] | range:
+        text = text.lower()
+        if len(text) == 0:
+            return range(len(self.names))
+        if len(text) <= GRAM:
+            return self._postings.get(text, set())
+        grams = sorted({text[start:start + GRAM] for start in range(len(text) - GRAM + 1)},
+                       key=lambda gram: len(self._postings.get(gram, ())))
+        candidates = self._postings.get(grams[0], set())
+        for gram in grams[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = candidates & self._postings.get(gram, set())
+        return {i for i in candidates if text in self._lower_names[i]}
+
+    def search(self, text: str) -> list[str]:
+        """
+            the names containing text (case-insensitive, surrounding spaces ignored), in the order they were given
+        """
+        return [self.names[i] for i in sorted(self._search_indices(text.strip()))]
+
+    def search_any(self, text: str) -> list[str]:
+        """
+            the names containing any of the "+" separated terms of text, ref. search
+        """
+        indices = set()
+        for term in text.split('+'):
+            indices.update(self._search_indices(term.strip()))
+        return [self.names[i] for i in sorted(indices)]
+
+    def suggest(self, text: str, limit: int | None = 10) -> list[str]:
+        """
+            the names containing text, best first, ref. the module doc
+            limit: at most this many, None for all of them
+        """
+        text = text.strip().lower()
+        indices = set(self._search_indices(text))
+        if len(text) == 0:
+            groups = [indices]
+        else:
+            # the names starting with text have its first GRAM characters at the start, and the same for words
+            name_start = self._name_start_postings.get(text[:GRAM], set()) & indices
+            if len(text) > GRAM:
+                name_start = {i for i in name_start if self._lower_names[i].startswith(text)}
+            word_start = (self._word_start_postings.get(text[:GRAM], set()) & indices) - name_start
+            if len(text) > GRAM:
+                word_start = {i for i in word_start if f' {text}' in self._lower_names[i]}
+            groups = [name_start, word_start, indices - name_start - word_start]
+
+        suggestions = []
+        for group in groups:
+            if limit is not None and len(suggestions) >= limit:
+                break
+            n = None if limit is None else limit - len(suggestions)
+            if n is None or n >= len(group):
+                ordered = sorted(group, key=self._suggest_order.__getitem__)
+            else:
+                ordered = heapq.nsmallest(n, group, key=self._suggest_order.__getitem__)
+            suggestions += [self.names[i] for i in ordered]
+        return suggestions
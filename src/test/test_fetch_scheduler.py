@@ -0,0 +1,111 @@
+"""
+
+$ python -m src.test.test_fetch_scheduler -v
+
+"""
+import threading
+import unittest
+
+from ..fetch_scheduler import FetchScheduler
+
+class TestFetchScheduler(unittest.TestCase):
+    def setUp(self):
+        # one worker, held busy while the test queues its jobs, so the order they run in is the order they are taken
+        self.scheduler = FetchScheduler(1)
+        self.ran: list = []
+        self.running, self.release = threading.Event(), threading.Event()
+
+        def block():
+            self.running.set()
+            self.release.wait(5)
+        self.blocker = self.scheduler.submit(block, owner='blocker')
+        self.assertTrue(self.running.wait(5))
+
+    def tearDown(self):
+        self.release.set()
+
+    def submit(self, name, **kwargs):
+        return self.scheduler.submit(self.ran.append, name, **kwargs)
+
+    def run_queued(self, *futures):
+        self.release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+    def test_priority_order(self):
+        futures = [
+            self.submit('background', priority='background'),
+            self.submit('visible', priority='visible'),
+            self.submit('interactive', priority='interactive'),
+            self.submit('visible 2', priority='visible'),
+        ]
+        self.assertEqual(self.scheduler.get_queue_lengths(), {'interactive': 1, 'visible': 2, 'background': 1})
+        self.run_queued(*futures)
+        self.assertEqual(self.ran, ['interactive', 'visible', 'visible 2', 'background'])
+
+    def test_round_robin_across_owners(self):
+        futures = [self.submit(f'a{i}', owner='a') for i in range(3)]
+        futures += [self.submit(f'b{i}', owner='b') for i in range(2)]
+        futures += [self.submit('c0', owner='c')]
+        futures += [self.submit('i0', owner='b', priority='interactive')]
+        self.run_queued(*futures)
+        # the higher priority first, then the owners take turns within a priority
+        self.assertEqual(self.ran, ['i0', 'a0', 'b0', 'c0', 'a1', 'b1', 'a2'])
+
+    def test_promote(self):
+        futures = [
+            self.submit('bulk 1', owner='bulk', priority='background'),
+            self.submit('volt orders', owner='bulk', priority='background', tag='volt'),
+            self.submit('bulk 2', owner='bulk', priority='background'),
+            self.submit('table', owner='table', priority='visible'),
+            self.submit('volt statistic', owner='bulk', priority='background', tag='volt'),
+            self.submit('volt info', owner='other', priority='visible', tag='volt'),
+        ]
+        self.assertEqual(self.scheduler.promote('volt'), 3)
+        # never demoted, and promoting to where they already are does nothing
+        self.assertEqual(self.scheduler.promote('volt', priority='background'), 0)
+        self.assertEqual(self.scheduler.stats['promoted'], 3)
+        self.run_queued(*futures)
+        self.assertEqual(self.ran, ['volt orders', 'volt info', 'volt statistic', 'table', 'bulk 1', 'bulk 2'])
+
+    def test_join_queued(self):
+        queued = self.submit('volt orders', owner='bulk', priority='background', tag='volt')
+        other = self.submit('table', owner='table', priority='visible')
+        # the same call: joins the queued one and moves it up, the owner doesn't matter
+        joined = self.submit('volt orders', owner='infobox', priority='interactive', tag='volt')
+        self.assertIs(joined, queued)
+        # a different call, the same call without a tag, or a lower priority one don't
+        different = self.submit('volt statistic', owner='infobox', priority='interactive', tag='volt')
+        untagged = self.submit('volt orders', owner='infobox', priority='interactive')
+        lower = self.submit('volt orders', owner='bulk', priority='background', tag='volt')
+        self.assertIs(lower, queued)
+        self.assertIsNot(different, queued)
+        self.assertIsNot(untagged, queued)
+        self.assertEqual(self.scheduler.stats['joined'], 2)
+
+        self.run_queued(queued, other, different, untagged)
+        self.assertEqual(self.ran, ['volt orders', 'volt statistic', 'volt orders', 'table'])
+        # once it is no longer queued, the same call is queued again
+        again = self.submit('volt orders', owner='infobox', priority='interactive', tag='volt')
+        self.assertIsNot(again, queued)
+        again.result(timeout=5)
+
+    def test_cancelled_and_failed_jobs(self):
+        cancelled = self.submit('cancelled', tag='x')
+        self.assertTrue(cancelled.cancel())
+        # a cancelled job isn't joined
+        replacement = self.submit('cancelled', tag='x')
+        self.assertIsNot(replacement, cancelled)
+        failed = self.scheduler.submit(lambda: 1 / 0)
+        after = self.submit('after')
+        self.run_queued(replacement, after)
+        self.assertEqual(self.ran, ['cancelled', 'after'])
+        with self.assertRaises(ZeroDivisionError):
+            failed.result(timeout=5)
+
+    def test_unknown_priority(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(print, priority='urgent')
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,127 @@
+"""
+
+$ python -m src.test.test_http_client -v
+
+no network: the session is replaced by a fake one
+
+"""
+import email.utils
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from .. import http_client
+from ..http_client import RateLimiter
+
+class FakeSession:
+    """
+        answers every get() with the next (status_code, body, headers) of `responses`, and records the calls
+    """
+    def __init__(self, responses: list[tuple[int, bytes, dict]]):
+        self.responses = list(responses)
+        self.calls: list[tuple[str, dict]] = []
+
+    def get(self, url, **kwargs):
+        self.calls.append((url, kwargs))
+        status_code, content, headers = self.responses.pop(0)
+        return SimpleNamespace(url=url, status_code=status_code, content=content, headers=headers)
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_rate(self):
+        limiter = RateLimiter(rate=20, burst=3)
+        self.assertEqual([limiter.acquire() for _ in range(3)], [0, 0, 0])
+        start = time.monotonic()
+        waited = limiter.acquire()
+        self.assertGreater(waited, 0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)    # 1 / rate, give or take
+
+    def test_unlimited(self):
+        limiter = RateLimiter()
+        self.assertEqual([limiter.acquire() for _ in range(100)], [0] * 100)
+
+    def test_pause(self):
+        limiter = RateLimiter()
+        limiter.pause(0.1)
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        # a shorter pause doesn't cut a longer one short
+        limiter.pause(0.2)
+        limiter.pause(0.05)
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_retry_after(self):
+        response = lambda headers: SimpleNamespace(headers=headers)
+        self.assertIsNone(http_client.get_retry_after(response({})))
+        self.assertEqual(http_client.get_retry_after(response({'Retry-After': '2.5'})), 2.5)
+        self.assertEqual(http_client.get_retry_after(response({'Retry-After': '-3'})), 0)
+        in_10s = email.utils.formatdate(time.time() + 10, usegmt=True)
+        self.assertAlmostEqual(http_client.get_retry_after(response({'Retry-After': in_10s})), 10, delta=2)
+        self.assertIsNone(http_client.get_retry_after(response({'Retry-After': 'soon'})))
+
+    def test_throttled_pauses_host(self):
+        host = 'throttled.invalid'
+        session = FakeSession([(429, b'', {'Retry-After': '0.1'}), (200, b'ok', {})])
+        with mock.patch.object(http_client, '_session', session):
+            self.assertEqual(http_client.get(f'https://{host}/a').status_code, 429)
+            start = time.monotonic()
+            self.assertEqual(http_client.get(f'https://{host}/a').content, b'ok')
+            self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(http_client.get_stats()[host]['throttled'], 1)
+
+class TestCachedGet(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        patch = mock.patch.object(http_client, 'CACHE_DIR', Path(self.directory.name))
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_ttl_and_revalidation(self):
+        url = 'https://cache.invalid/catalog.json'
+        session = FakeSession([
+            (200, b'v1', {'ETag': '"1"', 'Last-Modified': 'Wed, 01 Jan 2025 00:00:00 GMT'}),
+            (304, b'', {}),
+            (200, b'v2', {'ETag': '"2"'}),
+        ])
+        with mock.patch.object(http_client, '_session', session):
+            self.assertEqual(http_client.cached_get(url, ttl=60).content, b'v1')
+            # within the ttl: from disk, no request
+            self.assertEqual(http_client.cached_get(url, ttl=60).content, b'v1')
+            self.assertEqual(len(session.calls), 1)
+
+            # after it: revalidated, a 304 serves the cached body
+            r = http_client.cached_get(url, ttl=0)
+            self.assertEqual((r.status_code, r.content), (200, b'v1'))
+            headers = session.calls[1][1]['headers']
+            self.assertEqual(headers['If-None-Match'], '"1"')
+            self.assertEqual(headers['If-Modified-Since'], 'Wed, 01 Jan 2025 00:00:00 GMT')
+
+            # a 200 replaces it
+            self.assertEqual(http_client.cached_get(url, ttl=0).content, b'v2')
+            self.assertEqual(http_client.cached_get(url, ttl=60).content, b'v2')
+            self.assertEqual(len(session.calls), 3)
+
+    def test_errors_are_not_cached(self):
+        url = 'https://cache.invalid/flaky.json'
+        session = FakeSession([(500, b'oops', {}), (200, b'ok', {})])
+        with mock.patch.object(http_client, '_session', session):
+            self.assertEqual(http_client.cached_get(url, ttl=60).status_code, 500)
+            self.assertEqual(http_client.cached_get(url, ttl=60).content, b'ok')
+            self.assertNotIn('If-None-Match', session.calls[1][1].get('headers') or {})
+
+    def test_broken_cache_is_a_miss(self):
+        url = 'https://cache.invalid/broken.json'
+        meta_path, _ = http_client._get_cache_paths(url)
+        meta_path.write_text('{not json')
+        session = FakeSession([(200, b'fresh', {})])
+        with mock.patch.object(http_client, '_session', session):
+            self.assertEqual(http_client.cached_get(url, ttl=60).content, b'fresh')
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,93 @@
+"""
+
+$ python -m src.test.test_market_snapshot -v
+
+"""
+import datetime
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..warframe_market import MarketItem, Orders, Statistic
+from ..market_snapshot import write_snapshot, read_snapshot
+
+BASIS_TIME = datetime.datetime(2025, 1, 10, 12, tzinfo=datetime.timezone.utc)
+
+def make_item(i: int, prepared: bool) -> MarketItem:
+    item = MarketItem({
+        'id': f'id{i}',
+        'slug': f'item_{i}',
+        'gameRef': f'/Lotus/Item{i}',
+        'tags': ['mod'],
+        'maxRank': 5,
+        'i18n': {'en': {'name': f'Item {i}', 'thumb': f'thumb{i}.png'}},
+    })
+    if not prepared:
+        return item
+    user = {'id': 'u1', 'reputation': 3, 'status': 'ingame', 'ingameName': 'Someone', 'slug': 'someone'}
+    orders = Orders([
+        {'itemId': f'id{i}', 'type': 'sell', 'visible': True, 'platinum': 10 + i, 'quantity': 2, 'user': user, 'rank': 5},
+        {'itemId': f'id{i}', 'type': 'buy', 'visible': True, 'platinum': 5, 'quantity': 1, 'user': user},
+    ])
+    stats = [
+        {
+            'datetime': (BASIS_TIME - datetime.timedelta(hours=hour)).isoformat(timespec='milliseconds'),
+            'volume': hour % 3, 'median': 10 + hour, 'mod_rank': mod_rank,
+        }
+        for hour in range(1, 48) for mod_rank in [0, 5]
+    ]
+    statistic = Statistic({
+        'statistics_closed': {'48hours': stats, '90days': []},
+        'statistics_opened': {'48hours': [], '90days': []},
+    }, basis_time=BASIS_TIME)
+    now = datetime.datetime.now()
+    item.prepare({
+        'component_datetime': {'orders': now, 'statistic': now},
+        'orders': orders,
+        'statistic': statistic,
+    })
+    return item
+
+class TestMarketSnapshot(unittest.TestCase):
+    def test_round_trip(self):
+        items = [make_item(i, prepared=i % 2 == 0) for i in range(6)]
+        ducat_data = {'previous_hour': {}, 'previous_day': {}}
+        with tempfile.TemporaryDirectory() as directory:
+            write_snapshot(items, ducat_data, BASIS_TIME, directory=Path(directory))
+            snapshot = read_snapshot(Path(directory))
+
+            self.assertEqual([item.to_market_json() for item in snapshot.market_items], [item.to_market_json() for item in items])
+            self.assertEqual(snapshot.ducat_data, ducat_data)
+            self.assertEqual(sorted(snapshot.prepared_item_ids), ['id0', 'id2', 'id4'])
+            for item, loaded in zip(items, snapshot.market_items):
+                prepared_data = snapshot.get_prepared_data(item.id)
+                if not item.component_datetime:
+                    self.assertIsNone(prepared_data)
+                    continue
+                loaded.prepare(prepared_data)
+                self.assertEqual(loaded.component_datetime, item.component_datetime)
+                self.assertEqual(loaded.orders.to_rows(), item.orders.to_rows())
+                for mod_rank_range in [[0], [5]]:
+                    self.assertEqual(
+                        loaded.price.get_top_k_avg_price_for_last_hours(48, 0.3, mod_rank_range=mod_rank_range),
+                        item.price.get_top_k_avg_price_for_last_hours(48, 0.3, mod_rank_range=mod_rank_range),
+                    )
+                    self.assertEqual(
+                        loaded.price.get_cur_lowest_price(mod_rank_range=mod_rank_range),
+                        item.price.get_cur_lowest_price(mod_rank_range=mod_rank_range),
+                    )
+
+    def test_no_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertIsNone(read_snapshot(Path(directory)))
+
+    def test_broken_snapshot(self):
+        items = [make_item(i, prepared=True) for i in range(2)]
+        for broken_file in ['data.json', 'meta.json', 'orders_platinum.npy']:
+            with tempfile.TemporaryDirectory() as directory:
+                path = write_snapshot(items, {}, BASIS_TIME, directory=Path(directory))
+                (path / broken_file).write_bytes((path / broken_file).read_bytes()[:20])    # truncated
+                self.assertIsNone(read_snapshot(Path(directory)), broken_file)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+"""
+
+$ python -m src.test.test_orders -v
+
+"""
+import random
+import unittest
+
+from ..warframe_market import Orders, UserRegistry
+
+def make_user(i: int, status: str = 'ingame') -> dict:
+    return {'id': f'u{i}', 'reputation': i, 'status': status, 'ingameName': f'User{i}', 'slug': f'user{i}'}
+
+def make_order(platinum: int, quantity: int = 1, order_type: str = 'sell', user: dict | None = None,
+               visible: bool = True, rank: int | None = None, item_id: str = 'item') -> dict:
+    order = {
+        'itemId': item_id, 'type': order_type, 'visible': visible, 'platinum': platinum, 'quantity': quantity,
+        'user': user or make_user(0),
+    }
+    if rank is not None:
+        order['rank'] = rank
+    return order
+
+class TestOrderLadders(unittest.TestCase):
+    def test_ladder_order_and_ties(self):
+        registry = UserRegistry()
+        orders = Orders([
+            make_order(10, 3), make_order(10, 1), make_order(8, 5),
+            make_order(4, 1, 'buy'), make_order(6, 2, 'buy'), make_order(6, 7, 'buy'),
+        ], registry=registry)
+        # sell ascending, buy descending, ties on the price go by the quantity the same way
+        self.assertEqual(orders.sell_ladders, {None: [(8, 5), (10, 1), (10, 3)]})
+        self.assertEqual(orders.buy_ladders, {None: [(6, 7), (6, 2), (4, 1)]})
+
+    def test_only_visible_ingame_orders(self):
+        registry = UserRegistry()
+        orders = Orders([
+            make_order(5, visible=False), make_order(6, user=make_user(1, 'online')), make_order(7),
+            make_order(9, order_type='buy', user=make_user(2, 'offline')), make_order(3, order_type='buy'),
+        ], registry=registry)
+        self.assertEqual(orders.sell_ladders, {None: [(7, 1)]})
+        self.assertEqual(orders.buy_ladders, {None: [(3, 1)]})
+        self.assertEqual(len(orders), 5)    # the columns still have every order
+
+    def test_mod_ranks(self):
+        registry = UserRegistry()
+        orders = Orders([
+            make_order(20, rank=0), make_order(50, rank=5), make_order(15, rank=None), make_order(30, rank=5),
+            make_order(10, order_type='buy', rank=0), make_order(40, order_type='buy', rank=5),
+        ], registry=registry)
+        self.assertEqual(orders.sell_ladders, {0: [(20, 1)], 5: [(30, 1), (50, 1)], None: [(15, 1)]})
+        # sell orders without a rank count for every rank
+        self.assertEqual(orders.get_ingame_lowest_sell_price([0]), 15)
+        self.assertEqual(orders.get_ingame_lowest_sell_price([5]), 15)
+        self.assertEqual(orders.get_ingame_highest_buy_price([0]), 10)
+        self.assertEqual(orders.get_ingame_highest_buy_price([5]), 40)
+        self.assertEqual(orders.get_ingame_highest_buy_price([3]), -1)
+        self.assertEqual(orders.get_ingame_bottomK_sell_price(2, [0, 5]), [(20, 1), (30, 1)])
+        self.assertEqual(orders.get_ingame_topK_buy_price(5, range(0, 6)), [(40, 1), (10, 1)])
+
+    def test_same_as_sorting(self):
+        rng = random.Random(0)
+        registry = UserRegistry()
+        for _ in range(50):
+            order_json = [
+                make_order(
+                    rng.randint(1, 30), rng.randint(1, 5), rng.choice(['sell', 'buy']),
+                    make_user(rng.randrange(10), rng.choice(['ingame', 'ingame', 'online'])),
+                    rng.random() < 0.9, rng.choice([0, 3, 5]),
+                )
+                for _ in range(rng.randint(0, 40))
+            ]
+            orders = Orders(order_json, registry=registry)
+            for mod_rank_range in [[0], [3, 5], range(0, 6)]:
+                ingame = [
+                    order for order in order_json
+                    if order['visible'] and order['user']['status'] == 'ingame' and order['rank'] in mod_rank_range
+                ]
+                sells = sorted((o['platinum'], o['quantity']) for o in ingame if o['type'] == 'sell')
+                buys = sorted(((o['platinum'], o['quantity']) for o in ingame if o['type'] == 'buy'), reverse=True)
+                self.assertEqual(orders.get_ingame_bottomK_sell_price(5, mod_rank_range), sells[:5])
+                self.assertEqual(orders.get_ingame_topK_buy_price(5, mod_rank_range), buys[:5])
+                self.assertEqual(orders.get_ingame_lowest_sell_price(mod_rank_range), min([p for p, _ in sells] + [1000000]))
+
+    def test_rows_round_trip(self):
+        registry = UserRegistry()
+        orders = Orders([make_order(10, rank=5), make_order(3, 2, 'buy', make_user(1, 'online'))], registry=registry)
+        copy = Orders.from_rows(orders.to_rows(), registry)
+        self.assertEqual(copy.to_rows(), orders.to_rows())
+        self.assertEqual(copy.sell_ladders, orders.sell_ladders)
+        self.assertEqual(copy.buy_ladders, orders.buy_ladders)
+        self.assertEqual([order.platinum for order in copy.orders], [10, 3])
+
+class TestUserRegistry(unittest.TestCase):
+    def test_intern(self):
+        registry = UserRegistry()
+        a = Orders([make_order(10, user=make_user(1))], registry=registry)
+        b = Orders([make_order(20, user={**make_user(1), 'reputation': 99})], registry=registry)
+        self.assertIs(a.users[0], b.users[0])
+        self.assertEqual(registry.users['u1'].reputation, 99)     # the latest one we've seen
+        self.assertNotIn('u1', UserRegistry().users)
+
+    def test_set_item_offers(self):
+        registry = UserRegistry()
+        u1, u2, u3 = make_user(1), make_user(2), make_user(3, 'online')
+        registry.set_item_offers('A', Orders([
+            make_order(10, 2, user=u1), make_order(8, 1, user=u1), make_order(8, 1, user=u1, rank=3),
+            make_order(12, user=u2), make_order(1, order_type='buy', user=u2), make_order(5, user=u3),
+        ], registry=registry))
+        registry.set_item_offers('B', Orders([make_order(30, user=u2)], registry=registry))
+
+        # the cheapest offer of each in-game seller, the last one on ties, users in order of appearance
+        self.assertEqual(registry.get_sell_offers(['A']), {'u1': {'A': (8, 1, 3)}, 'u2': {'A': (12, 1, None)}})
+        self.assertEqual(registry.get_sell_offers(['A', 'B']), {
+            'u1': {'A': (8, 1, 3)},
+            'u2': {'A': (12, 1, None), 'B': (30, 1, None)},
+        })
+        self.assertEqual(list(registry.get_sell_offers(['A', 'B'], min_items=2)), ['u2'])
+        self.assertEqual(registry.get_sell_offers(['C']), {})
+
+        # new orders replace the item's offers, u1 doesn't sell anything anymore
+        registry.set_item_offers('A', Orders([make_order(11, user=u2)], registry=registry))
+        self.assertEqual(registry.get_sell_offers(['A', 'B']), {'u2': {'A': (11, 1, None), 'B': (30, 1, None)}})
+        self.assertNotIn('u1', registry._sell_offers)
+        registry.set_item_offers('A', Orders([], registry=registry))
+        registry.set_item_offers('B', Orders([], registry=registry))
+        self.assertEqual(registry._sell_offers, {})
+
+    def test_offers_from_another_registry(self):
+        # e.g., the prepared orders carried over to the next catalog's items
+        old, new = UserRegistry(), UserRegistry()
+        orders = Orders([make_order(10, user=make_user(1))], registry=old)
+        new.set_item_offers('A', orders)
+        self.assertEqual(new.get_sell_offers(['A']), {'u1': {'A': (10, 1, None)}})
+        self.assertIs(new.users['u1'], orders.users[0])
+        self.assertEqual(old.get_sell_offers(['A']), {})
+
+    def test_clear(self):
+        registry = UserRegistry()
+        registry.set_item_offers('A', Orders([make_order(10, user=make_user(1))], registry=registry))
+        registry.clear()
+        self.assertEqual(registry.users, {})
+        self.assertEqual(registry.get_sell_offers(['A']), {})
+        # and it works as new afterwards
+        registry.set_item_offers('A', Orders([make_order(7, user=make_user(2))], registry=registry))
+        self.assertEqual(registry.get_sell_offers(['A']), {'u2': {'A': (7, 1, None)}})
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,124 @@
+"""
+
+$ python -m src.test.test_price_oracle -v
+
+"""
+import datetime
+import itertools
+import math
+import random
+import statistics
+import unittest
+from types import SimpleNamespace
+
+from ..warframe_market import Statistic, PriceOracle, OracleSpec, batch_oracle_prices
+
+BASIS_TIME = datetime.datetime(2025, 1, 10, 12, 30, tzinfo=datetime.timezone.utc)
+
+def make_stats(n_timeslots: int, timeslot: datetime.timedelta, rng: random.Random):
+    """
+    random statistics_closed timeslots, some of them with a maxed rank (5) as well
+    """
+    stats = []
+    for i in range(n_timeslots):
+        for mod_rank in ([0, 5] if rng.random() < 0.5 else [0]):
+            if rng.random() < 0.2:
+                continue    # missing timeslot
+            stats.append({
+                'datetime': (BASIS_TIME - timeslot * (i + 1)).replace(minute=0).isoformat(timespec='milliseconds'),
+                'volume': rng.randint(0, 30),
+                'median': rng.randint(1, 300) + rng.choice([0, 0.5]),
+                'avg_price': 1.0,
+                'min_price': 1,
+                'max_price': 3,
+                'mod_rank': mod_rank,
+            })
+    rng.shuffle(stats)
+    return stats
+
+def expanded_oracle(stats: list[dict], ratio: float, reverse: bool, fn):
+    """
+    the straightforward version: count each price `volume` times
+    """
+    prices = sorted(itertools.chain.from_iterable([[stat['median']] * stat['volume'] for stat in stats]), reverse=reverse)
+    top_K = prices[:int(len(prices) * ratio)]
+    if len(top_K) == 0:
+        return fn(prices)
+    return fn(top_K)
+
+class TestPriceOracle(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.oracles = [
+            PriceOracle(None, None, Statistic({
+                'statistics_closed': {
+                    '48hours': make_stats(50, datetime.timedelta(hours=1), rng),
+                    '90days': make_stats(95, datetime.timedelta(days=1), rng),
+                },
+                'statistics_opened': {'48hours': [], '90days': []},
+            }, basis_time=BASIS_TIME))
+            for _ in range(50)
+        ]
+
+    def test_weighted_oracles_match_expanded(self):
+        """
+        the *_k_* oracles give exactly the same result as expanding every trade
+        """
+        cases = [
+            ('get_top_k_median_price_for_last_hours', 'get_stat_for_last_hours', 48, 0.3, True, statistics.median),
+            ('get_top_k_avg_price_for_last_hours', 'get_stat_for_last_hours', 48, 0.3, True, statistics.mean),
+            ('get_bottom_k_avg_price_for_last_hours', 'get_stat_for_last_hours', 12, 0.3, False, statistics.mean),
+            ('get_top_k_avg_price_for_last_days', 'get_stat_for_last_days', 90, 1, True, statistics.mean),
+            ('get_bottom_k_avg_price_for_last_days', 'get_stat_for_last_days', 7, 0.3, False, statistics.mean),
+            ('get_top_k_median_price_before_last_days', 'get_stat_before_last_days', 25, 0.3, True, statistics.median),
+        ]
+        for oracle in self.oracles:
+            for oracle_name, stat_name, timeframe, ratio, reverse, fn in cases:
+                for stat_filter in [{}, {'mod_rank_range': [5]}, {'mod_rank_range': range(100)}]:
+                    with self.subTest(oracle=oracle_name, **stat_filter):
+                        stats = getattr(oracle.statistic, stat_name)(timeframe, **stat_filter)
+                        if len(stats) == 0:
+                            expected = 0
+                        elif sum(stat['volume'] for stat in stats) == 0:
+                            with self.assertRaises(statistics.StatisticsError):
+                                getattr(oracle, oracle_name)(timeframe, ratio, **stat_filter)
+                            continue
+                        else:
+                            expected = expanded_oracle(stats, ratio, reverse, fn)
+                        self.assertEqual(getattr(oracle, oracle_name)(timeframe, ratio, **stat_filter), expected)
+
+    def test_batch_matches_single(self):
+        """
+        batch_oracle_prices gives the same results as evaluating each item on its own
+        """
+        items = [SimpleNamespace(statistic=oracle.statistic) for oracle in self.oracles]
+        specs = [
+            OracleSpec('mean', 'for_last_hours', 48, 0.3),
+            OracleSpec('mean', 'for_last_hours', 12, 0.3, top=False),
+            OracleSpec('median', 'for_last_hours', 48, 0.3),
+            OracleSpec('median', 'for_last_days', 30, 0.5, top=False),
+            OracleSpec('mean', 'for_last_days', 90, 1),
+            OracleSpec('median', 'before_last_days', 25, 0.3),
+        ]
+        for spec in specs:
+            for mod_rank_range in [[0], [5], range(100)]:
+                with self.subTest(spec=spec, mod_rank_range=mod_rank_range):
+                    prices = batch_oracle_prices(items, spec, [mod_rank_range] * len(items))
+                    for oracle, price in zip(self.oracles, prices.tolist()):
+                        try:
+                            expected = spec.evaluate(oracle, mod_rank_range=mod_rank_range)
+                        except statistics.StatisticsError:
+                            self.assertTrue(math.isnan(price))
+                            continue
+                        self.assertEqual(price, expected)
+
+    def test_volume(self):
+        for oracle in self.oracles:
+            stats = oracle.statistic.get_stat_for_last_hours(48, mod_rank_range=range(100))
+            self.assertEqual(
+                oracle.statistic.get_volume_for_last_hours(48, mod_rank_range=range(100)),
+                sum(stat['volume'] for stat in stats),
+            )
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,44 @@
+"""
+
+$ python -m src.test.test_search_index -v
+
+"""
+import random
+import unittest
+
+from ..search_index import NameIndex
+
+NAMES = [
+    'Volt Prime Blueprint', 'Volt Prime Set', 'Voruna Prime Set', 'Arcane Energize', 'Arcane Grace',
+    'Molt Augmented', 'Primed Continuity', 'Silva & Aegis', 'Serration', 'Split Chamber', 'Prime Vigor',
+]
+
+class TestNameIndex(unittest.TestCase):
+    def test_same_as_scan(self):
+        index = NameIndex(NAMES)
+        rng = random.Random(0)
+        queries = ['', 'a', 'pr', 'PRIME', 'e s', 'olt', 'volt prime', 'prime set', 'xyz', '&']
+        for _ in range(200):
+            name = rng.choice(NAMES)
+            start = rng.randrange(len(name))
+            queries.append(name[start:start + rng.randrange(1, 8)])
+        for query in queries:
+            expected = [name for name in NAMES if query.strip().lower() in name.lower()]
+            self.assertEqual(index.search(query), expected, query)
+            self.assertEqual(sorted(index.suggest(query, limit=None)), sorted(expected), query)
+
+    def test_search_any(self):
+        index = NameIndex(NAMES)
+        self.assertEqual(index.search_any('volt + voruna'), ['Volt Prime Blueprint', 'Volt Prime Set', 'Voruna Prime Set'])
+        self.assertEqual(index.search_any('grace+GRACE+ nothing '), ['Arcane Grace'])
+
+    def test_suggest_ranking(self):
+        index = NameIndex(NAMES)
+        # starts with it, then a word starts with it (shorter first), then the rest
+        self.assertEqual(index.suggest('prime', limit=None), [
+            'Prime Vigor', 'Primed Continuity', 'Volt Prime Set', 'Voruna Prime Set', 'Volt Prime Blueprint',
+        ])
+        self.assertEqual(index.suggest('prime', limit=2), ['Prime Vigor', 'Primed Continuity'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,65 @@
+"""
+
+$ python -m src.test.test_statistic_history -v
+
+"""
+import datetime
+import unittest
+
+import numpy as np
+
+from ..warframe_market import Statistic, StatisticHistory
+
+BASIS_TIME = datetime.datetime(2025, 1, 10, 12, tzinfo=datetime.timezone.utc)
+
+def make_statistic(end: datetime.datetime, hours: int = 48, median: float = 10) -> Statistic:
+    """
+    `hours` hourly timeslots up to `end`, for mod rank 0 and 5
+    """
+    stats = [
+        {
+            'datetime': (end - datetime.timedelta(hours=i)).isoformat(timespec='milliseconds'),
+            'volume': 1,
+            'median': median,
+            'mod_rank': mod_rank,
+        }
+        for i in range(hours)
+        for mod_rank in [0, 5]
+    ]
+    return Statistic({
+        'statistics_closed': {'48hours': stats, '90days': []},
+        'statistics_opened': {'48hours': [], '90days': []},
+    }, basis_time=end + datetime.timedelta(minutes=30))
+
+class TestStatisticHistory(unittest.TestCase):
+    def test_history_goes_beyond_48_hours(self):
+        history = StatisticHistory()
+        for day in range(7):
+            statistic = make_statistic(BASIS_TIME + datetime.timedelta(days=day))
+            history.merge('item', statistic)
+
+        columns = statistic.get_columns_for_last_hours(7 * 24, mod_rank_range=[0])
+        self.assertEqual(len(columns['t']), 7 * 24)
+        self.assertTrue(np.all(np.diff(columns['t']) == 60 * 60))    # every hour once, in order
+
+    def test_newer_rows_replace_older(self):
+        history = StatisticHistory()
+        history.merge('item', make_statistic(BASIS_TIME, median=10))
+        statistic = make_statistic(BASIS_TIME, hours=4, median=20)
+        history.merge('item', statistic)
+
+        columns = statistic.get_columns_for_last_hours(48, mod_rank_range=[5])
+        self.assertEqual(len(columns['t']), 48)
+        self.assertEqual(columns['median'].tolist(), [10] * 44 + [20] * 4)
+
+    def test_keep(self):
+        history = StatisticHistory()
+        for day in range(0, 30, 2):
+            statistic = make_statistic(BASIS_TIME + datetime.timedelta(days=day))
+            history.merge('item', statistic)
+
+        columns = statistic.get_columns_for_last_hours(60 * 24, mod_rank_range=[0])
+        self.assertEqual(columns['t'][-1] - columns['t'][0], StatisticHistory.KEEP.total_seconds())
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+"""
+
+$ python -m src.test.test_util -v
+
+"""
+import threading
+import time
+import unittest
+
+from ..util import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one(self):
+        single_flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return object()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(single_flight.do('key', fn))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        # wait until the other 7 are waiting on the first one
+        deadline = time.monotonic() + 5
+        while single_flight.stats['calls'] < 8 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(single_flight.stats, {'calls': 8, 'shared': 7})
+
+    def test_exception_is_shared(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        def fn():
+            started.set()
+            release.wait(5)
+            raise ValueError('boom')
+
+        errors = []
+        def call():
+            try:
+                single_flight.do('key', fn)
+            except ValueError as e:
+                errors.append(e)
+
+        first = threading.Thread(target=call)
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=call)
+        second.start()
+        while single_flight.stats['calls'] < 2:
+            time.sleep(0.01)
+        release.set()
+        first.join()
+        second.join()
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+
+    def test_sequential_calls_are_not_shared(self):
+        # only in-flight calls are deduplicated, a finished one (or a failed one) doesn't stick around
+        single_flight = SingleFlight()
+        self.assertEqual(single_flight.do('key', lambda: 1), 1)
+        self.assertEqual(single_flight.do('key', lambda: 2), 2)
+        with self.assertRaises(KeyError):
+            single_flight.do('key', lambda: {}['missing'])
+        self.assertEqual(single_flight.do('key', lambda: 3), 3)
+        self.assertEqual(single_flight.stats['shared'], 0)
+
+    def test_keys_are_independent(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        results = {}
+
+        def slow():
+            release.wait(5)
+            return 'slow'
+
+        thread = threading.Thread(target=lambda: results.update(a=single_flight.do('a', slow)))
+        thread.start()
+        # another key doesn't wait for 'a'
+        self.assertEqual(single_flight.do('b', lambda: 'fast'), 'fast')
+        release.set()
+        thread.join()
+        self.assertEqual(results, {'a': 'slow'})
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
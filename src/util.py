@@ -1,9 +1,18 @@
 import contextlib
+import concurrent.futures
+import threading
+import json
+from collections import OrderedDict
 import joblib
 from tqdm import tqdm
 from typing import *
 import colorama
 
+try:
+    import orjson   # a lot faster (and lighter) than json for the big API payloads, ref. requirements.txt
+except ImportError: # still works without it, just slower
+    orjson = None
+
 RESET = colorama.Style.RESET_ALL
 YELLOW, BG_YELLOW = colorama.Fore.YELLOW, colorama.Back.YELLOW
 CYAN, BG_CYAN = colorama.Fore.CYAN, colorama.Back.CYAN
@@ -41,6 +50,113 @@ def tqdm_joblib(tqdm_object):
         joblib.parallel.BatchCompletionCallBack = old_batch_callback
         tqdm_object.close()
 
+class SingleFlight:
+    """
+        deduplicate concurrent calls: while do(key, fn) is running for a key, any other do() with the same key
+        (from any thread) waits for that call and gets its result (or exception) instead of calling fn again
+
+        ```
+        single_flight = SingleFlight()
+        # in many threads at once, only one request is made
+        r = single_flight.do(('serration', 'orders'), lambda: get_orders('serration'))
+        ```
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: dict[Hashable, concurrent.futures.Future] = {}
+        self.stats = {
+            'calls': 0,     # total do() calls
+            'shared': 0,    # calls that got an in-flight call's result instead of calling fn
+        }
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.stats['calls'] += 1
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = concurrent.futures.Future()
+                self._in_flight[key] = future
+            else:
+                self.stats['shared'] += 1
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._in_flight.pop(key, None)
+        future.set_result(result)
+        return result
+
+class MemoCache:
+    """
+        a thread-safe LRU dict for memoizing computations by key, with hit / miss counters
+        the key should include everything the value depends on (e.g., a data version), so nothing needs
+        to be invalidated by hand, the outdated entries are just never hit again and fall off the end
+
+        ```
+        memo = MemoCache(max_size=10000)
+        value = memo.get(key, MemoCache.MISSING)
+        if value is MemoCache.MISSING:
+            value = compute()
+            memo.put(key, value)
+        ```
+    """
+    MISSING = object()
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+        }
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                self.stats['misses'] += 1
+                return default
+            self.stats['hits'] += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+def json_loads(data: bytes | str) -> Any:
+    """
+        json.loads, but with orjson (falls back to json if it isn't installed)
+        give it the response bytes directly (i.e., r.content), so we don't make a decoded str copy of the body
+
+        orjson is stricter than json (e.g., no NaN), so anything it rejects goes through json again
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
 def str_type_indent(obj, iter_limit_items: int = 10, dict_limit_items: int = 1000000, array_limit_items: int = -1,
                     explicit_type: bool=False, indent="    ", print_type: Literal['str', 'type'] = 'str', print_unknown_obj_vars: bool = False) -> str:
     """
@@ -2,44 +2,195 @@ from dataclasses import dataclass
 import json
 import re
 import itertools
+import heapq
+import sys
+import threading
 from lxml import etree
-import requests
-from joblib import Parallel, delayed
+import asyncio
 import time
 import random
 import datetime
 import math
 import itertools
 import statistics
+from fractions import Fraction
+import numpy as np
 from collections import defaultdict
 from typing import *
 
 from .data.syndicate_data import additional_syndicates
 
 from . import util
+from . import http_client
+from .http_client import USER_AGENT
+from .fetch_scheduler import FetchScheduler
 from tqdm import tqdm
 
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
-RETRY_MAX_TIME = 3
-def retry_request(*args, n_times=None, **kwargs):
+RETRY_BASE_TIME = 0.5   # backoff for the first retry, doubled every retry
+RETRY_MAX_TIME = 3      # backoff never goes above this
+MAX_IN_FLIGHT_REQUESTS = 10     # how many requests one fetch engine run keeps queued / in flight at once (across items)
+# the requests of every fetch engine run are done by these workers, highest priority first
+# warframe.market only allows 3 requests per second anyway (ref. http_client.RATE_LIMITS), more workers would
+# just queue inside the rate limiter, where priorities don't apply
+FETCH_WORKERS = 4
+fetch_scheduler = FetchScheduler(FETCH_WORKERS)
+
+# concurrent fetches of the same (item slug, data kind) share one request, e.g., when 2 server tasks
+# prepare the same item at once
+fetch_single_flight = util.SingleFlight()
+
+def retry_request(*args, n_times=None, use_cache=False, **kwargs):
     """
         automatically retry request until the request is done.
         this is to retry whenever too many requests happens
+
+        use_cache: use http_client.cached_get, for big payloads that rarely change (ref. http_client.CACHE_TTLS)
+
+        we back off exponentially (with jitter) between retries. if we are throttled (429),
+        http_client already paused the host for Retry-After for every caller, so we don't wait on top of that
     """
     r = None
+    n_retries = 0
     while n_times is None or n_times > 0:
-        r = requests.get(*args, **kwargs)
+        r = (http_client.cached_get if use_cache else http_client.get)(*args, **kwargs)
 
         if r.status_code == 200:
             break
 
-        # wait a random time because there may be multiple requests
-        # at the exact same time as this
-        time.sleep(random.uniform(0, RETRY_MAX_TIME))
+        http_client.record_retry(r.url)
+        if r.status_code not in [429, 503]:
+            # wait a random time because there may be multiple requests
+            # at the exact same time as this
+            time.sleep(random.uniform(0, min(RETRY_MAX_TIME, RETRY_BASE_TIME * 2 ** n_retries)))
+        n_retries += 1
         if n_times is not None:
             n_times -= 1
     return r
 
+def run_async(coro):
+    """
+        run a fetch engine coroutine (e.g., prepare_market_items_async) from sync code
+        the requests themselves are run by fetch_scheduler, so this is just asyncio.run
+
+        can't be called inside a running event loop, await the coroutine directly there
+    """
+    return asyncio.run(coro)
+
+async def _run_limited(semaphore: asyncio.Semaphore, fn, *args, priority: str = 'visible',
+                       owner: Hashable = None, tag: Hashable = None):
+    """
+        run a blocking fn (i.e., a request) on fetch_scheduler, taking one slot in `semaphore` while doing so
+        priority, owner, tag: ref. FetchScheduler.submit
+    """
+    async with semaphore:
+        return await asyncio.wrap_future(fetch_scheduler.submit(fn, *args, priority=priority, owner=owner, tag=tag))
+
+@dataclass(slots=True)
+class MarketUser:
+    """
+        a user seen in orders, ref. UserRegistry
+        reputation and status are the latest ones we've seen
+    """
+    id: str
+    reputation: int
+    status: str
+    ingame_name: str
+    slug: str
+
+class UserRegistry:
+    """
+        every user seen in any prepared item's orders, each stored once and shared by all Orders,
+        plus an index of each user's in-game sell offers across all prepared items, so questions like
+        "who sells these items" are lookups instead of a scan over every order
+
+        the index is keyed by item name, set_item_offers() replaces an item's offers when it gets new orders
+
+        each catalog (e.g., the server's market state) has its own registry, ref. MarketItem.user_registry,
+        the module level user_registry is the default one
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.users: dict[str, MarketUser] = {}
+        # user id -> item name -> best (platinum, quantity, mod_rank) in-game sell offer
+        self._sell_offers: dict[str, dict[str, tuple[int, int, int | None]]] = {}
+        # item name -> user ids selling it, in the order of the item's orders
+        self._item_sellers: dict[str, dict[str, None]] = {}
+
+    def intern(self, user_id: str, reputation: int, status: str, ingame_name: str, slug: str) -> MarketUser:
+        """
+            get the shared MarketUser for the user, updated with these values
+        """
+        with self._lock:
+            user = self.users.get(user_id)
+            if user is None:
+                user = self.users[user_id] = MarketUser(user_id, reputation, sys.intern(status), ingame_name, slug)
+            else:
+                user.reputation, user.status, user.ingame_name, user.slug = reputation, sys.intern(status), ingame_name, slug
+            return user
+
+    def set_item_offers(self, item_name: str, orders: 'Orders'):
+        """
+            replace the item's offers in the index with the in-game sell orders in `orders`
+            if a user has several, the cheapest (platinum, quantity) is kept (the last one on ties)
+            the sellers are added to `users` too, even if `orders` were interned in another registry
+            (e.g., carried over from an item of the previous catalog)
+        """
+        offers: dict[str, tuple[int, int, int | None]] = {}
+        sellers: dict[str, MarketUser] = {}
+        for is_sell, is_ingame, platinum, quantity, mod_rank, user_index in zip(
+            orders.is_sell.tolist(), orders.is_ingame.tolist(), orders.platinum.tolist(),
+            orders.quantity.tolist(), orders.mod_rank, orders.user_index.tolist(),
+        ):
+            if not is_sell or not is_ingame:
+                continue
+            user_id = orders.users[user_index].id
+            sellers[user_id] = orders.users[user_index]
+            if user_id in offers and (platinum, quantity) > offers[user_id][:2]:
+                continue
+            offers[user_id] = (platinum, quantity, mod_rank)
+
+        with self._lock:
+            for user_id, user in sellers.items():
+                self.users.setdefault(user_id, user)
+            self._remove_item_offers(item_name)
+            self._item_sellers[item_name] = dict.fromkeys(offers)
+            for user_id, offer in offers.items():
+                self._sell_offers.setdefault(user_id, {})[item_name] = offer
+
+    def _remove_item_offers(self, item_name: str):
+        "must hold self._lock"
+        for user_id in self._item_sellers.pop(item_name, {}):
+            del self._sell_offers[user_id][item_name]
+            if len(self._sell_offers[user_id]) == 0:
+                del self._sell_offers[user_id]
+
+    def get_sell_offers(self, item_names: Iterable[str], min_items: int = 1) -> dict[str, dict[str, tuple[int, int, int | None]]]:
+        """
+            the users selling at least `min_items` of the given items in game
+            return {user id: {item name: (platinum, quantity, mod_rank)}}, only with the given items,
+            users in the order they are first seen in the items' orders
+        """
+        item_names = list(dict.fromkeys(item_names))
+        with self._lock:
+            user_ids = dict.fromkeys(itertools.chain.from_iterable(
+                self._item_sellers.get(item_name, {}) for item_name in item_names
+            ))
+            result = {}
+            for user_id in user_ids:
+                offers = self._sell_offers[user_id]
+                user_offers = {item_name: offers[item_name] for item_name in item_names if item_name in offers}
+                if len(user_offers) >= min_items:
+                    result[user_id] = user_offers
+            return result
+
+    def clear(self):
+        with self._lock:
+            self.users.clear()
+            self._sell_offers.clear()
+            self._item_sellers.clear()
+
+user_registry = UserRegistry()
+
 class Orders:
     """
         existing orders on warframe market
@@ -72,75 +223,284 @@ class Orders:
         def is_ingame(self):
             return self.user_status == 'ingame'
 
-    def __init__(self, order_json, version: Literal['v1', 'v2'] = 'v2'):
+    def __init__(self, order_json, version: Literal['v1', 'v2'] = 'v2', registry: UserRegistry | None = None):
         """
             order_json: is a list of dict that has keys like [visible, user, quantity, ...] 
-        """
+            registry: where the users are interned, default user_registry
 
-        self.orders: list['Orders.Order'] = []
+            the orders are stored column-wise (one array per Order field, users as indices into self.users,
+            which are interned in `registry`)
+            instead of one Order per order, use the `orders` property if you need Order objects.
+            the in-game sell / buy ladders are sorted at construction, ref. sell_ladders / buy_ladders
+        """
         if version == 'v1':
-            for order in order_json:
-                cur_order = self.Order(**{
-                    'item_id': None,    # not supported
-                    'order_type': order['order_type'],
-                    'visible': order['visible'],
-                    'platinum': order['platinum'],
-                    'quantity': order['quantity'],
-                    'user_reputation': order['user']['reputation'],
-                    'user_status': order['user']['status'], # can be ['offline', 'online', 'ingame']
-                    'user_in_game_name': order['user']['ingame_name'],
-                    'user_slug': order['user']['slug'],
-                    'user_id': order['user']['id'],
-                    'mod_rank': order.get('mod_rank', 0)
-                })
-                self.orders.append(cur_order)
+            rows = [(
+                None,   # item_id, not supported
+                order['order_type'] == 'sell',
+                order['visible'],
+                order['platinum'],
+                order['quantity'],
+                order.get('mod_rank', 0),
+                (order['user']['id'], order['user']['reputation'], order['user']['status'],
+                 order['user']['ingame_name'], order['user']['slug']),
+            ) for order in order_json]
         elif version == 'v2':
-            for order in order_json:
-                cur_order = self.Order(**{
-                    'item_id': order['itemId'],
-                    'order_type': order['type'],
-                    'visible': order['visible'],
-                    'platinum': order['platinum'],
-                    'quantity': order['quantity'],
-                    'user_reputation': order['user']['reputation'],
-                    'user_status': order['user']['status'], # can be ['offline', 'online', 'ingame']
-                    'user_in_game_name': order['user']['ingameName'],
-                    'user_slug': order['user']['slug'],
-                    'user_id': order['user']['id'],
-                    'mod_rank': order.get('rank', None)
-                })
-                self.orders.append(cur_order)
+            rows = [(
+                order['itemId'],
+                order['type'] == 'sell',
+                order['visible'],
+                order['platinum'],
+                order['quantity'],
+                order.get('rank', None),
+                (order['user']['id'], order['user']['reputation'], order['user']['status'], # can be ['offline', 'online', 'ingame']
+                 order['user']['ingameName'], order['user']['slug']),
+            ) for order in order_json]
         else:
             raise ValueError("version must be either 'v1' or 'v2'")
-            
+        self._set_rows(rows, registry)
+
+    @classmethod
+    def from_rows(cls, rows: list[tuple], registry: UserRegistry | None = None) -> 'Orders':
+        """
+            Orders from to_rows() (e.g., of a snapshot, ref. market_snapshot)
+        """
+        orders = cls.__new__(cls)
+        orders._set_rows(rows, registry)
+        return orders
+
+    def to_rows(self) -> list[tuple]:
+        """
+            the orders as (item_id, is_sell, visible, platinum, quantity, mod_rank,
+            (user id, reputation, status, in-game name, slug)) rows, ref. from_rows
+        """
+        return [
+            (self.item_id, is_sell, visible, platinum, quantity, self.mod_rank[i],
+             (self.users[user_index].id, self.users[user_index].reputation, self.user_status[i],
+              self.users[user_index].ingame_name, self.users[user_index].slug))
+            for i, (is_sell, visible, platinum, quantity, user_index) in enumerate(zip(
+                self.is_sell.tolist(), self.visible.tolist(), self.platinum.tolist(), self.quantity.tolist(), self.user_index.tolist()
+            ))
+        ]
+
+    def _set_rows(self, rows: list[tuple], registry: UserRegistry | None):
+        self.item_id = rows[0][0] if len(rows) > 0 else None
+        # the users of these orders, shared with every other Orders through the registry
+        registry = registry if registry is not None else user_registry
+        user_index: dict[str, int] = {}
+        self.users: list[MarketUser] = []
+        for row in rows:
+            if row[6][0] not in user_index:
+                user_index[row[6][0]] = len(self.users)
+                self.users.append(registry.intern(*row[6]))
+
+        self.is_sell = np.array([row[1] for row in rows], dtype=bool)
+        self.visible = np.array([row[2] for row in rows], dtype=bool)
+        self.platinum = np.array([row[3] for row in rows], dtype=np.int64)
+        self.quantity = np.array([row[4] for row in rows], dtype=np.int64)
+        self.mod_rank = [row[5] for row in rows]    # may be None
+        self.user_index = np.array([user_index[row[6][0]] for row in rows], dtype=np.int32)
+        # the user's status when these orders were fetched (the MarketUser has the latest one)
+        self.user_status = [sys.intern(row[6][2]) for row in rows]
+        self.is_ingame = np.array([status == 'ingame' for status in self.user_status], dtype=bool)
+
+        # the visible in-game orders as (platinum, quantity), per mod rank (may be None)
+        # sell ladders are sorted ascending, buy ladders descending, so the best price is always [0]
+        self.sell_ladders: dict[int | None, list[tuple[int, int]]] = defaultdict(list)
+        self.buy_ladders: dict[int | None, list[tuple[int, int]]] = defaultdict(list)
+        for _, is_sell, visible, platinum, quantity, mod_rank, user in rows:
+            if visible and user[2] == 'ingame':
+                (self.sell_ladders if is_sell else self.buy_ladders)[mod_rank].append((platinum, quantity))
+        for ladder in self.sell_ladders.values():
+            ladder.sort()
+        for ladder in self.buy_ladders.values():
+            ladder.sort(reverse=True)
+        self.sell_ladders, self.buy_ladders = dict(self.sell_ladders), dict(self.buy_ladders)
+
+    def __len__(self):
+        return len(self.platinum)
+
+    @property
+    def orders(self) -> list['Orders.Order']:
+        """
+            the orders as Order objects, made on every call
+        """
+        orders = []
+        for i, (is_sell, visible, platinum, quantity, user_index) in enumerate(zip(
+            self.is_sell.tolist(), self.visible.tolist(), self.platinum.tolist(), self.quantity.tolist(), self.user_index.tolist()
+        )):
+            user = self.users[user_index]
+            orders.append(self.Order(
+                item_id=self.item_id,
+                order_type='sell' if is_sell else 'buy',
+                visible=visible,
+                platinum=platinum,
+                quantity=quantity,
+                user_reputation=user.reputation,
+                user_status=self.user_status[i],
+                user_in_game_name=user.ingame_name,
+                user_slug=user.slug,
+                user_id=user.id,
+                mod_rank=self.mod_rank[i],
+            ))
+        return orders
+
+    def _get_ladders(self, ladders: dict, mod_rank_range: list | range, include_none: bool = False) -> list[list[tuple[int, int]]]:
+        return [
+            ladder for mod_rank, ladder in ladders.items()
+            if mod_rank in mod_rank_range or (mod_rank is None and include_none)
+        ]
+
     def get_ingame_lowest_sell_price(self, mod_rank_range: list | range = [0]):
+        # sell orders without a rank count for every rank
         return min([
-            order.platinum for order in self.orders
-            if order.is_sell and order.visible and order.is_ingame and (order.mod_rank is None or order.mod_rank in mod_rank_range) 
+            ladder[0][0] for ladder in self._get_ladders(self.sell_ladders, mod_rank_range, include_none=True)
         ] + [1000000])
     def get_ingame_highest_buy_price(self, mod_rank_range: list | range = [0]):
         return max([
-            order.platinum for order in self.orders
-            if order.is_buy and order.visible and order.is_ingame and order.mod_rank in mod_rank_range 
+            ladder[0][0] for ladder in self._get_ladders(self.buy_ladders, mod_rank_range)
         ] + [-1])
     def get_ingame_bottomK_sell_price(self, k: int, mod_rank_range: list | range = [0]):
-        sell_list = sorted([
-            (order.platinum, order.quantity) for order in self.orders
-            if order.is_sell and order.visible and order.is_ingame and order.mod_rank in mod_rank_range 
-        ])
-        return sell_list[:k]
+        ladders = self._get_ladders(self.sell_ladders, mod_rank_range)
+        if len(ladders) == 1:
+            return ladders[0][:k]
+        return list(itertools.islice(heapq.merge(*ladders), k))
     def get_ingame_topK_buy_price(self, k: int, mod_rank_range: list | range = [0]):
-        buy_list = sorted([
-            (order.platinum, order.quantity) for order in self.orders
-            if order.is_buy and order.visible and order.is_ingame and order.mod_rank in mod_rank_range 
-        ], reverse=True)
-        return buy_list[:k]
+        ladders = self._get_ladders(self.buy_ladders, mod_rank_range)
+        if len(ladders) == 1:
+            return ladders[0][:k]
+        return list(itertools.islice(heapq.merge(*ladders, reverse=True), k))
+
+class StatSeries:
+    """
+        one statistic series (e.g., statistics_closed / 48hours) as columns of numpy arrays,
+        partitioned by mod rank and sorted by time, so a time window is 2 binary searches
+
+        self.ranks: mod rank -> {column name: array}, column names are 't' (epoch seconds, UTC) and COLUMNS
+    """
+    COLUMNS = ('volume', 'median', 'avg_price', 'min_price', 'max_price')
+
+    def __init__(self, stats: list[dict]):
+        mod_ranks = np.array([stat.get('mod_rank', 0) for stat in stats], dtype=np.int64)
+        columns = {
+            't': self.parse_timestamps([stat['datetime'] for stat in stats]),
+            'volume': np.array([stat.get('volume', 0) for stat in stats], dtype=np.int64),
+            **{
+                column: np.array([stat.get(column, 0) for stat in stats], dtype=np.float64)
+                for column in self.COLUMNS[1:]
+            },
+        }
+
+        # sort by (mod rank, time) once, then each mod rank is a contiguous slice
+        # (ranks are kept in the order they first appear, lexsort is stable for equal times)
+        order = np.lexsort((columns['t'], mod_ranks))
+        columns = {column: values[order] for column, values in columns.items()}
+        sorted_ranks = mod_ranks[order]
+        unique_ranks, first_index = np.unique(mod_ranks, return_index=True)
+        self.ranks: dict[int, dict[str, np.ndarray]] = {}
+        for mod_rank in unique_ranks[np.argsort(first_index)].tolist():
+            lo, hi = np.searchsorted(sorted_ranks, mod_rank, side='left'), np.searchsorted(sorted_ranks, mod_rank, side='right')
+            self.ranks[mod_rank] = {column: values[lo:hi] for column, values in columns.items()}
+
+    @staticmethod
+    def parse_timestamps(datetimes: list[str]) -> np.ndarray:
+        """
+            ISO datetimes -> int64 epoch seconds (UTC)
+            the API sends UTC ("2024-07-29T07:00:00.000+00:00"), which numpy parses in one go once the offset is cut off,
+            anything else goes through datetime.fromisoformat one by one
+        """
+        if all(dt.endswith('+00:00') for dt in datetimes):
+            return np.array([dt[:-6] for dt in datetimes], dtype='datetime64[ms]').astype(np.int64) // 1000
+        if all(dt.endswith('Z') for dt in datetimes):
+            return np.array([dt[:-1] for dt in datetimes], dtype='datetime64[ms]').astype(np.int64) // 1000
+        return np.array([datetime.datetime.fromisoformat(dt).timestamp() for dt in datetimes], dtype=np.int64)
+
+    def window(self, start: float | None = None, end: float | None = None,
+               mod_rank_range: list | range = [0]) -> dict[str, np.ndarray]:
+        """
+            the rows with start < t < end (either can be None for no bound) and mod rank in mod_rank_range
+            return {column name: array} like self.ranks[...], plus 'mod_rank'
+            rows of a single mod rank are views, not copies
+        """
+        parts = []
+        for mod_rank, columns in self.ranks.items():
+            if mod_rank not in mod_rank_range:
+                continue
+            t = columns['t']
+            lo = 0 if start is None else np.searchsorted(t, start, side='right')
+            hi = len(t) if end is None else np.searchsorted(t, end, side='left')
+            parts.append((mod_rank, {column: values[lo:hi] for column, values in columns.items()}))
+
+        if len(parts) == 1:
+            mod_rank, columns = parts[0]
+            return {**columns, 'mod_rank': np.full(len(columns['t']), mod_rank, dtype=np.int64)}
+        if len(parts) == 0:
+            return {
+                't': np.empty(0, dtype=np.int64), 'volume': np.empty(0, dtype=np.int64),
+                **{column: np.empty(0, dtype=np.float64) for column in self.COLUMNS[1:]},
+                'mod_rank': np.empty(0, dtype=np.int64),
+            }
+        # several ranks, merge them back into time order
+        merged = {
+            column: np.concatenate([columns[column] for _, columns in parts])
+            for column in ['t', *self.COLUMNS]
+        }
+        merged['mod_rank'] = np.concatenate([np.full(len(columns['t']), mod_rank, dtype=np.int64) for mod_rank, columns in parts])
+        order = np.argsort(merged['t'], kind='stable')
+        return {column: values[order] for column, values in merged.items()}
+
+    @classmethod
+    def from_ranks(cls, ranks: dict[int, dict[str, np.ndarray]]) -> 'StatSeries':
+        "a StatSeries of already decoded columns, ref. self.ranks"
+        series = cls.__new__(cls)
+        series.ranks = ranks
+        return series
+
+    def get_latest_timestamp(self) -> int | None:
+        return max((int(columns['t'][-1]) for columns in self.ranks.values() if len(columns['t']) > 0), default=None)
+
+    def merge(self, newer: 'StatSeries', keep_since: float | None = None) -> 'StatSeries':
+        """
+            a new series with the rows of both, by timestamp: the rows of `newer` replace the rows
+            of the same mod rank and time here, and the rows older than keep_since (epoch seconds) are dropped
+        """
+        ranks = {}
+        for mod_rank in dict.fromkeys([*self.ranks, *newer.ranks]):
+            old_columns, new_columns = self.ranks.get(mod_rank), newer.ranks.get(mod_rank)
+            if old_columns is None or new_columns is None:
+                columns = old_columns if new_columns is None else new_columns
+            else:
+                kept = ~np.isin(old_columns['t'], new_columns['t'])
+                columns = {column: np.concatenate([values[kept], new_columns[column]]) for column, values in old_columns.items()}
+                if len(new_columns['t']) > 0 and kept.any() and old_columns['t'][kept][-1] > new_columns['t'][0]:
+                    # the new rows are not all after the old ones (e.g., the API filled a gap), sort them again
+                    order = np.argsort(columns['t'], kind='stable')
+                    columns = {column: values[order] for column, values in columns.items()}
+            if keep_since is not None:
+                lo = np.searchsorted(columns['t'], keep_since, side='left')
+                columns = {column: values[lo:] for column, values in columns.items()}
+            ranks[mod_rank] = columns
+        return StatSeries.from_ranks(ranks)
+
+    @staticmethod
+    def to_dicts(columns: dict[str, np.ndarray]) -> list[dict]:
+        """
+            window() result -> list of stat dicts like the API's (only with the stored columns),
+            with 'datetime' as a datetime
+        """
+        return [
+            {
+                'datetime': datetime.datetime.fromtimestamp(row[0], datetime.timezone.utc),
+                **dict(zip(StatSeries.COLUMNS, row[1:-1])),
+                'mod_rank': row[-1],
+            }
+            for row in zip(*[columns[column].tolist() for column in ['t', *StatSeries.COLUMNS, 'mod_rank']])
+        ]
 
 class Statistic:
     """
         statistics for the past 48hr / 90days on warframe market
     """
-    def __init__(self, statistic_json: dict, basis_time: datetime.datetime | None = None):
+    def __init__(self, statistic_json: dict | None, basis_time: datetime.datetime | None = None):
         """
             statistic_json: 
                 a dict that has keys [statistics_closed, statistics_opened]
@@ -170,18 +530,48 @@ class Statistic:
                 note that the json MIGHT sort timeslot in ascending order so...take note of that
                 the 90days timeslot will only record up until the last time 00:00 UTC happens
                 so might not be the exact newest data (with data age at most 24 hours)
+
+            the series are decoded lazily (ref. get_series), so statistics_opened, which nothing reads for now,
+            is never decoded, and the raw json of a series is dropped once it is decoded
         """
 
-        # TODO: deal with statistics
-        self.statistics = statistic_json.copy()
         self.basis_time = basis_time
+        if statistic_json is None:
+            statistic_json = {}
+
+        # (stat type, timeframe type) -> raw timeslots, until decoded into self._series
+        self._raw_series: dict[tuple[str, str], list[dict]] = {
+            (stat_type, timeframe_type): stats
+            for stat_type, timeframes in statistic_json.items()
+            for timeframe_type, stats in timeframes.items()
+        }
+        self._series: dict[tuple[str, str], StatSeries] = {}
+
+    def get_series(self, stat_type: str = 'statistics_closed', timeframe_type: str = '48hours') -> StatSeries:
+        """
+            the StatSeries of statistic_json[stat_type][timeframe_type], decoded on first access
+        """
+        key = (stat_type, timeframe_type)
+        series = self._series.get(key)
+        if series is None:
+            # no lock (so this stays picklable): 2 threads may both decode it, but only the first result is kept
+            series = self._series.setdefault(key, StatSeries(self._raw_series.get(key, [])))
+            self._raw_series.pop(key, None)
+        return series
+
+    @classmethod
+    def from_series(cls, series: dict[tuple[str, str], StatSeries], basis_time: datetime.datetime | None = None) -> 'Statistic':
+        """
+            a Statistic of already decoded series, {(stat type, timeframe type): StatSeries}
+        """
+        statistic = cls(None, basis_time=basis_time)
+        statistic._series.update(series)
+        return statistic
 
-        # change datetime into actual datetime object
-        for stat_type in self.statistics:
-            for timeframe_type in self.statistics[stat_type]:
-                for stat in self.statistics[stat_type][timeframe_type]:
-                    stat['datetime'] = datetime.datetime.fromisoformat(stat['datetime'])
-                    stat['mod_rank'] = stat.get('mod_rank', 0)
+    def set_series(self, stat_type: str, timeframe_type: str, series: StatSeries):
+        "replace a series, e.g., with a longer history of it, ref. StatisticHistory"
+        self._series[stat_type, timeframe_type] = series
+        self._raw_series.pop((stat_type, timeframe_type), None)
 
     """
         Statistic filtering, should be given **stat_filter:
@@ -199,35 +589,56 @@ class Statistic:
                               (or range(100) if you specifically want all the mod ranks)
     """
 
-    def get_stat_for_last_hours(self, hours: int, 
-                                basis_time: datetime.datetime | None = None,
-                                mod_rank_range: list | range = [0]):
+    def _get_basis_timestamp(self, basis_time: datetime.datetime | None = None) -> float:
+        if basis_time is None:
+            if self.basis_time is None:
+                basis_time = datetime.datetime.now(datetime.timezone.utc)
+            else:
+                basis_time = self.basis_time
+        return basis_time.timestamp()
+
+    def get_columns_for_last_hours(self, hours: int,
+                                   basis_time: datetime.datetime | None = None,
+                                   mod_rank_range: list | range = [0]) -> dict[str, np.ndarray]:
+        """
+            get_stat_for_last_hours(), but as columns, ref. StatSeries.window
+        """
+        start = self._get_basis_timestamp(basis_time) - hours * 60 * 60
+        return self.get_series('statistics_closed', '48hours').window(start=start, mod_rank_range=mod_rank_range)
+
+    def get_columns_for_last_days(self, days: int,
+                                  basis_time: datetime.datetime | None = None,
+                                  mod_rank_range: list | range = [0]) -> dict[str, np.ndarray]:
+        """
+            get_stat_for_last_days(), but as columns, ref. StatSeries.window
+        """
+        start = self._get_basis_timestamp(basis_time) - days * 24 * 60 * 60
+        return self.get_series('statistics_closed', '90days').window(start=start, mod_rank_range=mod_rank_range)
+
+    def get_columns_before_last_days(self, days: int,
+                                     basis_time: datetime.datetime | None = None,
+                                     mod_rank_range: list | range = [0]) -> dict[str, np.ndarray]:
+        """
+            get_stat_before_last_days(), but as columns, ref. StatSeries.window
+        """
+        end = self._get_basis_timestamp(basis_time) - days * 24 * 60 * 60
+        return self.get_series('statistics_closed', '90days').window(end=end, mod_rank_range=mod_rank_range)
+
+    def get_stat_for_last_hours(self, hours: int, **stat_filter):
         """
             get the closed trade stat for the last {hours} hours
             hours in range [1, 48], might not be up to 48 because it depends on
             how many timeslots the API sends back for 48hours.
+            (or longer for items fetched more than once, up to StatisticHistory.KEEP, ref. StatisticHistory)
             
             there must be some error because the records is made on the hour
 
             may return empty list
+            the dicts only have the columns we keep (ref. StatSeries.COLUMNS), prefer get_columns_for_last_hours
         """
-        if basis_time is None:
-            if self.basis_time is None:
-                basis_time = datetime.datetime.now(datetime.timezone.utc)
-            else:
-                basis_time = self.basis_time
-
-        valid_stat = [
-            stat for stat in self.statistics['statistics_closed']['48hours']
-            if stat['datetime'] > basis_time - datetime.timedelta(hours=hours)
-            and stat['mod_rank'] in mod_rank_range
-        ]
-
-        return valid_stat
+        return StatSeries.to_dicts(self.get_columns_for_last_hours(hours, **stat_filter))
 
-    def get_stat_for_last_days(self, days: int, 
-                               basis_time: datetime.datetime | None = None,
-                               mod_rank_range: list | range = [0]):
+    def get_stat_for_last_days(self, days: int, **stat_filter):
         """
             get the closed trade stat for the last {days} days
             days in range [1, 90], might not be up to 90 because it depends on
@@ -238,23 +649,9 @@ class Statistic:
             some details refer to get_volume_for_last_hours
             may return empty list
         """
-        if basis_time is None:
-            if self.basis_time is None:
-                basis_time = datetime.datetime.now(datetime.timezone.utc)
-            else:
-                basis_time = self.basis_time
-
-        valid_stats = [
-            stat for stat in self.statistics['statistics_closed']['90days']
-            if stat['datetime'] > basis_time - datetime.timedelta(days=days)
-            and stat['mod_rank'] in mod_rank_range
-        ]
-
-        return valid_stats
+        return StatSeries.to_dicts(self.get_columns_for_last_days(days, **stat_filter))
     
-    def get_stat_before_last_days(self, days: int, 
-                               basis_time: datetime.datetime | None = None,
-                               mod_rank_range: list | range = [0]):
+    def get_stat_before_last_days(self, days: int, **stat_filter):
         """
             get the closed trade stat before {days} days
             days in range [1, 90], might not be up to 90 because it depends on
@@ -265,25 +662,13 @@ class Statistic:
             some details refer to get_volume_for_last_hours
             may return empty list
         """
-        if basis_time is None:
-            if self.basis_time is None:
-                basis_time = datetime.datetime.now(datetime.timezone.utc)
-            else:
-                basis_time = self.basis_time
-
-        valid_stats = [
-            stat for stat in self.statistics['statistics_closed']['90days']
-            if stat['datetime'] < basis_time - datetime.timedelta(days=days)
-            and stat['mod_rank'] in mod_rank_range
-        ]
-
-        return valid_stats
+        return StatSeries.to_dicts(self.get_columns_before_last_days(days, **stat_filter))
 
     """
         The actual statistic calculation part.
         Can give kwarg **stat_filter to use the above stat, or if there isn't any,
         it should do the filtering itself.
-        Must handle the case where get_stat_for_last_*() returns an empty list
+        Must handle the case where get_columns_*() returns empty arrays
     """
 
     def get_volume_for_last_hours(self, hours: int, **stat_filter):
@@ -294,8 +679,7 @@ class Statistic:
             
             there must be some error because the records is made on the hour
         """
-        stats = self.get_stat_for_last_hours(hours, **stat_filter)
-        return sum([stat['volume'] for stat in stats])
+        return int(self.get_columns_for_last_hours(hours, **stat_filter)['volume'].sum())
     
     def get_volume_for_last_days(self, days: int, **stat_filter):
         """
@@ -307,8 +691,94 @@ class Statistic:
 
             some details refer to get_volume_for_last_hours
         """
-        stats = self.get_stat_for_last_days(days, **stat_filter)
-        return sum([stat['volume'] for stat in stats])
+        return int(self.get_columns_for_last_days(days, **stat_filter)['volume'].sum())
+
+class StatisticHistory:
+    """
+        the hourly closed statistic (statistics_closed / 48hours) of every item prepared so far, merged across
+        fetches by timestamp, so it goes back further than the 48 hours the API sends (up to KEEP)
+        and the hourly oracles can look at e.g. the last 7 days of the items we keep fetching
+
+        it is keyed by item id and is not cleared on refresh, the history outlives the MarketItems
+        each merge only decodes the new payload, the history is already columns
+    """
+    KEEP = datetime.timedelta(days=14)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.series: dict[str, StatSeries] = {}
+
+    def merge(self, item_id: str, statistic: Statistic) -> StatSeries:
+        """
+            merge the statistic's hourly series into the item's history,
+            and give the statistic the merged series instead (ref. Statistic.set_series)
+        """
+        fetched = statistic.get_series('statistics_closed', '48hours')
+        with self._lock:
+            history = self.series.get(item_id)
+            if history is not None and history is not fetched:
+                latest = max(filter(None, [history.get_latest_timestamp(), fetched.get_latest_timestamp()]), default=None)
+                keep_since = None if latest is None else latest - self.KEEP.total_seconds()
+                fetched = history.merge(fetched, keep_since=keep_since)
+            self.series[item_id] = fetched
+        statistic.set_series('statistics_closed', '48hours', fetched)
+        return fetched
+
+    def clear(self):
+        with self._lock:
+            self.series.clear()
+
+statistic_history = StatisticHistory()
+
+def _take_volume_ratio(prices: np.ndarray, volumes: np.ndarray, ratio: float) -> list[tuple[float, int]]:
+    """
+        the oracles count each timeslot's price `volume` times, i.e., for prices already in the order
+        they want them (highest first for the top ones), they want
+            top_K = np.repeat(prices, volumes)[:int(total volume * ratio)]
+        (or all of them if that is empty), this returns top_K as (price, count) pairs instead, without expanding it
+        pairs are in the same order as top_K
+
+        raise statistics.StatisticsError if there is no volume at all, like statistics.mean / median would
+    """
+    total = int(volumes.sum())
+    if total == 0:
+        raise statistics.StatisticsError('no volume')
+    k = int(total * ratio) or total
+
+    top_K = []
+    for price, volume in zip(prices.tolist(), volumes.tolist()):
+        if k == 0:
+            break
+        if volume == 0:
+            continue
+        count = min(volume, k)
+        top_K.append((price, count))
+        k -= count
+    return top_K
+
+def _weighted_mean(pairs: list[tuple[float, int]]):
+    """
+        statistics.mean of the expanded pairs (ref. _take_volume_ratio), and just as exact (i.e., same result)
+    """
+    total = sum(Fraction(price) * count for price, count in pairs)
+    return float(total / sum(count for _, count in pairs))
+
+def _weighted_median(pairs: list[tuple[float, int]]):
+    """
+        statistics.median of the expanded pairs (ref. _take_volume_ratio), same result
+    """
+    pairs = sorted(pairs)
+    n = sum(count for _, count in pairs)
+
+    def nth(i: int):
+        for price, count in pairs:
+            if i < count:
+                return price
+            i -= count
+
+    if n % 2 == 1:
+        return nth(n // 2)
+    return (nth(n // 2 - 1) + nth(n // 2)) / 2
 
 class PriceOracle:
     """
@@ -324,128 +794,42 @@ class PriceOracle:
             don't take the volume into account, everything is based on medians in a timeframe
             ratio: pick the top `ratio` median prices to calculate average, 
         """
-        stats = self.statistic.get_stat_for_last_hours(hours, **stat_filter)
-        if len(stats) == 0:
+        columns = self.statistic.get_columns_for_last_hours(hours, **stat_filter)
+        if len(columns['t']) == 0:
             return 0
-        medians = [stat['median'] for stat in stats]
+        medians = columns['median'].tolist()
         top_medians = sorted(medians, reverse=True)[:int(len(medians) * ratio)]
         if len(medians) == 0:
             return sum(medians) / len(medians)
         return sum(top_medians) / len(top_medians)
     
     def get_avg_median_price_for_last_days(self, days: int, **stat_filter):
-        stats = self.statistic.get_stat_for_last_days(days, **stat_filter)
-        if len(stats) == 0:
+        columns = self.statistic.get_columns_for_last_days(days, **stat_filter)
+        if len(columns['t']) == 0:
             return 0
-        return sum([stat['median'] for stat in stats]) / len(stats)
+        return sum(columns['median'].tolist()) / len(columns['t'])
     
+    # the volume weighted oracles, all evaluated through their OracleSpec (ref. evaluate_oracle_specs)
+    # they take the volume into account, ratio: pick the top (or bottom) `ratio` of the traded volume
+    # return 0 without any timeslot in the window, raise statistics.StatisticsError without any volume
+
     def get_top_k_median_price_for_last_hours(self, hours: int, ratio: float = 1, **stat_filter):
-        """
-            actually take the volume into account
-            ratio: pick the top `ratio` prices to calculate average
-        """
-        stats = self.statistic.get_stat_for_last_hours(hours, **stat_filter)
-        if len(stats) == 0:
-            return 0
-        
-        prices = [[stat['median']] * stat['volume'] for stat in stats]
-        prices = list(itertools.chain.from_iterable(prices))
-        prices = sorted(prices, reverse=True)
-
-        top_K = prices[:int(len(prices) * ratio)]
-        if len(top_K) == 0:
-            return statistics.median(prices)
-        return statistics.median(top_K)
+        return OracleSpec('median', 'for_last_hours', hours, ratio).evaluate(self, **stat_filter)
     
     def get_top_k_avg_price_for_last_hours(self, hours: int, ratio: float = 1, **stat_filter):
-        """
-            actually take the volume into account
-            ratio: pick the top `ratio` prices to calculate average
-        """
-        stats = self.statistic.get_stat_for_last_hours(hours, **stat_filter)
-        if len(stats) == 0:
-            return 0
-        
-        prices = [[stat['median']] * stat['volume'] for stat in stats]
-        prices = list(itertools.chain.from_iterable(prices))
-        prices = sorted(prices, reverse=True)
-
-        top_K = prices[:int(len(prices) * ratio)]
-        if len(top_K) == 0:
-            return statistics.mean(prices)
-        return statistics.mean(top_K)
+        return OracleSpec('mean', 'for_last_hours', hours, ratio).evaluate(self, **stat_filter)
     
     def get_bottom_k_avg_price_for_last_hours(self, hours: int, ratio: float = 1, **stat_filter):
-        """
-            actually take the volume into account
-            ratio: pick the top `ratio` prices to calculate average
-        """
-        stats = self.statistic.get_stat_for_last_hours(hours, **stat_filter)
-        if len(stats) == 0:
-            return 0
-        
-        prices = [[stat['median']] * stat['volume'] for stat in stats]
-        prices = list(itertools.chain.from_iterable(prices))
-        prices = sorted(prices, reverse=False)
-
-        top_K = prices[:int(len(prices) * ratio)]
-        if len(top_K) == 0:
-            return statistics.mean(prices)
-        return statistics.mean(top_K)
+        return OracleSpec('mean', 'for_last_hours', hours, ratio, top=False).evaluate(self, **stat_filter)
     
     def get_top_k_avg_price_for_last_days(self, days: int, ratio: float = 1, **stat_filter):
-        """
-            actually take the volume into account
-            ratio: pick the top `ratio` prices to calculate average
-        """
-        stats = self.statistic.get_stat_for_last_days(days, **stat_filter)
-        if len(stats) == 0:
-            return 0
-        
-        prices = [[stat['median']] * stat['volume'] for stat in stats]
-        prices = list(itertools.chain.from_iterable(prices))
-        prices = sorted(prices, reverse=True)
-
-        top_K = prices[:int(len(prices) * ratio)]
-        if len(top_K) == 0:
-            return statistics.mean(prices)
-        return statistics.mean(top_K)
+        return OracleSpec('mean', 'for_last_days', days, ratio).evaluate(self, **stat_filter)
     
     def get_bottom_k_avg_price_for_last_days(self, days: int, ratio: float = 1, **stat_filter):
-        """
-            actually take the volume into account
-            ratio: pick the top `ratio` prices to calculate average
-        """
-        stats = self.statistic.get_stat_for_last_days(days, **stat_filter)
-        if len(stats) == 0:
-            return 0
-        
-        prices = [[stat['median']] * stat['volume'] for stat in stats]
-        prices = list(itertools.chain.from_iterable(prices))
-        prices = sorted(prices, reverse=False)
-
-        top_K = prices[:int(len(prices) * ratio)]
-        if len(top_K) == 0:
-            return statistics.mean(prices)
-        return statistics.mean(top_K)
+        return OracleSpec('mean', 'for_last_days', days, ratio, top=False).evaluate(self, **stat_filter)
     
     def get_top_k_median_price_before_last_days(self, days: int, ratio: float = 1, **stat_filter):
-        """
-            actually take the volume into account
-            ratio: pick the top `ratio` prices to calculate average
-        """
-        stats = self.statistic.get_stat_before_last_days(days, **stat_filter)
-        if len(stats) == 0:
-            return 0
-        
-        prices = [[stat['median']] * stat['volume'] for stat in stats]
-        prices = list(itertools.chain.from_iterable(prices))
-        prices = sorted(prices, reverse=True)
-
-        top_K = prices[:int(len(prices) * ratio)]
-        if len(top_K) == 0:
-            return statistics.median(prices)
-        return statistics.median(top_K)
+        return OracleSpec('median', 'before_last_days', days, ratio).evaluate(self, **stat_filter)
     
     def get_cur_lowest_price(self, **stat_filter):
         """
@@ -471,6 +855,168 @@ class PriceOracle:
 
         # return self.orders.get_ingame_topK_buy_price(5, mod_rank_range=stat_filter.get('mod_rank_range', [0]))
 
+@dataclass(frozen=True)
+class OracleSpec:
+    """
+        an oracle as data, so it can be evaluated for a lot of items at once (ref. batch_oracle_prices),
+        and so several oracles of the same item can share the work (ref. evaluate_oracle_specs)
+
+        stat: 'mean' | 'median', of the chosen prices,
+              or 'lowest_sell' for the current lowest in-game sell order (window 'orders', the rest is unused)
+        window: 'for_last_hours' | 'for_last_days' | 'before_last_days', ref. Statistic.get_columns_*
+        span: the hours / days of the window
+        ratio: take the top `ratio` of the traded volume
+        top: take the highest prices if True, else the lowest
+
+        e.g., get_top_k_avg_price_for_last_hours(48, 0.3) is OracleSpec('mean', 'for_last_hours', 48, 0.3),
+        get_cur_lowest_price() is OracleSpec('lowest_sell', 'orders')
+        the mod ranks are not part of the spec, they are the mod_rank_range stat filter given when evaluating
+    """
+    stat: str
+    window: str
+    span: int = 0
+    ratio: float = 1
+    top: bool = True
+
+    @property
+    def component(self) -> str:
+        "the MarketItem component (ref. MarketItem.COMPONENTS) it reads"
+        return 'orders' if self.window == 'orders' else 'statistic'
+
+    def get_columns(self, statistic: Statistic, **stat_filter) -> dict[str, np.ndarray]:
+        return getattr(statistic, f'get_columns_{self.window}')(self.span, **stat_filter)
+
+    def evaluate(self, price_oracle: PriceOracle, **stat_filter):
+        """
+            the oracle price of a single item, same as the PriceOracle function it describes
+        """
+        return evaluate_oracle_specs(price_oracle, [self], **stat_filter)[0]
+
+ORACLE_PRICE_48HRS_SPEC = OracleSpec('mean', 'for_last_hours', 48, 0.3)   # PriceOracle.get_oracle_price_48hrs
+
+def evaluate_oracle_specs(price_oracle: PriceOracle, specs: Iterable[OracleSpec], **stat_filter) -> list:
+    """
+        [spec.evaluate(price_oracle, **stat_filter) for spec in specs], but the specs with the same window
+        share one filter-and-sort pass over the statistic, so e.g. every oracle variant of an item
+        costs about as much as one
+
+        like the PriceOracle functions, raise statistics.StatisticsError if a window has timeslots but no volume
+    """
+    sorted_windows: dict[tuple[str, int], tuple[np.ndarray, np.ndarray]] = {}   # (window, span) -> prices, volumes ascending
+    results = []
+    for spec in specs:
+        if spec.window == 'orders':
+            results.append(price_oracle.get_cur_lowest_price(**stat_filter))
+            continue
+        if (spec.window, spec.span) not in sorted_windows:
+            columns = spec.get_columns(price_oracle.statistic, **stat_filter)
+            order = np.argsort(columns['median'], kind='stable')
+            sorted_windows[spec.window, spec.span] = (columns['median'][order], columns['volume'][order])
+        prices, volumes = sorted_windows[spec.window, spec.span]
+        if len(prices) == 0:
+            results.append(0)
+            continue
+        if spec.top:
+            prices, volumes = prices[::-1], volumes[::-1]
+        top_K = _take_volume_ratio(prices, volumes, spec.ratio)
+        results.append(_weighted_mean(top_K) if spec.stat == 'mean' else _weighted_median(top_K))
+    return results
+
+def batch_oracle_prices(market_items: list['MarketItem'], spec: OracleSpec,
+                        mod_rank_ranges: list[list | range] | None = None,
+                        basis_time: datetime.datetime | None = None) -> np.ndarray:
+    """
+        spec.evaluate(item.price) for every item, in one vectorized pass over a padded
+        (item x timeslot) array of every item's prices and volumes
+
+        mod_rank_ranges: the mod_rank_range stat filter of each item, default [0] for all
+        items must have the spec's component prepared
+
+        return a float array, with
+        - 0 for an item without any timeslot in the window (like the oracles)
+        - nan for an item with no volume at all (the oracles raise statistics.StatisticsError)
+        the results are exactly the same as the oracles' as long as the prices are multiples of 0.5
+        (which the API's medians are), since every sum is then exact
+    """
+    return batch_oracle_prices_multi(market_items, [spec], mod_rank_ranges, basis_time)[0]
+
+def batch_oracle_prices_multi(market_items: list['MarketItem'], specs: list[OracleSpec],
+                              mod_rank_ranges: list[list | range] | None = None,
+                              basis_time: datetime.datetime | None = None) -> np.ndarray:
+    """
+        batch_oracle_prices() of several specs, as a (spec x item) array
+        the specs with the same window share the padded array and its sort, ref. evaluate_oracle_specs
+    """
+    if mod_rank_ranges is None:
+        mod_rank_ranges = [[0]] * len(market_items)
+    results = np.zeros((len(specs), len(market_items)), dtype=np.float64)
+
+    # (window, span) -> the spec indices reading it
+    groups: dict[tuple[str, int], list[int]] = defaultdict(list)
+    for i, spec in enumerate(specs):
+        if spec.window == 'orders':
+            results[i] = [
+                item.orders.get_ingame_lowest_sell_price(mod_rank_range=mod_rank_range)
+                for item, mod_rank_range in zip(market_items, mod_rank_ranges)
+            ]
+        else:
+            groups[spec.window, spec.span].append(i)
+
+    for spec_indices in groups.values():
+        windows = [
+            specs[spec_indices[0]].get_columns(item.statistic, basis_time=basis_time, mod_rank_range=mod_rank_range)
+            for item, mod_rank_range in zip(market_items, mod_rank_ranges)
+        ]
+        n_rows = np.array([len(columns['t']) for columns in windows], dtype=np.int64)
+        n_items, width = len(windows), max(n_rows, default=0)
+
+        # padded with volume 0, which is never taken wherever it ends up after sorting
+        prices = np.zeros((n_items, max(width, 1)), dtype=np.float64)
+        volumes = np.zeros((n_items, max(width, 1)), dtype=np.int64)
+        for i, columns in enumerate(windows):
+            prices[i, :n_rows[i]] = columns['median']
+            volumes[i, :n_rows[i]] = columns['volume']
+
+        # one ascending sort for the whole group, the top specs read it backwards
+        order = np.argsort(prices, axis=1, kind='stable')
+        ascending = (np.take_along_axis(prices, order, axis=1), np.take_along_axis(volumes, order, axis=1))
+        descending = (ascending[0][:, ::-1], ascending[1][:, ::-1])
+        cum_volumes = {True: np.cumsum(descending[1], axis=1), False: np.cumsum(ascending[1], axis=1)}
+        for spec_index in spec_indices:
+            spec = specs[spec_index]
+            sorted_prices, sorted_volumes = descending if spec.top else ascending
+            result = _batch_evaluate_sorted(spec, sorted_prices, sorted_volumes, cum_volumes[spec.top])
+            results[spec_index] = np.where(n_rows == 0, 0., result)
+    return results
+
+def _batch_evaluate_sorted(spec: OracleSpec, prices: np.ndarray, volumes: np.ndarray, cum_volumes: np.ndarray) -> np.ndarray:
+    """
+        the (item x timeslot) part of batch_oracle_prices_multi, with every row sorted
+        descending if spec.top else ascending, nan for rows with no volume
+    """
+    total = cum_volumes[:, -1]
+    k = (total * spec.ratio).astype(np.int64)
+    k = np.where(k == 0, total, k)      # like the oracles, take everything if the ratio takes nothing
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if spec.stat == 'mean':
+            taken = np.clip(k[:, None] - (cum_volumes - volumes), 0, volumes)
+            result = (prices * taken).sum(axis=1) / k
+        else:
+            rows = np.arange(len(prices))
+            def nth(i: np.ndarray):
+                "the i-th smallest of the chosen prices of each item"
+                position = k - 1 - i if spec.top else i
+                index = (cum_volumes <= position[:, None]).sum(axis=1)
+                return prices[rows, np.minimum(index, prices.shape[1] - 1)]
+            result = np.where(k % 2 == 1, nth(k // 2), (nth(k // 2 - 1) + nth(k // 2)) / 2)
+
+    return np.where(total == 0, np.nan, result)
+
+_component_versions = itertools.count(1)    # ref. MarketItem.component_version
+# held only while prepare() stores the fetched data, never across a fetch, so readers never need it
+_prepare_lock = threading.Lock()
+
 @dataclass
 class MarketItem:
     """
@@ -486,12 +1032,15 @@ class MarketItem:
         orders (Optional[Order]): The order object for this item. Need to be prepare() first
         statistic (Optional[Statistic]): The statistic object for this item. Need to be prepare() first
         price (Optional[PriceOracle]): The price oracle object for this item. Need to be prepare() first
+                                       (only the parts reading the prepared components work, ref. COMPONENTS)
         is_mod_info_available (bool): Whether the mod related information is available. If it is not, do not access
                                       the below 2 attributes
         is_mod (bool): Whether this item is a mod or not. Only accessible if `is_mod_info_available`.
                        Note that some other things (e.g., arcane) also count as mods. Basically anything that has
                        a "Rank (All / Maxed)" option will have this boolean as True
         mod_max_rank (int): The max rank of this item. Only accessible if `is_mod_info_available and is_mod`
+        user_registry (UserRegistry): Where the users of its orders are interned and its sell offers indexed,
+                                      shared by the items of a catalog. Defaults to the module level user_registry
 
     Note:
         - The tags are basically defined by warframe.market. They might have in-game counterparts, but the name is mostly
@@ -525,9 +1074,31 @@ class MarketItem:
     is_mod_info_available: Any
     is_mod: Any
     mod_max_rank: Any
+    user_registry: Any
+
+    # the data we can prepare() for an item, each one is fetched (and timestamped) separately:
+    # - 'orders': `orders`, from /v2/orders/item/{slug}
+    # - 'statistic': `statistic`, from /v1/items/{slug}/statistics
+    # - 'info': `wiki_link` and `description`, from /v2/item/{slug}
+    # `price` is made from whatever orders / statistic we have
+    COMPONENTS = ('orders', 'statistic', 'info')
+    # how long a prepared component is considered fresh, ref. stale_components
+    # orders move every few minutes, statistic is updated hourly, info basically never changes
+    COMPONENT_TTL = {
+        'orders': datetime.timedelta(minutes=2),
+        'statistic': datetime.timedelta(hours=1),
+        'info': datetime.timedelta(days=1),
+    }
+    # the attributes each component sets, ref. _fetch_component
+    COMPONENT_ATTRIBUTES = {
+        'orders': ('orders',),
+        'statistic': ('statistic',),
+        'info': ('wiki_link', 'description'),
+    }
     
-    def __init__(self, market_json: dict, api_version: str = 'v2'):
+    def __init__(self, market_json: dict, api_version: str = 'v2', registry: UserRegistry | None = None):
         """
+            registry: the user_registry attribute, default the module level user_registry
             market_json: differs according to API version 
                 'v1': has keys like ['id', 'url_name', 'thumb', 'item_name']
                 'v2': {Dict[len=7](
@@ -549,6 +1120,7 @@ class MarketItem:
                     )
                 )
         """
+        self.user_registry = registry if registry is not None else user_registry
         if api_version == 'v1':
             # mostly deprecated, don't maintain this
             self.id = market_json['id']
@@ -562,6 +1134,8 @@ class MarketItem:
             self.is_mod_info_available = False
             self.is_mod = None
             self.mod_max_rank = None
+            self.component_datetime = {}
+            self.component_version = {}
         
         elif api_version == 'v2':
             self.id = market_json['id']
@@ -575,7 +1149,11 @@ class MarketItem:
             self.is_mod = ('maxRank' in market_json)
             self.mod_max_rank = market_json.get('maxRank', 0)
 
-            # the below needs to be prepare()-ed first
+            # the below needs to be prepare()-ed first, ref. COMPONENTS
+            self.component_datetime: dict[str, datetime.datetime] = {}
+            # component -> a number that changes every time it is prepared, e.g., for keying cached
+            # results computed from it (unique across items and refreshes, ref. _component_versions)
+            self.component_version: dict[str, int] = {}
             self.prepare_datetime = None
             self.wiki_link = None
             self.description = None
@@ -591,54 +1169,147 @@ class MarketItem:
         # })
 
         # return Orders(json.loads(r.content)['payload']['orders'], version='v1')
-        r = retry_request(f'https://api.warframe.market/v2/orders/item/{self.url_name}', headers={
-            'accept': 'application/json',
-            'Platform': 'pc',
-            'User-agent': USER_AGENT
-        })
-
-        return Orders(json.loads(r.content)['data'], version='v2')
+        def fetch():
+            r = retry_request(f'https://api.warframe.market/v2/orders/item/{self.url_name}', headers={'accept': 'application/json'})
+            return Orders(util.json_loads(r.content)['data'], version='v2', registry=self.user_registry)
+        return fetch_single_flight.do((self.url_name, 'orders'), fetch)
 
     def _get_statistic(self):
-        r = retry_request(f'https://api.warframe.market/v1/items/{self.url_name}/statistics', headers={
-            'accept': 'application/json',
-            'Platform': 'pc',
-            'User-agent': USER_AGENT
-        })
-
-        return Statistic(json.loads(r.content)['payload'])
+        def fetch():
+            r = retry_request(f'https://api.warframe.market/v1/items/{self.url_name}/statistics', headers={'accept': 'application/json'})
+            return Statistic(util.json_loads(r.content)['payload'])
+        return fetch_single_flight.do((self.url_name, 'statistic'), fetch)
     
     def _get_other_item_info(self):
-        # get wiki link from drops.warframestat.us
-        r = retry_request(f'https://api.warframe.market/v2/item/{self.url_name}')
-        items_data = json.loads(r.content)['data']
-        return {
-            'wiki_link': items_data['i18n']['en'].get('wikiLink', None),
-            'description': items_data['i18n']['en'].get('description', None),
-        }
+        def fetch():
+            # get wiki link from drops.warframestat.us
+            r = retry_request(f'https://api.warframe.market/v2/item/{self.url_name}')
+            items_data = util.json_loads(r.content)['data']
+            return {
+                'wiki_link': items_data['i18n']['en'].get('wikiLink', None),
+                'description': items_data['i18n']['en'].get('description', None),
+            }
+        return fetch_single_flight.do((self.url_name, 'info'), fetch)
 
-    def fetch_prepare_data(self):
+    def _fetch_component(self, component: str) -> dict[str, Any]:
+        """
+            fetch one component (ref. COMPONENTS), return {attribute name: value} to set on this item
+        """
+        if component == 'orders':
+            return {'orders': self._get_orders()}
+        elif component == 'statistic':
+            return {'statistic': self._get_statistic()}
+        elif component == 'info':
+            return self._get_other_item_info()
+        raise ValueError(f"unknown component {component}, must be one of {self.COMPONENTS}")
+
+    def fetch_prepare_data(self, components: Iterable[str] = COMPONENTS):
         """
             fetch the prepared data, takes time with API calls to warframe market
+            only the given components are fetched (ref. COMPONENTS), one request each
 
             note that it only fetches the data, nothing else
             if you wanna update this item's order etc, please use prepare(pre_prepared_data)
         """
-        orders = self._get_orders()
-        statistic = self._get_statistic()
-        
-        return {
-            'orders': orders,
-            'statistic': statistic,
-            'price': PriceOracle(self, orders, statistic),
-            **self._get_other_item_info(),
-            'prepare_datetime': datetime.datetime.now(),
+        return self._make_prepare_data({
+            component: self._fetch_component(component) for component in components
+        })
+
+    async def fetch_prepare_data_async(self, semaphore: asyncio.Semaphore, components: Iterable[str] = COMPONENTS,
+                                       priority: str = 'visible', owner: Hashable = None):
+        """
+            async version of fetch_prepare_data(), the requests are issued concurrently
+            each request takes a slot in `semaphore` while in flight, so one semaphore shared
+            across items limits the total requests in flight
+
+            the requests are scheduled with `priority` and `owner` (ref. FetchScheduler.submit),
+            tagged with this item's url_name so they can be promoted
+        """
+        components = list(components)
+        results = await asyncio.gather(*[
+            _run_limited(semaphore, self._fetch_component, component, priority=priority, owner=owner, tag=self.url_name)
+            for component in components
+        ])
+        return self._make_prepare_data(dict(zip(components, results)))
+
+    def _make_prepare_data(self, component_data: dict[str, dict[str, Any]]):
+        now = datetime.datetime.now()
+        prepare_data = {'component_datetime': {component: now for component in component_data}}
+        for values in component_data.values():
+            prepare_data.update(values)
+        return prepare_data
+
+    def get_prepared_data(self, components: Iterable[str] = COMPONENTS) -> dict[str, Any]:
+        """
+            the prepared components in `components` as prepare data (like fetch_prepare_data(), with the
+            original component_datetime), e.g., to prepare() another MarketItem of the same item with it
+            takes the prepare lock, so the datetimes and the attributes are of the same prepare()
+        """
+        with _prepare_lock:
+            components = [component for component in components if component in self.component_datetime]
+            prepared_data = {'component_datetime': {component: self.component_datetime[component] for component in components}}
+            for component in components:
+                for attribute in self.COMPONENT_ATTRIBUTES[component]:
+                    prepared_data[attribute] = getattr(self, attribute)
+        return prepared_data
+
+    @staticmethod
+    def project_market_json(market_json: dict) -> dict:
+        """
+            a (v2) market_json with only the fields __init__ reads, so the rest of the decoded catalog can be freed
+        """
+        en = market_json['i18n']['en']
+        projected = {k: market_json[k] for k in ('id', 'slug', 'gameRef', 'tags', 'maxRank') if k in market_json}
+        projected['i18n'] = {'en': {k: en[k] for k in ('name', 'icon', 'thumb') if k in en}}
+        return projected
+
+    def to_market_json(self) -> dict:
+        """
+            the (v2) market_json this item can be made from again, with only the fields we read
+        """
+        market_json = {
+            'id': self.id,
+            'slug': self.url_name,
+            'gameRef': self.game_ref,
+            'tags': self.tags,
+            'i18n': {'en': {'name': self.item_name, 'icon': self.icon, 'thumb': self.thumb}},
         }
-        
-    def prepare(self, pre_prepared_data=None):
+        if self.is_mod:
+            market_json['maxRank'] = self.mod_max_rank
+        return market_json
+
+    def missing_components(self, components: Iterable[str] = COMPONENTS, include_stale: bool = False) -> list[str]:
+        """
+            the components (ref. COMPONENTS) in `components` that are not prepared yet
+            include_stale: also include the prepared ones that are stale, ref. stale_components
+        """
+        stale = self.stale_components(components) if include_stale else []
+        return [component for component in components if component not in self.component_datetime or component in stale]
+
+    def stale_components(self, components: Iterable[str] = COMPONENTS) -> list[str]:
+        """
+            the components in `components` that are prepared, but older than COMPONENT_TTL
+        """
+        now = datetime.datetime.now()
+        return [
+            component for component in components
+            if component in self.component_datetime and now - self.component_datetime[component] > self.COMPONENT_TTL[component]
+        ]
+
+    def get_data_age(self, components: Iterable[str] = COMPONENTS) -> float | None:
+        """
+            seconds since the oldest prepared component in `components` was fetched, None if none is prepared
+        """
+        datetimes = [self.component_datetime[component] for component in components if component in self.component_datetime]
+        if len(datetimes) == 0:
+            return None
+        return (datetime.datetime.now() - min(datetimes)).total_seconds()
+
+    def prepare(self, pre_prepared_data=None, components: Iterable[str] = COMPONENTS):
         """
             fetch anything it can first and store inside itself
             please don't get_order or get_statistics yourself
+            only the given components are fetched (ref. COMPONENTS), the others are kept as is
             
             if you already fetch_prepare_data()'d,
             please provide it in pre_prepared_data argument,
@@ -646,12 +1317,37 @@ class MarketItem:
 
             note that we fully trust every single key-value pair of pre_prepared_data,
             without checking the keys etc.
+
+            safe to call from several threads at once: each component is swapped in as a whole
+            (a reader sees either the old or the new orders, never a mix), and concurrent prepares of the
+            same item don't lose each other's component_datetime
+            a component only shows up in component_datetime (i.e., as prepared, ref. missing_components)
+            once its attributes and the price oracle are in place
         """
         if pre_prepared_data is None:
-            pre_prepared_data = self.fetch_prepare_data()
+            pre_prepared_data = self.fetch_prepare_data(components)
         
-        for k, v in pre_prepared_data.items():
-            setattr(self, k, v)
+        with _prepare_lock:
+            for k, v in pre_prepared_data.items():
+                if k != 'component_datetime':
+                    setattr(self, k, v)
+
+            if 'orders' in pre_prepared_data and self.orders is not None:
+                self.user_registry.set_item_offers(self.item_name, self.orders)
+            if 'statistic' in pre_prepared_data and self.statistic is not None:
+                statistic_history.merge(self.id, self.statistic)
+
+            # the oracle reads whatever components we have, so it needs to be remade
+            self.price = PriceOracle(self, self.orders, self.statistic)
+
+            # only now that the history and the oracle have the new data: whatever is cached under a version
+            # (e.g., server.oracle_cache) is computed from data at least as new as it, never from older data
+            for component in pre_prepared_data.get('component_datetime', {}):
+                self.component_version[component] = next(_component_versions)
+
+            # last, readers take the components in it as ready
+            self.component_datetime = {**self.component_datetime, **pre_prepared_data.get('component_datetime', {})}
+            self.prepare_datetime = max(self.component_datetime.values(), default=None)
 
         print(f'[prepare] {self.orders = }, {self.price = }')
 
@@ -689,37 +1385,47 @@ class User:
         self.user_ingame_name = None
         self.orders = None
     
-    def fetch_data(self):
-        # TODO: maybe should've used Order...? maybe not tbh
+    def _get_urls(self):
+        """
+            return (order URL, user URL), by user_id if we have it, else by user_slug
+        """
         if self.user_id is not None:
-            order_r = retry_request(f'https://api.warframe.market/v2/orders/userId/{self.user_id}', headers={
-                'accept': 'application/json',
-                'Platform': 'pc',
-                'User-agent': USER_AGENT
-            })  
-            user_r = retry_request(f'https://api.warframe.market/v2/userId/{self.user_id}', headers={
-                'accept': 'application/json',
-                'Platform': 'pc',
-                'User-agent': USER_AGENT
-            })  
-            
+            return (
+                f'https://api.warframe.market/v2/orders/userId/{self.user_id}',
+                f'https://api.warframe.market/v2/userId/{self.user_id}',
+            )
         elif self.user_slug is not None:
-            order_r = retry_request(f'https://api.warframe.market/v2/orders/user/{self.user_slug}', headers={
-                'accept': 'application/json',
-                'Platform': 'pc',
-                'User-agent': USER_AGENT
-            })
-            user_r = retry_request(f'https://api.warframe.market/v2/user/{self.user_slug}', headers={
-                'accept': 'application/json',
-                'Platform': 'pc',
-                'User-agent': USER_AGENT
-            })
+            return (
+                f'https://api.warframe.market/v2/orders/user/{self.user_slug}',
+                f'https://api.warframe.market/v2/user/{self.user_slug}',
+            )
         else:
             raise ValueError("Either user_slug or user_id must be provided")
 
-        self.user_id = json.loads(user_r.content)['data']['id']
-        self.user_slug = json.loads(user_r.content)['data']['slug']
-        self.user_ingame_name = json.loads(user_r.content)['data']['ingameName']
+    def _get(self, url):
+        return retry_request(url, headers={'accept': 'application/json'})
+
+    def fetch_data(self):
+        # TODO: maybe should've used Order...? maybe not tbh
+        order_url, user_url = self._get_urls()
+        self._set_data(self._get(order_url), self._get(user_url))
+
+    async def fetch_data_async(self, semaphore: asyncio.Semaphore):
+        """
+            async version of fetch_data(), the 2 requests are issued concurrently
+        """
+        order_url, user_url = self._get_urls()
+        order_r, user_r = await asyncio.gather(
+            _run_limited(semaphore, self._get, order_url),
+            _run_limited(semaphore, self._get, user_url),
+        )
+        self._set_data(order_r, user_r)
+
+    def _set_data(self, order_r, user_r):
+        user_data = util.json_loads(user_r.content)['data']
+        self.user_id = user_data['id']
+        self.user_slug = user_data['slug']
+        self.user_ingame_name = user_data['ingameName']
         self.orders = [
             {
                 'item_id': order['itemId'],
@@ -728,42 +1434,85 @@ class User:
                 'platinum': order['platinum'],
                 'quantity': order['quantity'],
             }
-            for order in json.loads(order_r.content)['data']
+            for order in util.json_loads(order_r.content)['data']
         ]
 
-def get_market_item_list() -> list[MarketItem]:
-    r = retry_request('https://api.warframe.market/v2/items', headers={
-        'accept': 'application/json',
-        'Language': 'en',
-        'User-agent': USER_AGENT
-    })
+def get_market_item_list(registry: UserRegistry | None = None) -> list[MarketItem]:
+    "registry: the items' user_registry (ref. MarketItem), default the module level one"
+    r = retry_request('https://api.warframe.market/v2/items', headers={'accept': 'application/json'}, use_cache=True)
     # items = json.loads(r.content)['payload']['items']   # for v1
-    items = json.loads(r.content)['data']
-    return [MarketItem(i, api_version='v2') for i in items]
-
-def prepare_market_items(market_items: list[MarketItem]):
-    "does parallel"
-    def task(item: MarketItem):
-        item.prepare()
-        return item
-    
-    with util.tqdm_joblib(tqdm(range(len(market_items)), 'Fetching items...', leave=False)) as tqdm_progress:
-        results = Parallel(n_jobs=5, require='sharedmem')(delayed(task)(item) for item in market_items)
-
-    for i in range(len(market_items)):
-        market_items[i] = results[i]
-
-def fetch_users_data(user_ls: list[User]):
-    "does parallel"
-    def task(user: User):
-        user.fetch_data()
-        return user
-    
-    with util.tqdm_joblib(tqdm(range(len(user_ls)), 'Fetching users...')) as tqdm_progress:
-        results = Parallel(n_jobs=5, require='sharedmem')(delayed(task)(user) for user in user_ls)
-
-    for i in range(len(user_ls)):
-        user_ls[i] = results[i]
+    # keep only the fields MarketItem reads, the full decoded catalog is freed right after this line
+    items = [MarketItem.project_market_json(i) for i in util.json_loads(r.content)['data']]
+    del r   # don't keep the raw body around while making the items
+    return [MarketItem(i, api_version='v2', registry=registry) for i in items]
+
+async def prepare_market_items_async(market_items: list[MarketItem], max_in_flight: int | None = None,
+                                     on_fetched: Callable[[MarketItem, dict], Any] | None = None,
+                                     should_stop: Callable[[], bool] | None = None,
+                                     components: Iterable[str] = MarketItem.COMPONENTS, only_missing: bool = False,
+                                     include_stale: bool = False, priority: str = 'visible', owner: Hashable = None):
+    """
+        the async fetch engine behind prepare_market_items
+        each item's requests are issued concurrently, and at most `max_in_flight` requests
+        are in flight across all items at once
+
+        on_fetched(item, data): called after an item's data is fetched, defaults to item.prepare(data)
+            (e.g., the server takes a lock and updates the progress in it)
+        should_stop(): checked before an item starts fetching, if it returns True the item is skipped
+        components: the components to fetch (ref. MarketItem.COMPONENTS)
+        only_missing: only fetch the components in `components` that the item doesn't have yet,
+            items that have all of them are skipped (on_fetched isn't called for them)
+        include_stale: with only_missing, stale components count as missing, ref. MarketItem.stale_components
+        priority, owner: how the requests are scheduled against other runs, ref. FetchScheduler.submit
+    """
+    max_in_flight = max_in_flight or MAX_IN_FLIGHT_REQUESTS
+    request_slots = asyncio.Semaphore(max_in_flight)
+    item_slots = asyncio.Semaphore(max_in_flight)   # so items are fetched in order, instead of all at once
+
+    async def task(item: MarketItem):
+        async with item_slots:
+            if should_stop is not None and should_stop():
+                return
+            item_components = item.missing_components(components, include_stale) if only_missing else components
+            if len(item_components) == 0:
+                return
+            data = await item.fetch_prepare_data_async(request_slots, item_components, priority, owner)
+        if on_fetched is None:
+            item.prepare(data)
+        else:
+            on_fetched(item, data)
+
+    await asyncio.gather(*[task(item) for item in market_items])
+
+def prepare_market_items(market_items: list[MarketItem], max_in_flight: int | None = None,
+                         components: Iterable[str] = MarketItem.COMPONENTS, only_missing: bool = False,
+                         include_stale: bool = False, priority: str = 'visible'):
+    "does parallel, ref. prepare_market_items_async"
+    with tqdm(total=len(market_items), desc='Fetching items...', leave=False) as tqdm_progress:
+        def on_fetched(item: MarketItem, data: dict):
+            item.prepare(data)
+            tqdm_progress.update(1)
+        run_async(prepare_market_items_async(
+            market_items, max_in_flight, on_fetched,
+            components=components, only_missing=only_missing, include_stale=include_stale, priority=priority,
+        ))
+
+async def fetch_users_data_async(user_ls: list[User], max_in_flight: int | None = None,
+                                 on_fetched: Callable[[User], Any] | None = None):
+    "ref. prepare_market_items_async"
+    request_slots = asyncio.Semaphore(max_in_flight or MAX_IN_FLIGHT_REQUESTS)
+
+    async def task(user: User):
+        await user.fetch_data_async(request_slots)
+        if on_fetched is not None:
+            on_fetched(user)
+
+    await asyncio.gather(*[task(user) for user in user_ls])
+
+def fetch_users_data(user_ls: list[User], max_in_flight: int | None = None):
+    "does parallel, ref. fetch_users_data_async"
+    with tqdm(total=len(user_ls), desc='Fetching users...') as tqdm_progress:
+        run_async(fetch_users_data_async(user_ls, max_in_flight, lambda user: tqdm_progress.update(1)))
 
 def get_syndicate_names() -> list[str]:
     """
@@ -777,8 +1526,8 @@ def get_syndicate_names() -> list[str]:
     ] + ['Cavia']
     """
 
-    r = requests.get('https://drops.warframestat.us/data/syndicates.json')
-    syndicate_names = json.loads(r.content)['syndicates'].keys()
+    r = retry_request('https://drops.warframestat.us/data/syndicates.json', use_cache=True)
+    syndicate_names = util.json_loads(r.content)['syndicates'].keys()
 
     return syndicate_names + additional_syndicates.keys()
 
@@ -805,10 +1554,10 @@ def get_syndicate_items(syndicate_name: str, market_map: None | list[MarketItem]
         
     else:
         if _r is None:
-            r = requests.get('https://drops.warframestat.us/data/syndicates.json')
+            r = retry_request('https://drops.warframestat.us/data/syndicates.json', use_cache=True)
         else:
             r = _r
-        syndicate_items = json.loads(r.content)['syndicates'][syndicate_name]
+        syndicate_items = util.json_loads(r.content)['syndicates'][syndicate_name]
         syndicate_items = [
             {'name': i['item'], 'standing': i.get('standing', None)} for i in syndicate_items
         ]
@@ -846,8 +1595,8 @@ def get_all_syndicate_items(market_map: None | list[MarketItem] = None, return_s
 
     syndicate_map = {}
 
-    r = requests.get('https://drops.warframestat.us/data/syndicates.json')
-    syndicates = json.loads(r.content)['syndicates']
+    r = retry_request('https://drops.warframestat.us/data/syndicates.json', use_cache=True)
+    syndicates = util.json_loads(r.content)['syndicates']
 
     for syndicate_name in list(syndicates.keys()) + list(additional_syndicates.keys()):
         print(syndicate_name)
@@ -874,8 +1623,9 @@ def get_relic_data(discard_forma: bool = False) -> dict[str, dict[str, list[str]
 
         return {relic name -> {rarity: list of items}}
     """
-    r = retry_request('https://drops.warframestat.us/data/relics.json')
-    relic_data_ls = json.loads(r.content)['relics']
+    r = retry_request('https://drops.warframestat.us/data/relics.json', use_cache=True)
+    relic_data_ls = util.json_loads(r.content)['relics']
+    del r
     relic_map = {}
     for relic_data in relic_data_ls:
         if relic_data['state'] != 'Intact':
@@ -907,8 +1657,8 @@ def get_transient_mission_rewards() -> dict[str, list[str]]:
 
         return {node name -> {rotation -> list of {item_name, rarity, chance}}}
     """
-    mission_reward = retry_request('https://drops.warframestat.us/data/transientRewards.json')
-    mission_reward = json.loads(mission_reward.content)['transientRewards']
+    mission_reward = retry_request('https://drops.warframestat.us/data/transientRewards.json', use_cache=True)
+    mission_reward = util.json_loads(mission_reward.content)['transientRewards']
     ret_reward = {}
     for mission in mission_reward:
         rewards = defaultdict(list)
@@ -936,7 +1686,7 @@ def get_varzia_relics() -> list[str]:
     (2) if the webpage is changed then this function might break
     """
     try:
-        r = requests.get("https://wiki.warframe.com/w/Varzia")
+        r = http_client.get("https://wiki.warframe.com/w/Varzia")
         html = etree.HTML(r.content)
         a = html.xpath("//*[@id='mw-customcollapsible-vrelics']//td//text()")   # ['\xa0', 'Lith\xa0A1', '\n', '☒', '\n', '\xa0', 'Lith\xa0A2', '\n', '☒', '\n'], ...
         a = [i.replace('\xa0', ' ') for i in a if i not in ['\n', '\xa0']]  # ['Lith A1', '☒', 'Lith A2', '☒', ...
@@ -981,8 +1731,8 @@ def get_ducat_data(market_items: None | list[MarketItem] = None) -> list[dict[st
 
     if market_items is None:
         market_items = get_market_item_list()
-    r = retry_request("https://api.warframe.market/v1/tools/ducats")
-    data = json.loads(r.content)['payload']
+    r = retry_request("https://api.warframe.market/v1/tools/ducats", use_cache=True)
+    data = util.json_loads(r.content)['payload']
     previous_hour = data['previous_hour']
     previous_day = data['previous_day']
     market_id_map = {i.id: i for i in market_items}
@@ -1,6 +1,10 @@
 from copy import deepcopy
+from collections import Counter
+import atexit
+import gzip
+import hashlib
+import json
 import operator
-import pickle
 import threading
 from typing import *
 import uuid
@@ -8,15 +12,18 @@ from flask import Flask, render_template, request, Response
 import datetime
 import dataclasses
 from pathlib import Path
+from types import MappingProxyType
 import os
 import time
 import uuid
 import concurrent
-from joblib import Parallel, delayed
 
 from ... import warframe_market as wfm
 from ... import interactive as wfi
 from ... import util as util
+from ... import http_client
+from ... import market_snapshot
+from ...search_index import NameIndex
 from ...data.inventory.parse_inventory import WarframePublicExport, WarframeWiki
 
 app = Flask(__name__)
@@ -28,48 +35,178 @@ try:
 except ImportError:
     DEBUG, HOST, PORT = True, 'localhost', 5000
 
+try:
+    from .config import WARMUP_ITEMS
+except ImportError:
+    WARMUP_ITEMS = 100     # how many of the most traded items to prefetch after each refresh, 0 to disable
+WARMUP_COMPONENTS = ['statistic']   # what most queries (i.e., the statistic oracles) need, ref. warmup
+ACCESS_LOG_FILE = Path('./.cache/access_log.json')  # item name -> times requested, ref. record_access
+
 wfm.RETRY_MAX_TIME = 1    # reduce retry time for better responsiveness
 
-market_lock = threading.Lock()   # ok ngl i don't really know why i added this but better safe than sorry
-market_items: list[wfm.MarketItem] = None
-market_map: dict[str, wfm.MarketItem] = None
-market_id_map: dict[str, wfm.MarketItem] = None
-market_data_update_date: datetime.datetime = None
-wpe = WarframePublicExport()
-wwiki = WarframeWiki()
-ducat_data = None
-cache = {}
-
-# args, kwargs is passed to price oracle functions
-# for now, kwargs = stat_filter
-oracle_price_fn_map = {
-    'default_oracle_price_48h': lambda price_oracle, *args, **kwargs: price_oracle.get_oracle_price_48hrs(*args, **kwargs),
-    'top_30%_avg_in_48h': lambda price_oracle, *args, **kwargs: price_oracle.get_top_k_avg_price_for_last_hours(48, 0.3, *args, **kwargs),
-    'bottom_30%_avg_in_48h': lambda price_oracle, *args, **kwargs: price_oracle.get_bottom_k_avg_price_for_last_hours(48, 0.3, *args, **kwargs),
-    'all_avg_in_48h': lambda price_oracle, *args, **kwargs: price_oracle.get_top_k_avg_price_for_last_hours(48, 1, *args, **kwargs),
-    'top_30%_avg_in_90d': lambda price_oracle, *args, **kwargs: price_oracle.get_top_k_avg_price_for_last_days(90, 0.3, *args, **kwargs),
-    'bottom_30%_avg_in_90d': lambda price_oracle, *args, **kwargs: price_oracle.get_bottom_k_avg_price_for_last_days(90, 0.3, *args, **kwargs),
-    'all_avg_in_90d': lambda price_oracle, *args, **kwargs: price_oracle.get_top_k_avg_price_for_last_days(90, 1, *args, **kwargs),
-    'cur_lowest_price': lambda price_oracle, *args, **kwargs: price_oracle.get_cur_lowest_price(*args, **kwargs),
+@dataclasses.dataclass(frozen=True)
+class MarketState:
+    """
+    one version of the market data, never modified once published (ref. publish_market_state)
+
+    readers take `state = market_state` once and only use that state, without any lock: a refresh builds
+    the next state on the side and swaps it in as a whole, so a reader sees either the old or the new one
+    and never waits on the network
+    the items are still prepared in place, but every component is swapped in as a whole (ref. MarketItem.prepare)
+    user_registry is the items' own (ref. MarketItem.user_registry), so the sell offers of another version's
+    items never show up in this one, and it goes away with the version
+    """
+    version: int = 0    # 0: nothing published yet
+    market_items: tuple[wfm.MarketItem, ...] = ()
+    market_map: Mapping[str, wfm.MarketItem] = dataclasses.field(default_factory=lambda: MappingProxyType({}))
+    market_id_map: Mapping[str, wfm.MarketItem] = dataclasses.field(default_factory=lambda: MappingProxyType({}))
+    market_data_update_date: datetime.datetime | None = None
+    ducat_data: dict = dataclasses.field(default_factory=lambda: {'previous_hour': {}, 'previous_day': {}})
+    user_registry: wfm.UserRegistry = dataclasses.field(default_factory=wfm.UserRegistry)
+    wpe: WarframePublicExport = dataclasses.field(default_factory=WarframePublicExport)
+    wwiki: WarframeWiki = dataclasses.field(default_factory=WarframeWiki)
+    # data derived from this version, filled in lazily by use(), it goes away with the version
+    cache: dict = dataclasses.field(default_factory=dict, compare=False, repr=False)
+
+market_state = MarketState()
+market_state_lock = threading.Lock()    # only for the writers (ref. publish_market_state), readers never take it
+refresh_lock = threading.Lock()         # one refresh() at a time, only refresh() waits for it
+
+# oracle type -> what it computes, ref. wfm.OracleSpec
+# every oracle is evaluated through its spec, so any number of them over the same items share the work,
+# ref. get_oracle_prices_multi
+oracle_spec_map = {
+    'default_oracle_price_48h': wfm.ORACLE_PRICE_48HRS_SPEC,
+    'top_30%_avg_in_48h': wfm.OracleSpec('mean', 'for_last_hours', 48, 0.3),
+    'bottom_30%_avg_in_48h': wfm.OracleSpec('mean', 'for_last_hours', 48, 0.3, top=False),
+    'all_avg_in_48h': wfm.OracleSpec('mean', 'for_last_hours', 48, 1),
+    'top_30%_avg_in_90d': wfm.OracleSpec('mean', 'for_last_days', 90, 0.3),
+    'bottom_30%_avg_in_90d': wfm.OracleSpec('mean', 'for_last_days', 90, 0.3, top=False),
+    'all_avg_in_90d': wfm.OracleSpec('mean', 'for_last_days', 90, 1),
+    'cur_lowest_price': wfm.OracleSpec('lowest_sell', 'orders'),
 }
 
-def refresh():
-    global market_items, market_map, market_id_map, market_data_update_date, wpe, wwiki, ducat_data, cache
-    print(f'{util.GREEN}[*] get market item...{util.RESET}')
-    market_items = wfm.get_market_item_list()
-    market_map = wfm.get_market_items_name_map(market_items)
-    market_id_map = wfm.get_market_items_id_map(market_items)
-    print(f'{util.GREEN}[*] get ducat data...{util.RESET}')
-    ducat_data = wfm.get_ducat_data(market_items)
-    market_data_update_date = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=8)))
-    wpe = WarframePublicExport()
-    wwiki = WarframeWiki()
-    cache = {}
-
-def use(name, callback):
+# oracle type -> fn(price_oracle, **stat_filter), one item at a time
+oracle_price_fn_map = {oracle_type: spec.evaluate for oracle_type, spec in oracle_spec_map.items()}
+
+# (item id, component version, oracle type, mod_rank_range, basis hour) -> oracle price, ref. get_oracle_prices
+# the component version changes whenever the item is prepared again, so re-prepared items just miss
+oracle_cache = util.MemoCache(max_size=200000)
+
+def get_oracle_prices(items: list[wfm.MarketItem], oracle_type, mod_rank_ranges=None) -> list[float | None]:
+    """
+    oracle_price_fn_map[oracle_type](item.price, mod_rank_range=...) for every item, ref. get_oracle_prices_multi
+    """
+    return get_oracle_prices_multi(items, [oracle_type], mod_rank_ranges)[oracle_type]
+
+def get_oracle_prices_multi(items: list[wfm.MarketItem], oracle_types: list[str], mod_rank_ranges=None) -> dict[str, list[float | None]]:
+    """
+    oracle type -> [oracle_price_fn_map[oracle_type](item.price, mod_rank_range=...) for every item],
+    all in one pass (ref. wfm.batch_oracle_prices_multi), the oracles with the same window share it
+    items with no volume at all get None
+
+    results are memoized in oracle_cache, so only the items whose data changed since the last call are computed
+    the statistic oracles are computed at the middle of the current hour: the statistic timeslots are on the hour,
+    so any time within the hour gives the same windows as now(), and the result stays valid for the whole hour
+
+    mod_rank_ranges: each item's mod_rank_range, default [0]
+    """
+    if mod_rank_ranges is None:
+        mod_rank_ranges = [[0]] * len(items)
+    hour_basis_time = datetime.datetime.now(datetime.timezone.utc).replace(minute=30, second=0, microsecond=0)
+
+    keys = {}       # oracle type -> each item's cache key
+    prices = {}     # oracle type -> each item's price, MISSING until computed
+    for oracle_type in oracle_types:
+        component = oracle_spec_map[oracle_type].component
+        basis_time = hour_basis_time if component == 'statistic' else None  # the orders are a snapshot, no time window
+        keys[oracle_type] = [
+            (
+                item.id, item.component_version.get(component), oracle_type,
+                mod_rank_range if isinstance(mod_rank_range, range) else tuple(mod_rank_range), basis_time,
+            )
+            for item, mod_rank_range in zip(items, mod_rank_ranges)
+        ]
+        prices[oracle_type] = [oracle_cache.get(key, util.MemoCache.MISSING) for key in keys[oracle_type]]
+
+    # compute every requested oracle of the items missing any of them, so they still share the pass
+    missing = [i for i in range(len(items)) if any(prices[oracle_type][i] is util.MemoCache.MISSING for oracle_type in oracle_types)]
+    if len(missing) > 0:
+        computed = wfm.batch_oracle_prices_multi(
+            [items[i] for i in missing], [oracle_spec_map[oracle_type] for oracle_type in oracle_types],
+            [mod_rank_ranges[i] for i in missing], basis_time=hour_basis_time,
+        )
+        for oracle_type, row in zip(oracle_types, computed.tolist()):
+            for i, price in zip(missing, row):
+                price = None if price != price else price   # nan -> None
+                prices[oracle_type][i] = price
+                oracle_cache.put(keys[oracle_type][i], price)
+    return prices
+
+def get_oracle_components(oracle_type) -> list[str]:
+    """
+    the MarketItem components (ref. MarketItem.COMPONENTS) that oracle_price_fn_map[oracle_type] reads
+    """
+    return [oracle_spec_map[oracle_type].component]
+
+def publish_market_state(market_items: list[wfm.MarketItem], ducat_data: dict,
+                         market_data_update_date: datetime.datetime | None, **changes) -> MarketState:
+    """
+    make the given market data the current market_state, as a new version with an empty use() cache
+    changes: other MarketState fields to replace, the rest is carried over
+    """
+    global market_state
+    with market_state_lock:
+        market_state = dataclasses.replace(
+            market_state,
+            version=market_state.version + 1,
+            market_items=tuple(market_items),
+            market_map=MappingProxyType(wfm.get_market_items_name_map(market_items)),
+            market_id_map=MappingProxyType(wfm.get_market_items_id_map(market_items)),
+            market_data_update_date=market_data_update_date,
+            ducat_data=ducat_data,
+            cache={},
+            **changes,
+        )
+        return market_state
+
+def refresh(keep_prepared: bool = False):
+    """
+    fetch the market data and publish it as the next market_state, readers keep using the current one meanwhile
+
+    keep_prepared: carry the prepared components of the current items over to the new ones (e.g., the ones
+                   loaded from a snapshot), they keep their fetch time so the stale ones get revalidated as usual
+    if fetching fails, the current data is kept (e.g., to keep serving a snapshot while offline)
+    """
+    with refresh_lock:
+        print(f'{util.GREEN}[*] get market item...{util.RESET}')
+        # a new registry for the new items, the current one stays with the current state (and its items,
+        # which may still be preparing)
+        user_registry = wfm.UserRegistry()
+        market_items = wfm.get_market_item_list(user_registry)
+        print(f'{util.GREEN}[*] get ducat data...{util.RESET}')
+        ducat_data = wfm.get_ducat_data(market_items)
+
+        old_state = market_state
+        if keep_prepared:
+            for item in market_items:
+                old_item = old_state.market_id_map.get(item.id)
+                if old_item is not None and old_item.component_datetime:
+                    item.prepare(old_item.get_prepared_data())
+        publish_market_state(
+            market_items, ducat_data, datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=8))),
+            wpe=WarframePublicExport(), wwiki=WarframeWiki(), user_registry=user_registry,
+        )
+        oracle_cache.clear()
+    start_warmup()
+    save_snapshot()
+
+def use(name, callback, state: MarketState | None = None):
     """
     react style use
+    memoized per market_state version (or the given state's), so a refresh recomputes it
     """
+    cache = (state or market_state).cache
     if name not in cache:
         cache[name] = callback()
     return cache[name]
@@ -79,9 +216,59 @@ def use(name, callback):
 Task management
 """
 
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
-task_pool = {}
+# tasks mostly wait for wfm.fetch_scheduler, which decides what gets fetched first, so a lot of them can run at once
+executor = concurrent.futures.ThreadPoolExecutor(max_workers=16)
+task_pool: dict[str, 'TaskStatus'] = {}
 stop_obj_pool = {}
+PROGRESS_STREAM_KEEPALIVE = 15     # seconds, a comment is sent when nothing changed for this long
+TASK_END_STATUSES = ('done', 'error', 'stopped')    # a task's status doesn't change after one of these
+
+class TaskStatus(dict):
+    """
+    the task_status of register_task: a dict that wakes up whoever is waiting for it to change
+    (ref. wait_change, progress_stream), every task_status[key] = value counts as a change
+
+    a task can also hand out its results bit by bit before it is done (ref. add_partial), those are sent
+    from a cursor on (ref. snapshot), so a client only gets each of them once
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seq = 0    # bumped by every change
+        self.changed = threading.Condition()
+        self.partial = []   # append only, ref. add_partial
+
+    def __setitem__(self, key, value):
+        with self.changed:
+            super().__setitem__(key, value)
+            self.seq += 1
+            self.changed.notify_all()
+
+    def add_partial(self, values: list):
+        """
+        add partial results, e.g., the rows of the items that are ready, what they are is up to the task
+        """
+        if len(values) == 0:
+            return
+        with self.changed:
+            self.partial.extend(values)
+            self.seq += 1
+            self.changed.notify_all()
+
+    def snapshot(self, partial_from: int = 0) -> dict:
+        """
+        a copy of the status, with 'partial': the partial results from partial_from on, and 'partial_from'
+        """
+        with self.changed:
+            return {**self, 'partial': self.partial[partial_from:], 'partial_from': partial_from}
+
+    def wait_change(self, seq: int, timeout: float | None = None, partial_from: int = 0) -> tuple[int, dict]:
+        """
+        wait until there is a change after seq (or until timeout)
+        return (the current seq, the snapshot at that seq)
+        """
+        with self.changed:
+            self.changed.wait_for(lambda: self.seq != seq, timeout)
+            return self.seq, self.snapshot(partial_from)
 
 def register_task(task_callback):
     """
@@ -94,12 +281,13 @@ def register_task(task_callback):
     note that you should modify task_status in-place
     the given status would look like:
     {
-        'status': 'in_progress' | 'done' | 'error',   // current task status
+        'status': 'in_progress' | 'done' | 'error' | 'stopped',   // current task status, 'stopped' ref. task_stop
         'total': int,       // progress bar total steps
         'current': int,     // progress bar current steps
         'data': any | None  // only useful when status is 'done')
         'error': any | None // only useful when status is 'error'
     }
+    and the progress endpoints add 'partial' and 'partial_from', ref. TaskStatus.add_partial
     you should guarentee that:
     - when status is 'done', data should be set
     - when status is 'error', error should be set
@@ -108,13 +296,13 @@ def register_task(task_callback):
     if, during the task, you find that stop_obj['stop'] is True, you should terminate the task ASAP and call task_stop(task_id)
     """
     task_id = str(uuid.uuid4())
-    task_status = {
+    task_status = TaskStatus({
         'status': 'in_progress',
         'total': 0,
         'current': 0,
         'data': None,
         'error': None
-    }
+    })
     stop_obj = {'stop': False}
     task_pool[task_id] = task_status
     stop_obj_pool[task_id] = stop_obj
@@ -129,13 +317,57 @@ def register_task(task_callback):
 
 @app.route("/api/progress/<task_id>")
 def progress(task_id):
+    """
+    the task status (ref. register_task)
+    query partial_from: the number of partial results the client already has, only the ones after are sent
+    """
     status = task_pool.get(task_id)
     if status is None:
         return {"error": "invalid task id"}, 404
-    if status['status'] == 'done' or status['status'] == 'error':
+    snapshot = status.snapshot(request.args.get('partial_from', 0, type=int))
+    if snapshot['status'] in TASK_END_STATUSES:
         # remove from pool
-        task_pool.pop(task_id)
-    return status
+        task_pool.pop(task_id, None)
+    return snapshot
+
+@app.route("/api/progress_stream/<task_id>")
+def progress_stream(task_id):
+    """
+    the same as /api/progress, pushed as server-sent events instead of polled:
+    an event with the task status (as /api/progress returns it) whenever it changes, the last one is
+    when the status is 'done', 'error' or 'stopped' (ref. task_stop), after which the task is removed as in /api/progress
+
+    every event only has the partial results that weren't sent before
+    the event id is "{the status' change count}.{the partial results sent}", a reconnecting EventSource sends
+    it back (Last-Event-ID) and only gets an event once there is a newer status, with the partial results it missed
+    """
+    status = task_pool.get(task_id)
+    if status is None:
+        return {"error": "invalid task id"}, 404
+    try:
+        last_seq, partial_sent = map(int, request.headers.get('Last-Event-ID', '-1.0').split('.'))
+    except ValueError:
+        last_seq, partial_sent = -1, 0
+
+    def stream():
+        seq, partial_from = last_seq, partial_sent
+        while True:
+            new_seq, snapshot = status.wait_change(seq, timeout=PROGRESS_STREAM_KEEPALIVE, partial_from=partial_from)
+            if new_seq == seq:
+                yield ': keep-alive\n\n'    # also how we find out that the client is gone
+                continue
+            seq = new_seq
+            partial_from += len(snapshot['partial'])
+            # one line, whatever the debug mode indent is, and the same types as the other responses
+            yield f'id: {seq}.{partial_from}\ndata: {json.dumps(snapshot, default=app.json.default)}\n\n'
+            if snapshot['status'] in TASK_END_STATUSES:
+                task_pool.pop(task_id, None)
+                return
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',     # don't let a reverse proxy hold the events back
+    })
 
 @app.route("/api/progress_stop/<task_id>")
 def progress_stop(task_id):
@@ -148,20 +380,39 @@ def progress_stop(task_id):
     return {}
 
 def task_stop(task_id):
-    task_pool.pop(task_id, None)
+    """
+    the task stopped on request: its status becomes 'stopped', which a progress stream still waiting on it
+    sends as its last event, and it is removed
+    """
+    task_status = task_pool.pop(task_id, None)
     stop_obj_pool.pop(task_id, None)
+    if task_status is not None:
+        task_status['status'] = 'stopped'
 
-def task_prepare_market_items(task_status, stop_obj, market_item_names):
+
+def task_prepare_market_items(task_status, stop_obj, market_item_names, components=wfm.MarketItem.COMPONENTS,
+                              priority='visible', owner=None, state: MarketState | None = None,
+                              on_ready: Callable[[list[wfm.MarketItem]], None] | None = None):
     """
     prepares the given market items, will update task_status in-place
     can only be called in a task
     will only set and update total and current! other fields are not modified
 
-    if the item already has price etc. data inside, we skip that item.
+    only the given components are prepared (ref. MarketItem.COMPONENTS), and only the ones that the item
+    doesn't have yet. if the item already has all of them, we skip that item.
+    the ones that are stale are served as is, and revalidated in the background (ref. revalidate_stale_items)
+    task_status['data_age'] is set to {item_name: seconds since its oldest component was fetched}
 
     Args:
         task_status: dict to update progress status
         market_item_names: list of item names to prepare
+        components: the components the caller needs
+        priority: the fetch priority, ref. wfm.FetchScheduler.submit
+        owner: usually the task id, so concurrent tasks take turns fetching
+        state: the market state to take the items from, default the current one (pass the one the request
+               started with, so the items prepared are the ones it reads afterwards)
+        on_ready: called with the items that have all the components, first the ones that already had them,
+                  then each one as soon as it is prepared (e.g., to hand out partial results)
     Return:
         None
     """
@@ -170,58 +421,219 @@ def task_prepare_market_items(task_status, stop_obj, market_item_names):
     task_status['total'] = total
     task_status['current'] = 0
 
-    # THIS WHOLE THING IS SEQUENTIAL!!!!!!!!!!!!!!!!
-    def sequential():
-        for item_name in market_item_names:
-            print(f'{util.CYAN}{task_status["current"]}/{total} getting lock {util.RESET}')
-            with market_lock:
-                print(f'{util.CYAN}{task_status["current"]}/{total} got lock, getting item {util.RESET}')
-                item = market_map.get(item_name)
-            
-            print(f'{util.CYAN}{task_status["current"]}/{total} released lock, preparing item{util.RESET}')
-            if item is not None and item.price is None:
-                data = item.fetch_prepare_data()
-            
-            with market_lock:
-                print(f'{util.CYAN}{task_status["current"]}/{total} got lock, preparing {util.RESET}')
-                item = market_map.get(item_name)
-                if item is not None and item.price is None:
-                    item.prepare(data)
-            print(f'{util.CYAN}{task_status["current"]}/{total}{util.RESET}')
-            if stop_obj['stop']:
-                break
-            task_status['current'] += 1
-
-    def parallel():
-        def task(item_name):
-            if stop_obj['stop']:
-                return
-            print(f'{util.CYAN}{task_status["current"]}/{total} [{item_name}] getting lock {util.RESET}')
-            with market_lock:
-                print(f'{util.CYAN}{task_status["current"]}/{total} [{item_name}] got lock, getting item {util.RESET}')
-                item = market_map.get(item_name)
-            
-            print(f'{util.CYAN}{task_status["current"]}/{total} [{item_name}] released lock, preparing item{util.RESET}')
-            if item is not None and item.price is None:
-                data = item.fetch_prepare_data()
-            
-            with market_lock:
-                print(f'{util.CYAN}{task_status["current"]}/{total} [{item_name}] got lock, preparing {util.RESET}')
-                item = market_map.get(item_name)
-                # TODO: check if prev item == cur item...?
-                if item is not None and item.price is None:
-                    item.prepare(data)
-                    
-            print(f'{util.CYAN}{task_status["current"]}/{total} [{item_name}]{util.RESET}')
-            
-            task_status['current'] += 1
-            return item
-    
-        results = Parallel(n_jobs=5, require='sharedmem')(delayed(task)(item_name) for item_name in market_item_names)
-    
-    # sequential()
-    parallel()
-    return 
+    state = state or market_state
+    items = [state.market_map.get(item_name) for item_name in market_item_names]
+    items = [item for item in items if item is not None]
+    revalidate_stale_items(items, components)
+    is_missing = [len(item.missing_components(components)) > 0 for item in items]
+    ready_items = [item for item, missing in zip(items, is_missing) if not missing]
+    items = [item for item, missing in zip(items, is_missing) if missing]
+    task_status['current'] = total - len(items)     # not found or already prepared
+    if on_ready is not None:
+        on_ready(ready_items)
+
+    def on_fetched(item: wfm.MarketItem, data):
+        item.prepare(data)
+        task_status['current'] += 1
+        print(f'{util.CYAN}{task_status["current"]}/{total} [{item.item_name}]{util.RESET}')
+        if on_ready is not None and len(item.missing_components(components)) == 0:
+            on_ready([item])
+
+    wfm.run_async(wfm.prepare_market_items_async(
+        items, on_fetched=on_fetched, should_stop=lambda: stop_obj['stop'],
+        components=components, only_missing=True, priority=priority, owner=owner,
+    ))
+
+    task_status['data_age'] = {
+        item_name: state.market_map[item_name].get_data_age(components)
+        for item_name in market_item_names if item_name in state.market_map
+    }
+
+"""
+Warm-up: prefetch the items that are most likely to be asked for, so they are served from memory
+"""
+
+access_counter: Counter[str] = Counter()
+access_lock = threading.Lock()
+warmup_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+warmup_generation = 0   # bumped by every start_warmup(), so the warm-up of an old market_map stops
+
+def load_access_log():
+    try:
+        access_counter.update(json.loads(ACCESS_LOG_FILE.read_text(encoding='utf-8')))
+    except (OSError, ValueError):
+        pass
+
+def save_access_log():
+    with access_lock:
+        data = dict(access_counter)
+    try:
+        ACCESS_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        ACCESS_LOG_FILE.write_text(json.dumps(data), encoding='utf-8')
+    except OSError as e:
+        print(f'{util.RED}Failed to save access log: {e}{util.RESET}')
+
+def record_access(item_names: Iterable[str]):
+    """
+    count the items requested by the user, the most requested ones are warmed up first next time
+    """
+    with access_lock:
+        access_counter.update(item_names)
+
+def get_warmup_item_names(state: MarketState, n: int) -> list[str]:
+    """
+    the n items to warm up: the most requested ones (ref. record_access) first,
+    then the ones with the most volume on the ducat page
+    """
+    with access_lock:
+        item_names = [item_name for item_name, _ in access_counter.most_common()]
+    ducat_volume = {item_name: d['volume'] for item_name, d in state.ducat_data['previous_day'].items()}
+    item_names += sorted(ducat_volume, key=lambda item_name: ducat_volume[item_name], reverse=True)
+    return [item_name for item_name in dict.fromkeys(item_names) if item_name in state.market_map][:n]
+
+def start_warmup():
+    """
+    prefetch WARMUP_COMPONENTS of the top WARMUP_ITEMS items (ref. get_warmup_item_names) in the background,
+    with the lowest fetch priority so it never gets in the way of the user
+
+    nonblocking, called after every refresh()
+    """
+    global warmup_generation
+    warmup_generation += 1
+    generation = warmup_generation
+    if WARMUP_ITEMS <= 0:
+        return
+    save_access_log()
+    state = market_state
+    items = [state.market_map[item_name] for item_name in get_warmup_item_names(state, WARMUP_ITEMS)]
+
+    def on_fetched(item: wfm.MarketItem, data):
+        item.prepare(data)
+
+    def warmup():
+        print(f'{util.CYAN}Warming up {len(items)} items{util.RESET}')
+        try:
+            wfm.run_async(wfm.prepare_market_items_async(
+                items, on_fetched=on_fetched, should_stop=lambda: generation != warmup_generation,
+                components=WARMUP_COMPONENTS, only_missing=True, priority='background', owner='warmup',
+            ))
+        except Exception as e:
+            print(f'{util.RED}Warm-up failed: {e}{util.RESET}')
+        print(f'{util.CYAN}Warm-up done{util.RESET}')
+        if generation == warmup_generation:
+            save_snapshot()
+
+    warmup_executor.submit(warmup)
+
+load_access_log()
+atexit.register(save_access_log)
+
+snapshot_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+def write_snapshot():
+    """
+    write the current market data as the snapshot (ref. market_snapshot), blocking
+    """
+    state = market_state
+    if state.version == 0:
+        return
+    try:
+        path = market_snapshot.write_snapshot(state.market_items, state.ducat_data, state.market_data_update_date)
+        print(f'{util.CYAN}Snapshot written to {path}{util.RESET}')
+    except Exception as e:
+        print(f'{util.RED}Writing snapshot failed: {e}{util.RESET}')
+
+def save_snapshot():
+    """
+    write_snapshot() in the background, after every refresh and warm-up (and at exit)
+    """
+    snapshot_executor.submit(write_snapshot)
+
+atexit.register(write_snapshot)
+
+def install_snapshot(snapshot: market_snapshot.Snapshot):
+    """
+    serve the snapshot's catalog right away, its prepared items are filled in by hydrate_snapshot()
+    """
+    publish_market_state(
+        snapshot.market_items, snapshot.ducat_data, snapshot.market_data_update_date,
+        user_registry=snapshot.user_registry,
+    )
+
+def hydrate_snapshot(snapshot: market_snapshot.Snapshot):
+    """
+    prepare the snapshot's items with the data they had in it (no requests),
+    skipping the ones that got prepared in the meantime
+    """
+    market_id_map = market_state.market_id_map
+    for item_id in snapshot.prepared_item_ids:
+        item = market_id_map.get(item_id)
+        if item is not None and not item.component_datetime:
+            item.prepare(snapshot.get_prepared_data(item_id))
+
+def startup():
+    """
+    with a snapshot: serve it right away, then fill in its prepared items and refresh from upstream in
+    the background, if upstream is down we just keep serving the snapshot (offline mode)
+    without one: refresh() first, blocking
+    """
+    snapshot = market_snapshot.read_snapshot()
+    if snapshot is None:
+        refresh()
+        return
+    print(f'{util.GREEN}[*] serving snapshot {snapshot.path} ({len(snapshot.prepared_item_ids)} prepared items){util.RESET}')
+    install_snapshot(snapshot)
+
+    def hydrate_and_refresh():
+        hydrate_snapshot(snapshot)
+        try:
+            refresh(keep_prepared=True)
+        except Exception as e:
+            print(f'{util.RED}Refresh failed ({e}), serving the snapshot from {snapshot.created} offline{util.RESET}')
+
+    threading.Thread(target=hydrate_and_refresh, name='startup', daemon=True).start()
+
+revalidate_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+revalidating: set[tuple[str, str]] = set()     # (item name, component) being revalidated right now
+revalidating_lock = threading.Lock()
+
+def revalidate_stale_items(items: list[wfm.MarketItem], components=wfm.MarketItem.COMPONENTS):
+    """
+    stale-while-revalidate: refetch the stale components (ref. MarketItem.COMPONENT_TTL) of the given items
+    in the background, the caller keeps serving the stale data in the meantime
+    an (item, component) already being revalidated is skipped, so there is only one revalidation for it at a time
+
+    nonblocking
+    """
+    # stale components -> items, so each group is one run of the fetch engine
+    groups: dict[tuple[str, ...], list[wfm.MarketItem]] = {}
+    with revalidating_lock:
+        for item in items:
+            stale = tuple(c for c in item.stale_components(components) if (item.item_name, c) not in revalidating)
+            if len(stale) > 0:
+                revalidating.update((item.item_name, c) for c in stale)
+                groups.setdefault(stale, []).append(item)
+    if len(groups) == 0:
+        return
+
+    def on_fetched(item: wfm.MarketItem, data):
+        item.prepare(data)
+
+    def revalidate():
+        try:
+            for stale, group_items in groups.items():
+                print(f'{util.CYAN}Revalidating {stale} of {len(group_items)} items{util.RESET}')
+                wfm.run_async(wfm.prepare_market_items_async(
+                    group_items, on_fetched=on_fetched, components=stale, priority='background', owner='revalidate'
+                ))
+        except Exception as e:
+            print(f'{util.RED}Revalidation failed: {e}{util.RESET}')
+        finally:
+            with revalidating_lock:
+                for stale, group_items in groups.items():
+                    revalidating.difference_update((item.item_name, c) for item in group_items for c in stale)
+
+    revalidate_executor.submit(revalidate)
 
 # --------------------
 
@@ -270,41 +682,125 @@ def get_market_data():
         },
         'last_update': str (ISO format) or None
     }
+
+    the response is serialized (and gzipped) once per market_state version, ref. get_market_data_payload
+    it has an ETag and must be revalidated, so a browser reloading it gets a 304 until the next refresh
     """
-    with market_lock:
-        return {
-            'market_data': {
-                item_name: {k: v for k, v in dataclasses.asdict(item).items() if k not in ['orders', 'statistic', 'price']}
-                for item_name, item in market_map.items()
-            },
-            'last_update': market_data_update_date.isoformat() if market_data_update_date else None
-        }
+    state = market_state
+    payload = use('market_data_payload', lambda: get_market_data_payload(state), state)
+    encoding = 'gzip' if 'gzip' in request.accept_encodings else 'identity'
+    # a strong ETag is per representation, so the gzipped one gets its own
+    etag = payload['etag'] if encoding == 'identity' else f'{payload["etag"]}-gzip'
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(payload[encoding], mimetype='application/json')
+        if encoding == 'gzip':
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def get_market_data_payload(state: MarketState) -> dict[str, Any]:
+    """
+    the /api/get_market_data body of the given market state, ref. get_market_data
+    returns {'identity': json bytes, 'gzip': the same gzipped, 'etag': hash of the json}
+    """
+    hidden = {'orders', 'statistic', 'price'}     # the prepared components, the rest is the catalog
+    body = json.dumps({
+        'market_data': {
+            item_name: {field.name: getattr(item, field.name) for field in dataclasses.fields(item) if field.name not in hidden}
+            for item_name, item in state.market_map.items()
+        },
+        'last_update': state.market_data_update_date.isoformat() if state.market_data_update_date else None
+    }, separators=(',', ':')).encode('utf-8')
+    return {
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        'etag': hashlib.sha256(body).hexdigest()[:32],
+    }
+
+def get_name_index(state: MarketState) -> NameIndex:
+    """
+    the item name index of the given market state, built once per state (i.e., per refresh)
+    """
+    return use('name_index', lambda: NameIndex(state.market_map), state)
+
+@app.route('/api/suggest')
+def suggest():
+    """
+    Item names containing the query, case-insensitive, the best matches first (ref. NameIndex.suggest)
+    nonblocking
+
+    query:
+        q: str, the text typed so far, "+" separated terms are suggested separately for the last one
+        limit: int, default 10
+
+    returns:
+    {
+        'suggestions': list[item_name: str]
+    }
+    """
+    text = request.args.get('q', '')
+    limit = max(0, min(request.args.get('limit', 10, type=int), 100))
+    term = text.rsplit('+', 1)[-1]
+    return {'suggestions': get_name_index(market_state).suggest(term, limit=limit)}
 
 @app.route('/api/refresh_all_data')
 def refresh_all_data():
     """
     Refreshes all market data.
+    Blocking API, but the other endpoints keep serving the current data meanwhile
     """
-    with market_lock:
-        refresh()
+    refresh()
     return {}
 
-def _get_price_oracle(item_names, oracle_type, ducantor_price_override):
+@app.route('/api/stats')
+def stats():
+    """
+    Returns internal counters, mostly for debugging throughput.
+
+    returns:
+    {
+        'http': {host: {'requests': int, 'throttled': int, 'retries': int, 'rate_limit_wait': float, ...}},
+        'single_flight': {'calls': int, 'shared': int},     // 'shared' are the fetches deduplicated
+        'fetch_scheduler': {
+            'queued': {priority: int},      // jobs waiting right now
+            'submitted': {priority: int},
+            'promoted': int,
+            'joined': int,          // submits that joined an identical queued job instead of fetching again
+        },
+        'oracle_cache': {'size': int, 'hits': int, 'misses': int},     // ref. get_oracle_prices
+    }
+    """
+    return {
+        'http': http_client.get_stats(),
+        'single_flight': dict(wfm.fetch_single_flight.stats),
+        'fetch_scheduler': {
+            'queued': wfm.fetch_scheduler.get_queue_lengths(),
+            **wfm.fetch_scheduler.stats,
+        },
+        'oracle_cache': {'size': len(oracle_cache), **oracle_cache.stats},
+    }
+
+def _get_price_oracle(state: MarketState, item_names, oracle_type, ducantor_price_override):
     """
     return item_name -> oracle price
     assume all items has been prepared (or ducantor price override can deal with it)
-    
-    this function will request for market_lock! do NOT require it again in the caller
     """
-    ducat_data_map = {} if ducantor_price_override == 'none' else ducat_data[f'previous_{ducantor_price_override}']
-    with market_lock:
-        return {
-            item_name: \
-                ducat_data_map[item_name]['wa_price'] if item_name in ducat_data_map
-                else oracle_price_fn_map[oracle_type](market_map[item_name].price) if item_name in market_map 
-                else None
-            for item_name in item_names
-        }
+    market_map = state.market_map
+    ducat_data_map = {} if ducantor_price_override == 'none' else state.ducat_data[f'previous_{ducantor_price_override}']
+    oracle_item_names = [item_name for item_name in item_names if item_name not in ducat_data_map and item_name in market_map]
+    oracle_prices = dict(zip(oracle_item_names, get_oracle_prices([market_map[item_name] for item_name in oracle_item_names], oracle_type)))
+    return {
+        item_name: \
+            ducat_data_map[item_name]['wa_price'] if item_name in ducat_data_map
+            else oracle_prices[item_name] if item_name in market_map 
+            else None
+        for item_name in item_names
+    }
 
 @app.route('/api/price_oracle', methods=['POST'])
 def get_price_oracle():
@@ -337,16 +833,18 @@ def get_price_oracle():
     if ducantor_price_override not in ['none', 'day', 'hour']:
         return {"error": "invalid ducantor_price_override"}, 400
     
-    ducat_data_map = {} if ducantor_price_override == 'none' else ducat_data[f'previous_{ducantor_price_override}']
-    prepare_item_names = [item_name for item_name in item_names if item_name in market_map and market_map[item_name].price is None]
-    prepare_item_names = [item_name for item_name in prepare_item_names if item_name not in ducat_data_map]
+    state = market_state
+    ducat_data_map = {} if ducantor_price_override == 'none' else state.ducat_data[f'previous_{ducantor_price_override}']
+    components = get_oracle_components(data['oracle_type'])
+    prepare_item_names = [item_name for item_name in item_names if item_name in state.market_map and item_name not in ducat_data_map]
+    record_access(prepare_item_names)
 
     def task(task_id, task_status, stop_obj):
-        task_prepare_market_items(task_status, stop_obj, prepare_item_names)
+        task_prepare_market_items(task_status, stop_obj, prepare_item_names, components, owner=task_id, state=state)
         if stop_obj['stop']:
             task_stop(task_id)
             return
-        task_status['data'] = _get_price_oracle(item_names, data['oracle_type'], ducantor_price_override)
+        task_status['data'] = _get_price_oracle(state, item_names, data['oracle_type'], ducantor_price_override)
         task_status['status'] = 'done'
 
     task_id = register_task(task)
@@ -374,48 +872,63 @@ def item_infobox():
     {
         item_name: oracle_value or None,
         ...
+        'oracle_prices': {oracle_type: oracle_value or None},   // every oracle in oracle_spec_map
+        ...
     }
 
     if item name not found, returns error message
 
     if use ducantor price: 
-    - will set 'cur_lowest_sell_price', 'wiki_link', '48h_volume' and '90d_volume' to None
+    - will set 'cur_lowest_sell_price', 'oracle_prices', 'wiki_link', '48h_volume' and '90d_volume' to None
     - 
     - 'last_update' would be the ducantor data update time
     """
 
     data = request.json
     item_name = data.get('item_name')
+    state = market_state
 
     # do prepare
-    if item_name not in market_map:
+    if item_name not in state.market_map:
         return {}
+    record_access([item_name])
     
     ducat_price_override = data.get('ducantor_price_override')
     if ducat_price_override == 'none':
         ducat_price_map = {}
     elif ducat_price_override == 'day':
-        ducat_price_map = ducat_data[f'previous_day']
+        ducat_price_map = state.ducat_data[f'previous_day']
     elif ducat_price_override == 'hour':
-        ducat_price_map = ducat_data[f'previous_hour']
+        ducat_price_map = state.ducat_data[f'previous_hour']
     else:
         print("invalid ducantor_price_override:", ducat_price_override)
         return {"error": "invalid ducantor_price_override"}, 400
     
     if item_name not in ducat_price_map:
         # default
-        with market_lock:
-            item = market_map[item_name]
-            if item.price is None:
-                wfm.prepare_market_items([item])
-
+        item = state.market_map[item_name]
+        # needs everything: orders for the lowest price, statistic for volume, info for wiki link
+        if item.missing_components():
+            # the user is waiting for this one, it jumps ahead of any bulk prepare
+            # (and if a bulk prepare already queued it, that one goes first too, and the fetches below join
+            # those queued ones instead of fetching the same URLs again, ref. FetchScheduler.submit)
+            wfm.fetch_scheduler.promote(item.url_name)
+            wfm.prepare_market_items([item], only_missing=True, priority='interactive')
+        revalidate_stale_items([item])
+
+        # every oracle variant costs about as much as one, ref. get_oracle_prices_multi
+        oracle_prices = {
+            oracle_type: prices[0]
+            for oracle_type, prices in get_oracle_prices_multi([item], list(oracle_spec_map)).items()
+        }
         return {
             'item_name': item_name,
             'thumb_url': item.get_thumbnail_url(),
             'icon_url': item.get_icon_url(),
             'type': wfi.resolve_item_type(item, default=None),
 
-            'oracle_price': oracle_price_fn_map[data['oracle_type']](item.price),
+            'oracle_price': oracle_prices[data['oracle_type']],
+            'oracle_prices': oracle_prices,
             'cur_lowest_sell_price': item.orders.get_ingame_lowest_sell_price(),
 
             '48h_volume': item.statistic.get_volume_for_last_hours(48),
@@ -425,9 +938,10 @@ def item_infobox():
             'market_link': item.get_wfm_url(),
 
             'last_update': item.prepare_datetime.isoformat() if item.prepare_datetime else None,
+            'data_age': item.get_data_age(),    # seconds, the oldest component, might be revalidating
         }
     else:
-        item = market_map[item_name]
+        item = state.market_map[item_name]
         item_ducat_data = ducat_price_map[item_name]
         return {
             'item_name': item_name,
@@ -436,6 +950,7 @@ def item_infobox():
             'type': wfi.resolve_item_type(item, default=None),
 
             'oracle_price': item_ducat_data['wa_price'],
+            'oracle_prices': None,
             'cur_lowest_sell_price': None,
 
             '48h_volume': None,
@@ -486,20 +1001,21 @@ def syndicate_data():
         ]
     }
     """
+    state = market_state
+
     def _get_syndicate_data():
-        with market_lock:
-            syndicate_data = wfm.get_all_syndicate_items(market_map=market_map, return_standing=True)
-            return {
-                syndicate_name: [
-                    {
-                        'name': item['item'].item_name,
-                        'standing': item['standing']
-                    }
-                    for item in syndicate_items
-                ]
-                for syndicate_name, syndicate_items in syndicate_data.items()
-            }
-    return use('syndicate_data', _get_syndicate_data)
+        syndicate_data = wfm.get_all_syndicate_items(market_map=state.market_map, return_standing=True)
+        return {
+            syndicate_name: [
+                {
+                    'name': item['item'].item_name,
+                    'standing': item['standing']
+                }
+                for item in syndicate_items
+            ]
+            for syndicate_name, syndicate_items in syndicate_data.items()
+        }
+    return use('syndicate_data', _get_syndicate_data, state)
 
 @app.route('/api/transient_data')
 def transient_reward_data():
@@ -511,19 +1027,33 @@ def transient_reward_data():
         transient_name: list[item names]
     }
     """
+    state = market_state
+
     def _get_transient_data():
         transient_items = wfm.get_transient_mission_rewards()
         transient_rewards = {}
-        with market_lock:
-            for transient_name, transient_rotations in transient_items.items():
-                rewards = set()
-                for rotation, rotation_rewards in transient_rotations.items():
-                    rewards.update([r['item_name'] for r in rotation_rewards if r['item_name'] in market_map])
-                transient_rewards[transient_name] = list(rewards)
+        for transient_name, transient_rotations in transient_items.items():
+            rewards = set()
+            for rotation, rotation_rewards in transient_rotations.items():
+                rewards.update([r['item_name'] for r in rotation_rewards if r['item_name'] in state.market_map])
+            transient_rewards[transient_name] = list(rewards)
         return transient_rewards
-    return use('transient_data', _get_transient_data)
-
-def get_function_item_format(market_item_ls, oracle_type, ducantor_price_override='none'):
+    return use('transient_data', _get_transient_data, state)
+
+# the headers of get_function_item_format
+FUNCTION_ITEM_HEADERS = [
+    {"id": "name", "name": 'Name', "type": "item_name"},
+    {"id": "type", "name": 'Type', "type": "string"},
+    {"id": "plat", "name": 'Plat\n(48hr)', "type": "float"},
+    {"id": "rmax_plat_div21", "name": 'RMP/21\n(Arcane)', "type": "float"},
+    {"id": "rmax_plat", "name": 'R.Max Plat\n(48hr)', "type": "float"},
+    {"id": "plat_times21", "name": 'P*21\n(Arcane)', "type": "float"},
+    {"id": "vol", "name": 'Volume\n(48hr)', "type": "integer"},
+    # {"id": "url", "name": 'WFM URL', "type": "url"},
+    # {"id": "wiki", "name": 'Wiki', "type": "url"},
+]
+
+def get_function_item_format(state: MarketState, market_item_ls, oracle_type, ducantor_price_override='none'):
     """
     if ducantor_price_override == 'none', you need to prepare all items beforehand
     if ducantor_price_override != 'none', will use ducantor price for prime items, but we still
@@ -541,19 +1071,29 @@ def get_function_item_format(market_item_ls, oracle_type, ducantor_price_overrid
             ]
         }
     """
+    return {
+        "headers": FUNCTION_ITEM_HEADERS,
+        "items": get_function_item_rows(state, market_item_ls, oracle_type, ducantor_price_override),
+    }
+
+def get_function_item_rows(state: MarketState, market_item_ls, oracle_type, ducantor_price_override='none') -> list[dict]:
+    """
+    the "items" of get_function_item_format, one row per item, each row only depends on its own item,
+    so they can be made for a few items at a time as they get ready (ref. function_item)
+    """
     if ducantor_price_override not in ['none', 'day', 'hour']:
         raise ValueError("invalid ducantor_price_override")
     
-    ducat_price_map = {} if ducantor_price_override == 'none' else ducat_data[f'previous_{ducantor_price_override}']
-    hour_ducat_price_map = ducat_data['previous_hour']
+    ducat_price_map = {} if ducantor_price_override == 'none' else state.ducat_data[f'previous_{ducantor_price_override}']
+    hour_ducat_price_map = state.ducat_data['previous_hour']
 
     def get_plat(item):
         if ducantor_price_override == 'none' or item.item_name not in ducat_price_map:
-            return oracle_price_fn_map[oracle_type](item.price)
+            return oracle_prices[item.item_name]
         return ducat_price_map[item.item_name]['wa_price']
     def get_rmax_plat(item):
         if ducantor_price_override == 'none' or item.item_name not in ducat_price_map:
-            return oracle_price_fn_map[oracle_type](item.price, mod_rank_range=[item.mod_max_rank])
+            return rmax_oracle_prices[item.item_name]
         return None
     def get_vol(item):  # 48h
         if ducantor_price_override == 'none' or item.item_name not in ducat_price_map:
@@ -561,45 +1101,39 @@ def get_function_item_format(market_item_ls, oracle_type, ducantor_price_overrid
         return None
     
     item_format_ls = []
-    with market_lock:
-        for item in market_item_ls:
-            item_format = {
-                'name': item.item_name,
-                'type': wfi.resolve_item_type(item),
-                'plat': get_plat(item),
-                'rmax_plat_div21': None,
-                'rmax_plat': None,
-                'plat_times21': None,
-                'vol': get_vol(item),
-                # 'url': item.get_wfm_url(),
-                # 'wiki': item.wiki_link, # may be None
-            }
+    # every oracle price of the table at once
+    oracle_items = [item for item in market_item_ls if ducantor_price_override == 'none' or item.item_name not in ducat_price_map]
+    rmax_items = [item for item in oracle_items if 'arcane_enhancement' in item.tags]
+    oracle_prices = dict(zip([item.item_name for item in oracle_items], get_oracle_prices(oracle_items, oracle_type)))
+    rmax_oracle_prices = dict(zip([item.item_name for item in rmax_items], get_oracle_prices(
+        rmax_items, oracle_type, [[item.mod_max_rank] for item in rmax_items]
+    )))
+
+    for item in market_item_ls:
+        item_format = {
+            'name': item.item_name,
+            'type': wfi.resolve_item_type(item),
+            'plat': get_plat(item),
+            'rmax_plat_div21': None,
+            'rmax_plat': None,
+            'plat_times21': None,
+            'vol': get_vol(item),
+            # 'url': item.get_wfm_url(),
+            # 'wiki': item.wiki_link, # may be None
+        }
 
-            if 'arcane_enhancement' in item.tags:
-                rmax_plat = get_rmax_plat(item)
-                if rmax_plat is not None:
-                    item_format = {
-                        **item_format,
-                        'rmax_plat_div21': rmax_plat / 21,
-                        'rmax_plat': rmax_plat,
-                        'plat_times21': item_format['plat'] * 21,
-                    }
-            item_format_ls.append(item_format)
+        if 'arcane_enhancement' in item.tags:
+            rmax_plat = get_rmax_plat(item)
+            if rmax_plat is not None:
+                item_format = {
+                    **item_format,
+                    'rmax_plat_div21': rmax_plat / 21,
+                    'rmax_plat': rmax_plat,
+                    'plat_times21': item_format['plat'] * 21 if item_format['plat'] is not None else None,
+                }
+        item_format_ls.append(item_format)
 
-    return {
-        "headers": [
-            {"id": "name", "name": 'Name', "type": "item_name"},
-            {"id": "type", "name": 'Type', "type": "string"},
-            {"id": "plat", "name": 'Plat\n(48hr)', "type": "float"},
-            {"id": "rmax_plat_div21", "name": 'RMP/21\n(Arcane)', "type": "float"},
-            {"id": "rmax_plat", "name": 'R.Max Plat\n(48hr)', "type": "float"},
-            {"id": "plat_times21", "name": 'P*21\n(Arcane)', "type": "float"},
-            {"id": "vol", "name": 'Volume\n(48hr)', "type": "integer"},
-            # {"id": "url", "name": 'WFM URL', "type": "url"},
-            # {"id": "wiki", "name": 'Wiki', "type": "url"},
-        ],
-        "items": item_format_ls
-    }
+    return item_format_ls
 
 @app.route('/api/function_item', methods=['POST'])
 def function_item():
@@ -626,8 +1160,9 @@ def function_item():
     - item_list: directly specify the item names, if an item name is not found
     
     returns: ItemTable format
-
-    # TODO: cache oracle price?
+    (the oracle prices are memoized, ref. get_oracle_prices)
+    while in progress, the rows of the items that are ready come as the task's partial results (in no particular
+    order, ref. TaskStatus.add_partial), with the table's headers in 'partial_headers'
     """
 
     data = request.json
@@ -638,6 +1173,8 @@ def function_item():
     if search_text is not None and item_list is not None:
         return f"Only one of search_text and item_list should be provided. Provided {data}", 400
 
+    state = market_state
+    market_map = state.market_map
     if item_list is not None:
         market_item_ls = [
             market_map[item_name]
@@ -645,15 +1182,7 @@ def function_item():
             if item_name in market_map
         ]
     elif search_text is not None:
-        item_name_ls = set()
-        for st in search_text.split('+'):
-            st = st.strip()
-            item_name_ls.update([
-                item_name
-                for item_name in market_map
-                if st.lower() in item_name.lower()
-            ])
-        market_item_ls = [market_map[item_name] for item_name in item_name_ls]   # deduplicate
+        market_item_ls = [market_map[item_name] for item_name in get_name_index(state).search_any(search_text)]
     else:
         market_item_ls = []
     print(market_item_ls)
@@ -667,21 +1196,31 @@ def function_item():
         print("data:", data)
         return {"error": "Too many items matched. Please narrow down your search."}, 400
     
-    prepare_item_names = [item.item_name for item in market_item_ls if item.price is None]
+    # oracle price and 48h volume
+    components = list({*get_oracle_components(data['oracle_type']), 'statistic'})
+    prepare_item_names = [item.item_name for item in market_item_ls]
+    record_access(prepare_item_names)
     if ducantor_price_override in ['day', 'hour']:
         # only prepare things that are not in ducantor price map
-        ducat_map = ducat_data[f'previous_{ducantor_price_override}']
+        ducat_map = state.ducat_data[f'previous_{ducantor_price_override}']
         prepare_item_names = [
             item_name for item_name in prepare_item_names
             if item_name not in ducat_map
         ]
+    prepare_item_names = set(prepare_item_names)
     
     def task(task_id, task_status, stop_obj):
-        task_prepare_market_items(task_status, stop_obj, prepare_item_names)    
+        def add_rows(items: list[wfm.MarketItem]):
+            task_status.add_partial(get_function_item_rows(state, items, data['oracle_type'], ducantor_price_override))
+
+        task_status['partial_headers'] = FUNCTION_ITEM_HEADERS
+        add_rows([item for item in market_item_ls if item.item_name not in prepare_item_names])    # ducat priced
+        task_prepare_market_items(task_status, stop_obj, prepare_item_names, components, owner=task_id, state=state,
+                                  on_ready=add_rows)
         if stop_obj['stop']:
             task_stop(task_id)
             return
-        task_status['data'] = get_function_item_format(market_item_ls, data['oracle_type'], data['ducantor_price_override'])
+        task_status['data'] = get_function_item_format(state, market_item_ls, data['oracle_type'], data['ducantor_price_override'])
         task_status['status'] = 'done'
 
     task_id = register_task(task)
@@ -710,26 +1249,28 @@ def item_orders():
     data = request.json
 
     item_names = data.get('item_names')
-    prepare_item_names = [item_name for item_name in item_names if item_name in market_map and market_map[item_name].price is None]
+    state = market_state
+    market_map = state.market_map
+    prepare_item_names = [item_name for item_name in item_names if item_name in market_map]
+    record_access(prepare_item_names)
 
     def task(task_id, task_status, stop_obj):
-        task_prepare_market_items(task_status, stop_obj, prepare_item_names)
+        task_prepare_market_items(task_status, stop_obj, prepare_item_names, ['orders'], owner=task_id, state=state)
         if stop_obj['stop']:
             task_stop(task_id)
             return
-        with market_lock:
-            task_status['data'] = {
-                item_name: \
-                    [dataclasses.asdict(order) for order in market_map[item_name].orders.orders] if item_name in market_map 
-                    else None
-                for item_name in item_names
-            }
+        task_status['data'] = {
+            item_name: \
+                [dataclasses.asdict(order) for order in market_map[item_name].orders.orders] if item_name in market_map 
+                else None
+            for item_name in item_names
+        }
         task_status['status'] = 'done'
 
     task_id = register_task(task)
     return {'task_id': task_id}
 
-def _function_best_trade(spec: dict[str, int], price_oracle: dict[str, int]):
+def _function_best_trade(state: MarketState, spec: dict[str, int], price_oracle: dict[str, int]):
     """
     find best trade for the given items
 
@@ -773,41 +1314,32 @@ def _function_best_trade(spec: dict[str, int], price_oracle: dict[str, int]):
             if you give an item that has rank, we assume rank 0 and the "rank" field would be set
             to 0 if the item has rank, else None
     """
-    with market_lock:
-        # remove all invalid items
-        spec = {item_name: qty for item_name, qty in spec.items() if item_name in market_map and qty > 0}
-
-        # first we find all users and the items they have for sale that are in spec
-        users: dict[str, dict] = {}     # the same as above
-        user_offers: dict[str, dict] = {} # user_id -> {"item_name", "price", "quantity"}
-
-        for item_name in spec:
-            item = market_map[item_name]
-            for order in item.orders.orders:
-                if not order.is_sell or not order.is_ingame:
-                    continue
-                # attempt to add user
-                if order.user_id not in users:
-                    users[order.user_id] = {
-                        "user_in_game_name": order.user_in_game_name,
-                        "user_reputation": order.user_reputation,
-                        "user_slug": order.user_slug,
-                        "user_status": order.user_status,
-                        "url": f'https://warframe.market/profile/{order.user_slug}' if order.user_slug else None
-                    }
-                    user_offers[order.user_id] = {}
-
-                # if already have an offer for this item, take the cheaper one
-                if item_name in user_offers[order.user_id]:
-                    existing_offer = user_offers[order.user_id][item_name]
-                    if (order.platinum, order.quantity) > (existing_offer['price'], existing_offer['quantity']):
-                        continue
-
-                user_offers[order.user_id][item_name] = {
-                    "price": order.platinum,
-                    "quantity": order.quantity,
-                    "rank": order.mod_rank if order.mod_rank is not None else None,
-                }
+    # remove all invalid items
+    spec = {item_name: qty for item_name, qty in spec.items() if item_name in state.market_map and qty > 0}
+
+    # first we find all users and the items they have for sale that are in spec
+    # (the cheapest in-game sell offer of each user for each item, ref. wfm.UserRegistry)
+    sell_offers = state.user_registry.get_sell_offers(spec.keys())
+    users: dict[str, dict] = {}     # the same as above
+    user_offers: dict[str, dict] = {} # user_id -> {"item_name", "price", "quantity"}
+
+    for user_id, offers in sell_offers.items():
+        user = state.user_registry.users[user_id]
+        users[user_id] = {
+            "user_in_game_name": user.ingame_name,
+            "user_reputation": user.reputation,
+            "user_slug": user.slug,
+            "user_status": 'ingame',    # the offers are from when they were in game
+            "url": f'https://warframe.market/profile/{user.slug}' if user.slug else None
+        }
+        user_offers[user_id] = {
+            item_name: {
+                "price": platinum,
+                "quantity": quantity,
+                "rank": mod_rank,
+            }
+            for item_name, (platinum, quantity, mod_rank) in offers.items()
+        }
     
     # now we have all users and their offers, we can find the best trade options
     trade_options = []
@@ -884,15 +1416,19 @@ def function_best_trade():
 
     # will actually have to prepare each and everyone of them
     spec = data.get('spec', {})
-    prepare_item_names = [item_name for item_name in spec if item_name in market_map and market_map[item_name].orders is None]
+    # orders for the offers, and whatever the oracle needs
+    components = list({'orders', *get_oracle_components(data['oracle_type'])})
+    state = market_state
+    prepare_item_names = [item_name for item_name in spec if item_name in state.market_map]
+    record_access(prepare_item_names)
     item_names = list(spec.keys())
 
     def task(task_id, task_status, stop_obj):
-        task_prepare_market_items(task_status, stop_obj, prepare_item_names)
+        task_prepare_market_items(task_status, stop_obj, prepare_item_names, components, owner=task_id, state=state)
         if stop_obj['stop']:
             task_stop(task_id)
             return
-        task_status['data'] = _function_best_trade(spec, _get_price_oracle(item_names, data['oracle_type'], 'none'))
+        task_status['data'] = _function_best_trade(state, spec, _get_price_oracle(state, item_names, data['oracle_type'], 'none'))
         task_status['status'] = 'done'
 
     task_id = register_task(task)
@@ -900,6 +1436,7 @@ def function_best_trade():
 
 @app.route('/api/public_export/data/<string:lang>/<string:function_name>')
 def data_public_export(lang, function_name):
+    wpe = market_state.wpe
     function_map = {
         'get_weapon_name_map': lambda lang: wpe.get_weapon_name_map(lang, use_cache=True),
         'get_weapon_riven_disposition': lambda lang: wpe.get_weapon_riven_disposition(use_cache=True),
@@ -916,6 +1453,7 @@ def data_public_export(lang, function_name):
 
 @app.route('/api/wiki/data/<string:function_name>')
 def data_wiki(function_name):
+    wwiki = market_state.wwiki
     function_map = {
         'get_weapon_uname_family_map': lambda: wwiki.get_weapon_uname_family_map(use_cache=True),
         'get_weapon_family_unames_map': lambda: wwiki.get_weapon_family_unames_map(use_cache=True),
@@ -930,7 +1468,6 @@ def data_wiki(function_name):
 
 def _test_best_trade():
     USE_CACHE = True
-    CACHE_FILE = Path('server_market_cache.pkl')
 
     spec = {
         'Momentous Bond': 1,
@@ -940,24 +1477,20 @@ def _test_best_trade():
     }
 
     # load data
-    if USE_CACHE:
-        if CACHE_FILE.exists():
-            print(f'{util.CYAN} loading cache from {CACHE_FILE} {util.RESET}')
-            with open(CACHE_FILE, 'rb') as f:
-                market_items, market_map, market_id_map, market_data_update_date, ducat_data, cache = pickle.load(f)
-        else:
-            print(f'{util.CYAN} cache file {CACHE_FILE} not found{util.RESET}')
-            exit()
+    snapshot = market_snapshot.read_snapshot() if USE_CACHE else None
+    if snapshot is not None:
+        print(f'{util.CYAN} loading snapshot {snapshot.path} {util.RESET}')
+        install_snapshot(snapshot)
+        hydrate_snapshot(snapshot)
     else:
         refresh()
-        for item_name in spec:
-            with market_lock:
-                print(f'{util.CYAN} preparing {item_name} {util.RESET}')
-                item = market_map.get(item_name)
-                if item is not None and item.price is None:
-                    item.prepare()
-        with open(CACHE_FILE, 'wb') as f:
-                pickle.dump((market_items, market_map, market_id_map, market_data_update_date, ducat_data, cache), f)
+    market_map = market_state.market_map
+    for item_name in spec:
+        item = market_map.get(item_name)
+        if item is not None and item.missing_components():
+            print(f'{util.CYAN} preparing {item_name} {util.RESET}')
+            item.prepare(components=item.missing_components())
+    write_snapshot()
     
 
     price_oracle = {
@@ -966,10 +1499,13 @@ def _test_best_trade():
             else None
         for item_name in spec
     }
-    result = _function_best_trade(spec, price_oracle)
+    result = _function_best_trade(market_state, spec, price_oracle)
     for i in result['trade_options']:
         print(i)
 
 if __name__ == '__main__':
-    refresh()
+    # with the reloader (DEBUG), this process only watches the files and the server runs in a child process,
+    # which has WERKZEUG_RUN_MAIN set, only that one should load the data (and write snapshots)
+    if not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        startup()
     app.run(debug=DEBUG, host=HOST, port=PORT)
\ No newline at end of file
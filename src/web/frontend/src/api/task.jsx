@@ -2,11 +2,12 @@ export function makeHandleSubmit(setPollStatus, fetchTaskIdCallback, fetchStatus
   /*
   setPollStatus: function to update polling status state, should be useState setter.
     pollStatus = {
-      'status': "submitting" | "in_progress" | "done" | "error", // current status
+      'status': "submitting" | "in_progress" | "done" | "error" | "stopped", // current status
         // "submitting": task is being submitted
         // "in_progress": task is being processed
         // "done": task is completed
         // "error": error occurred
+        // "stopped": task was stopped before it finished (ref. /api/progress_stop)
       'taskId': str | null,   // task ID returned from server
         // only meaningful when status is "in_progress"
       'data': any | null,
@@ -16,6 +17,9 @@ export function makeHandleSubmit(setPollStatus, fetchTaskIdCallback, fetchStatus
       'progress': { current: int, total: int } | null
         // only meaningful when status is "in_progress"
         // if no progress info, it becomes null
+      'partial': { headers: any | null, items: any[] } | null
+        // the partial results the task handed out so far (e.g., the rows of the items that are ready),
+        // only meaningful when status is "in_progress", null if there are none yet
     }
     e.g., const [pollStatus, setPollStatus] = useState({
       'taskId': null,
@@ -25,15 +29,21 @@ export function makeHandleSubmit(setPollStatus, fetchTaskIdCallback, fetchStatus
     });
   fetchTaskIdCallback: async Callback[] => str
     initiate the task and get task ID
-  fetchStatusCallback: async Callback[str] => progressData
-    fetch the status of the task using task ID, progressData should be {
-      'status': "in_progress" | "done" | "error",
+  fetchStatusCallback: async Callback[str, int] => progressData
+    fetch the status of the task using task ID (and the number of partial results we already have),
+    progressData should be {
+      'status': "in_progress" | "done" | "error" | "stopped",
       'current': int
       'total': int
       'data': any | null
       'error': any | null
+      'partial': any[] | undefined        // the partial results from partial_from on
+      'partial_from': int | undefined
+      'partial_headers': any | undefined
     }
-    if null, we use `async (taskId) => fetch(`/api/progress/${taskId}`).then(res => res.json());`
+    if null, we use `async (taskId) => fetch(`/api/progress/${taskId}`).then(res => res.json());`,
+    or rather, the progress is pushed from `/api/progress_stream/${taskId}` (server-sent events),
+    and we only poll when the browser or the connection can't do that
   fetchStopCallback: async Callback[str] => null
     stop the task using task ID
     if null, we use `async (taskId) => fetch(`/api/progress_stop/${taskId}`).then(res => res.json());`
@@ -55,16 +65,81 @@ export function makeHandleSubmit(setPollStatus, fetchTaskIdCallback, fetchStatus
     }, [searchText, handleSubmit, setting.oracle_type]);
   */
 
-  const defaultFetchStatusCallback = async (taskId) => fetch(`/api/progress/${taskId}`).then(res => res.json());
+  const defaultFetchStatusCallback = async (taskId, partialFrom) => fetch(`/api/progress/${taskId}?partial_from=${partialFrom}`).then(res => res.json());
   const defaultFetchStopCallback = async (taskId) => fetch(`/api/progress_stop/${taskId}`).then(res => res.json());
 
+  // returns whether the task is finished
+  // partial: { headers, items }, the partial results of this task so far, updated in-place
+  const handleProgress = (progressData, partial) => {
+    if (progressData.status === 'done') {
+      setPollStatus(prev => ({ ...prev, status: "done", data: progressData.data, error: null, taskId: null, partial: null }));
+      return true;
+    } else if (progressData.status === 'error') {
+      setPollStatus(prev => ({ ...prev, status: "error", data: null, error: progressData.error, taskId: null, partial: null }));
+      return true;
+    } else if (progressData.status === 'stopped') {
+      setPollStatus(prev => ({ ...prev, status: "stopped", data: null, error: null, taskId: null, partial: null }));
+      return true;
+    }
+    if (progressData.partial !== undefined && progressData.partial.length > 0) {
+      partial.items = [...partial.items.slice(0, progressData.partial_from), ...progressData.partial];
+      partial.headers = progressData.partial_headers ?? partial.headers;
+    }
+    setPollStatus(prev => ({
+      ...prev,
+      progress: { current: progressData.current, total: progressData.total },
+      partial: partial.items.length > 0 ? { headers: partial.headers, items: partial.items } : null,
+    }));
+    return false;
+  };
+
+  // resolves to true when the task is finished (or ignored), false if the stream can't be used
+  const streamProgress = (task_id, ignore_obj, partial) => new Promise((resolve) => {
+    const source = new EventSource(`/api/progress_stream/${task_id}`);
+    let isDone = false;
+    const finish = (result) => {
+      clearInterval(ignoreTimer);
+      source.close();
+      resolve(result);
+    };
+    // nothing comes in while the task doesn't progress, so check for ignore on our own
+    const ignoreTimer = setInterval(() => {
+      if (ignore_obj && ignore_obj['ignore']) {
+        (fetchStopCallback || defaultFetchStopCallback)(task_id);
+        finish(true);
+      }
+    }, 500);
+    source.onmessage = (event) => {
+      if (ignore_obj && ignore_obj['ignore']) {
+        return;   // the timer stops it
+      }
+      isDone = handleProgress(JSON.parse(event.data), partial);
+      if (isDone) {
+        finish(true);
+      }
+    };
+    source.onerror = () => {
+      // while CONNECTING, it is reconnecting on its own and resumes from the last event id
+      if (source.readyState === EventSource.CLOSED && !isDone) {
+        finish(false);
+      }
+    };
+  });
+
   return async (ignore_obj) => {
     setPollStatus(prev => ({ ...prev, status: "submitting" }));
     
     try {
       // Fetch initial task
       let task_id = await fetchTaskIdCallback()
-      setPollStatus(prev => ({ ...prev, status: "in_progress", taskId: task_id, progress: null }));
+      setPollStatus(prev => ({ ...prev, status: "in_progress", taskId: task_id, progress: null, partial: null }));
+      const partial = { headers: null, items: [] };
+
+      if (fetchStatusCallback === null && typeof EventSource !== 'undefined') {
+        if (await streamProgress(task_id, ignore_obj, partial)) {
+          return;
+        }
+      }
   
       // Poll for progress
       let isDone = false;
@@ -75,17 +150,8 @@ export function makeHandleSubmit(setPollStatus, fetchTaskIdCallback, fetchStatus
           return;
         }
         
-        const progressData = await (fetchStatusCallback || defaultFetchStatusCallback)(task_id);
-        
-        if (progressData.status === 'done') {
-          setPollStatus(prev => ({ ...prev, status: "done", data: progressData.data, error: null, taskId: null }));
-          isDone = true;
-        } else if (progressData.status === 'error') {
-          setPollStatus(prev => ({ ...prev, status: "error", data: null, error: progressData.error, taskId: null }));
-          isDone = true;
-        } else {
-          setPollStatus(prev => ({ ...prev, progress: { current: progressData.current, total: progressData.total } }));
-        }
+        const progressData = await (fetchStatusCallback || defaultFetchStatusCallback)(task_id, partial.items.length);
+        isDone = handleProgress(progressData, partial);
       }
     } catch (error) {
       console.error('Error:', error);
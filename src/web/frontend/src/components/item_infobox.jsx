@@ -2,10 +2,11 @@ import { fetchItemInfoboxData } from "../api/fetch";
 import { useState } from "react";
 import { useQuery } from '@tanstack/react-query';
 import Infobox from "./infobox";
+import { oracleTypeLabels } from "./navbar_setting_menu";
 
 function ItemInfoboxInner({ itemData }) {
   /* ref. /api/item_infobox response format in server.py 
-     note that 'cur_lowest_sell_price' and 'wiki_link' may be null
+     note that 'cur_lowest_sell_price', 'oracle_prices' and 'wiki_link' may be null
   */
   const formatPrice = (price) => {
     return Number.isInteger(price) ? Math.floor(price) : price.toFixed(2);
@@ -55,6 +56,20 @@ function ItemInfoboxInner({ itemData }) {
             </>) : null
           }
           <br />
+
+          {/* every oracle variant */}
+          {
+            itemData.oracle_prices ? (
+              <details className="text-xs">
+                <summary className="text-gray-400 cursor-pointer">All oracles</summary>
+                {Object.entries(itemData.oracle_prices).map(([oracleType, price]) => (
+                  <div key={oracleType}>
+                    <span className="text-yellow-300">{oracleTypeLabels[oracleType] || oracleType}</span> <span className="font-bold">{price !== null ? formatPrice(price) : '-'}</span>{price !== null ? plat : null}
+                  </div>
+                ))}
+              </details>
+            ) : null
+          }
           
           {/* Volume */}
           {
@@ -4,6 +4,18 @@ import { Loading, Error } from '../components/loading_status.jsx';
 import { fetchMarketData, fetchRefreshData } from '../api/fetch.jsx';
 import { getInventoryFromFile } from '../utils/inventory.jsx';
 
+// oracle type -> name, ref. oracle_spec_map in server.py
+export const oracleTypeLabels = {
+  'default_oracle_price_48h': 'Default Oracle Price (48h)',
+  'top_30%_avg_in_48h': 'Top 30% Avg (48h)',
+  'bottom_30%_avg_in_48h': 'Bottom 30% Avg (48h)',
+  'all_avg_in_48h': 'All Avg (48h)',
+  'top_30%_avg_in_90d': 'Top 30% Avg (90d)',
+  'bottom_30%_avg_in_90d': 'Bottom 30% Avg (90d)',
+  'all_avg_in_90d': 'All Avg (90d)',
+  'cur_lowest_price': 'Current Lowest Price',
+};
+
 function SettingItemRefreshMarketData({setting, setSetting}) {
   const [clicked, setClicked] = useState(false);
   console.log("SettingItemRefreshMarketData clicked:", clicked);
@@ -61,14 +73,9 @@ function SettingItemPriceOracle({setting, setSetting}) {
           value={setting.oracle_type}
           onChange={(e) => setSetting({...setting, 'oracle_type': e.target.value})}
         >
-          <option value="default_oracle_price_48h">Default Oracle Price (48h)</option>
-          <option value="top_30%_avg_in_48h">Top 30% Avg (48h)</option>
-          <option value="bottom_30%_avg_in_48h">Bottom 30% Avg (48h)</option>
-          <option value="all_avg_in_48h">All Avg (48h)</option>
-          <option value="top_30%_avg_in_90d">Top 30% Avg (90d)</option>
-          <option value="bottom_30%_avg_in_90d">Bottom 30% Avg (90d)</option>
-          <option value="all_avg_in_90d">All Avg (90d)</option>
-          <option value="cur_lowest_price">Current Lowest Price</option>
+          {Object.entries(oracleTypeLabels).map(([oracleType, label]) => (
+            <option key={oracleType} value={oracleType}>{label}</option>
+          ))}
         </select>
       </div>
     );
@@ -67,6 +67,8 @@ export default function ItemInfo({setting}) {
     {searchText && itemPollStatus.status === "in_progress" ? <LoadingProgress message="Loading" progress={itemPollStatus.progress} /> : null}
     {searchText && itemPollStatus.status === "error" ? <Error message={`ERROR: ${itemPollStatus.error}`} /> : null}
     {itemPollStatus.status === "done" && itemTable ? <ItemTable itemTable={itemTable} setting={setting} /> : null}
+    {/* the rows of the items that are ready, until the whole table is */}
+    {searchText && itemPollStatus.status === "in_progress" && itemPollStatus.partial?.headers ? <ItemTable itemTable={itemPollStatus.partial} setting={setting} /> : null}
     </div>
   </>);
 }
@@ -61,6 +61,7 @@ export default function TransientReward({setting}) {
       {searchText && itemPollStatus.status === "in_progress" ? <LoadingProgress message="Loading" progress={itemPollStatus.progress} /> : null}
       {searchText && itemPollStatus.status === "error" ? <Error message={`ERROR: ${itemPollStatus.error}`} /> : null}
       {itemPollStatus.status === "done" && itemTable ? <ItemTable itemTable={itemTable} setting={setting} /> : null}
+      {searchText && itemPollStatus.status === "in_progress" && itemPollStatus.partial?.headers ? <ItemTable itemTable={itemPollStatus.partial} setting={setting} /> : null}
     </div>
   </>);
 }